@@ -1,14 +1,46 @@
 import aiosqlite
+import asyncio
+import time
 from contextlib import asynccontextmanager
 from typing import List, Tuple, Any
+import logging
 import os
-import aiofiles
+from common.metrics import MetricsRegistry, query_label
+from utils.logs import setup_logger
+
+# Number of read-only connections kept open for API reads
+READER_CONNECTIONS = int(os.getenv("DB_READER_CONNECTIONS", "4"))
+
+# Applied to every connection; WAL lets readers proceed while the writer holds a transaction
+PRAGMAS = {
+    "synchronous": os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+    "cache_size": os.getenv("DB_CACHE_SIZE", "-65536"),
+    "mmap_size": os.getenv("DB_MMAP_SIZE", "268435456"),
+    "busy_timeout": os.getenv("DB_BUSY_TIMEOUT", "5000"),
+    "temp_store": "MEMORY",
+    # Only takes effect on a new database; components.retention converts existing ones with a one-time VACUUM
+    "auto_vacuum": "INCREMENTAL",
+}
+
+# Query tracing is off unless QUERY_LOG_LEVEL=DEBUG; QUERY_LOG_SAMPLE_RATE keeps a fraction of traced queries
+query_logger = setup_logger(
+    "query",
+    log_file="query.log",
+    level=os.getenv("QUERY_LOG_LEVEL", "WARNING"),
+    sample_rate=float(os.getenv("QUERY_LOG_SAMPLE_RATE", "1.0")),
+    console=False
+)
+
+# Statement execution time (excluding pool waits, which the pool metrics below cover)
+query_seconds = MetricsRegistry().histogram(
+    "tickermind_db_query_seconds", "SQLite statement execution time by Database method and statement", ("method", "query")
+)
 
 class Database:
     """Singleton class for managing async SQLite database connections and queries."""
     _instance = None
 
-    def __new__(cls, db_path: str= "", primary_table: str= "", secondary_table: str= "", news_table: str = "news_table", foreign_key: str= "stock_id"):
+    def __new__(cls, db_path: str= "", primary_table: str= "", secondary_table: str= "", news_table: str = "news_table", foreign_key: str= "stock_id", readers: int = READER_CONNECTIONS):
         """Ensures a single instance of the Database class.
 
         Args:
@@ -16,6 +48,7 @@ class Database:
             primary_table (str): Name of the primary table (referenced by foreign key).
             secondary_table (str): Name of the secondary table (contains foreign key).
             foreign_key (str): Name of the foreign key column in the secondary table.
+            readers (int): Number of read-only connections in the reader pool.
 
         Returns:
             Database: Singleton instance of the Database class.
@@ -29,18 +62,49 @@ class Database:
             cls._instance.foreign_key = foreign_key
             cls._instance.loop = None
             cls._instance.conn = None
+            cls._instance.reader_count = max(1, readers)
+            cls._instance.readers = []
+            # Idle connections per pool; the writer pool holds exactly one connection
+            cls._instance.idle = {"writer": asyncio.Queue(), "reader": asyncio.Queue()}
+            cls._instance.connect_lock = asyncio.Lock()
+            cls._instance.pool_stats = {"writer": cls._new_pool_stats(), "reader": cls._new_pool_stats()}
+            cls._instance.ticker_ids = {}
         return cls._instance
 
+    @staticmethod
+    def _new_pool_stats() -> dict:
+        """Returns zeroed wait/usage counters for one connection pool."""
+        return {"acquired": 0, "waiting": 0, "in_use": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+    async def _open(self, read_only: bool) -> aiosqlite.Connection:
+        """Opens one connection with the row factory and tuned pragmas applied."""
+        conn = await aiosqlite.connect(self.db_path)
+        conn.row_factory = aiosqlite.Row
+        for pragma, value in PRAGMAS.items():
+            await conn.execute(f"PRAGMA {pragma} = {value}")
+        if read_only:
+            await conn.execute("PRAGMA query_only = 1")
+        return conn
+
     async def _create_connection(self):
-        """Initializes the async SQLite database connection with row factory."""
-        if self.conn is None:
-            self.conn = await aiosqlite.connect(self.db_path)
-            self.conn.row_factory = aiosqlite.Row
-            await self._ensure_tables()
+        """Initializes the writer connection, the schema and the reader pool."""
+        async with self.connect_lock:
+            if self.conn is not None:
+                return
+            conn = await self._open(read_only=False)
+            await conn.execute("PRAGMA journal_mode = WAL")
+            await self._ensure_tables(conn)
+            for _ in range(self.reader_count):
+                reader = await self._open(read_only=True)
+                self.readers.append(reader)
+                self.idle["reader"].put_nowait(reader)
+            self.idle["writer"].put_nowait(conn)
+            self.conn = conn
 
-    async def _ensure_tables(self):
+    async def _ensure_tables(self, conn: aiosqlite.Connection):
         """Ensures primary and secondary tables exist with auto-incrementing IDs."""
-        async with self._get_cursor() as cursor:
+        cursor = await conn.cursor()
+        try:
             await cursor.execute(f"""
                 CREATE TABLE IF NOT EXISTS {self.primary_table} (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -66,26 +130,262 @@ class Database:
                     description TEXT,
                     source TEXT NOT NULL,
                     sentiment_label TEXT,
+                    sentiment_positive REAL,
+                    sentiment_negative REAL,
+                    sentiment_neutral REAL,
                     FOREIGN KEY ({self.foreign_key}) REFERENCES {self.primary_table}(id),
                     UNIQUE ({self.foreign_key}, date, description)
                 )
             """)
-            await self.conn.commit()
+            await cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sentiment_cache (
+                    hash TEXT PRIMARY KEY,
+                    label TEXT NOT NULL,
+                    positive REAL,
+                    negative REAL,
+                    neutral REAL
+                )
+            """)
+            # OHLCV bars keyed by integer epoch timestamps and clustered on the primary key
+            await cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS bars (
+                    {self.foreign_key} INTEGER NOT NULL,
+                    interval INTEGER NOT NULL,
+                    ts INTEGER NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL NOT NULL,
+                    volume INTEGER,
+                    PRIMARY KEY ({self.foreign_key}, interval, ts)
+                ) WITHOUT ROWID
+            """)
+            # Latest indicator values per ticker and interval, refreshed by components.stocks.indicators
+            await cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS indicator_snapshot (
+                    {self.foreign_key} INTEGER NOT NULL,
+                    interval INTEGER NOT NULL,
+                    ts INTEGER NOT NULL,
+                    close REAL,
+                    change REAL,
+                    volume REAL,
+                    sma20 REAL,
+                    sma50 REAL,
+                    sma200 REAL,
+                    ema12 REAL,
+                    ema26 REAL,
+                    rsi14 REAL,
+                    macd REAL,
+                    macd_signal REAL,
+                    macd_hist REAL,
+                    bb_upper REAL,
+                    bb_middle REAL,
+                    bb_lower REAL,
+                    atr14 REAL,
+                    volume_z REAL,
+                    sentiment TEXT,
+                    PRIMARY KEY ({self.foreign_key}, interval)
+                )
+            """)
+            await self._ensure_columns(cursor, "indicator_snapshot", {"sentiment": "TEXT"})
+            # Scans read one row per ticker and interval, which is cheaper than keeping an index per column current
+            # on every per-bar upsert; drop the ones earlier versions created
+            for column in ("close", "change", "volume", "sma20", "sma50", "sma200", "ema12", "ema26", "rsi14", "macd",
+                           "macd_signal", "macd_hist", "bb_upper", "bb_middle", "bb_lower", "atr14", "volume_z", "sentiment"):
+                await cursor.execute(f"DROP INDEX IF EXISTS idx_indicator_snapshot_{column}")
+            # Serialized incremental indicator state (components.stocks.indicator_state)
+            await cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS indicator_state (
+                    {self.foreign_key} INTEGER NOT NULL,
+                    interval INTEGER NOT NULL,
+                    state BLOB NOT NULL,
+                    prior BLOB,
+                    PRIMARY KEY ({self.foreign_key}, interval)
+                ) WITHOUT ROWID
+            """)
+            await self._ensure_columns(cursor, self.primary_table, {"in_universe": "INTEGER NOT NULL DEFAULT 0"})
+            # Per-ticker historical backfill progress (components.data_collection.universe); next_ts is the first
+            # bar time not loaded yet, so an interrupted backfill resumes from there
+            await cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS backfill_checkpoint (
+                    {self.foreign_key} INTEGER NOT NULL,
+                    interval INTEGER NOT NULL,
+                    next_ts INTEGER NOT NULL,
+                    rows INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    updated_at INTEGER,
+                    PRIMARY KEY ({self.foreign_key}, interval)
+                ) WITHOUT ROWID
+            """)
+            # Latest close and sentiment per ticker for Tickers.GetList, kept current by the ingest and scoring jobs
+            await cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS ticker_snapshot (
+                    {self.foreign_key} INTEGER PRIMARY KEY,
+                    ticker TEXT NOT NULL,
+                    date TEXT,
+                    close REAL,
+                    prev_close REAL,
+                    change REAL,
+                    volume INTEGER,
+                    sentiment_label TEXT,
+                    sentiment_date TEXT,
+                    FOREIGN KEY ({self.foreign_key}) REFERENCES {self.primary_table}(id)
+                )
+            """)
+            # Sentiment.GetList pages newest-first by (date, id) under optional ticker/label/source filters. Each index
+            # ends in date, followed by the implicit rowid (id), so a page is read in order and stops at the limit
+            for name, columns in (
+                ("date", "date"),
+                ("stock_date", f"{self.foreign_key}, date"),
+                ("label_date", "sentiment_label, date"),
+                ("source_date", "source, date"),
+            ):
+                await cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{self.news_table}_{name} ON {self.news_table} ({columns})"
+                )
+            await self._ensure_columns(cursor, self.news_table, {
+                "sentiment_positive": "REAL",
+                "sentiment_negative": "REAL",
+                "sentiment_neutral": "REAL",
+                "story_id": "TEXT",
+                "url": "TEXT",
+                "canonical_id": "INTEGER",
+                "similarity": "REAL",
+                "published_at": "INTEGER",
+            })
+            # Label counts and summed net score per ticker and hour/day bucket (components.stocks.sentiment_agg)
+            await cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS sentiment_agg (
+                    {self.foreign_key} INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    ts INTEGER NOT NULL,
+                    positive INTEGER NOT NULL DEFAULT 0,
+                    negative INTEGER NOT NULL DEFAULT 0,
+                    neutral INTEGER NOT NULL DEFAULT 0,
+                    score REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY ({self.foreign_key}, bucket, ts)
+                ) WITHOUT ROWID
+            """)
+            # MinHash signatures and LSH band buckets of stored stories (components.news_collection.dedup)
+            await cursor.execute("""
+                CREATE TABLE IF NOT EXISTS news_minhash (
+                    news_id INTEGER PRIMARY KEY,
+                    signature BLOB
+                )
+            """)
+            await cursor.execute("""
+                CREATE TABLE IF NOT EXISTS news_lsh (
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    news_id INTEGER NOT NULL,
+                    PRIMARY KEY (band, bucket, news_id)
+                ) WITHOUT ROWID
+            """)
+            # Newest story ingested per ticker (components.news_collection.tickertick), so each run reads only newer ones
+            await cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS news_watermark (
+                    {self.foreign_key} INTEGER PRIMARY KEY,
+                    last_time INTEGER NOT NULL,
+                    last_id TEXT NOT NULL,
+                    updated_at INTEGER,
+                    FOREIGN KEY ({self.foreign_key}) REFERENCES {self.primary_table}(id)
+                )
+            """)
+            # Parquet files holding rows moved out of the database (components.retention.archive); min_key/max_key
+            # bound the rows' date (news) or ts (bars), so reads only open the files that can match
+            await cursor.execute("""
+                CREATE TABLE IF NOT EXISTS archive_partition (
+                    path TEXT PRIMARY KEY,
+                    dataset TEXT NOT NULL,
+                    interval INTEGER,
+                    rows INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    min_key NOT NULL,
+                    max_key NOT NULL,
+                    created_at INTEGER NOT NULL
+                )
+            """)
+            await conn.commit()
+        finally:
+            await cursor.close()
+
+    async def _ensure_columns(self, cursor, table: str, columns: dict):
+        """Adds any missing columns to an existing table.
+
+        Args:
+            cursor: Open cursor to run the migration on.
+            table (str): Name of the table to migrate.
+            columns (dict): Mapping of column name to SQL column type.
+        """
+        await cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row["name"] for row in await cursor.fetchall()}
+        for name, column_type in columns.items():
+            if name not in existing:
+                await cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
 
     @asynccontextmanager
-    async def _get_cursor(self):
-        """Async context manager for handling database cursor operations."""
+    async def _acquire(self, pool: str):
+        """Waits for an idle connection from a pool while keeping wait-time and usage counters."""
         if self.conn is None:
             await self._create_connection()
-        cursor = await self.conn.cursor()
+        stats = self.pool_stats[pool]
+        stats["waiting"] += 1
+        start = time.perf_counter()
         try:
-            yield cursor
-            await self.conn.commit()
-        except Exception as e:
-            await self.conn.rollback()
-            raise e
+            conn = await self.idle[pool].get()
         finally:
-            await cursor.close()
+            stats["waiting"] -= 1
+        waited = time.perf_counter() - start
+        stats["acquired"] += 1
+        stats["wait_total"] += waited
+        stats["wait_max"] = max(stats["wait_max"], waited)
+        stats["in_use"] += 1
+        try:
+            yield conn
+        finally:
+            stats["in_use"] -= 1
+            self.idle[pool].put_nowait(conn)
+
+    @asynccontextmanager
+    async def _get_cursor(self):
+        """Async context manager for a write transaction on the single writer connection."""
+        async with self._acquire("writer") as conn:
+            cursor = await conn.cursor()
+            try:
+                yield cursor
+                await conn.commit()
+            except Exception as e:
+                await conn.rollback()
+                raise e
+            finally:
+                await cursor.close()
+
+    @asynccontextmanager
+    async def _get_read_cursor(self):
+        """Async context manager for a cursor on a pooled read-only connection.
+
+        Readers never touch the writer connection, so in WAL mode they do not wait behind scheduler writes.
+        """
+        async with self._acquire("reader") as conn:
+            cursor = await conn.cursor()
+            try:
+                yield cursor
+            finally:
+                await cursor.close()
+
+    def stats(self) -> dict:
+        """Returns wait and usage counters for the writer and reader pools.
+
+        Returns:
+            dict: Per-pool acquisitions, current waiters and holders, and total/max/average wait in seconds.
+        """
+        result = {}
+        for pool, stats in self.pool_stats.items():
+            result[pool] = dict(stats, wait_avg=stats["wait_total"] / stats["acquired"] if stats["acquired"] else 0.0)
+            result[pool]["idle"] = self.idle[pool].qsize()
+        result["reader"]["size"] = len(self.readers)
+        return result
 
     async def execute(self, query: str, params: Tuple = ()) -> None:
         """Executes an async SQL query with optional parameters.
@@ -101,13 +401,167 @@ class Database:
             .replace("{news_table}", self.news_table)
         )
 
-        os.makedirs('/data', exist_ok=True)
-        async with aiofiles.open('/data/execute.txt', 'a') as f:
-            await f.write(f"query: {query}\n")
-            await f.write(f"params: {params}\n")
+        if query_logger.isEnabledFor(logging.DEBUG):
+            query_logger.debug("execute: %s params: %s", query, params)
 
         async with self._get_cursor() as cursor:
+            start = time.perf_counter()
             await cursor.execute(query, params)
+            query_seconds.labels("execute", query_label(query)).observe(time.perf_counter() - start)
+
+    async def execute_many(self, query: str, params_seq: List[Tuple]) -> None:
+        """Executes an async SQL query once per parameter tuple in a single transaction.
+
+        Args:
+            query (str): SQL query with {primary_table}, {secondary_table}, or {foreign_key} placeholders.
+            params_seq (List[Tuple]): Parameter tuples, one per execution.
+        """
+        if not params_seq:
+            return
+
+        query = (
+            query.replace("{primary_table}", self.primary_table)
+            .replace("{secondary_table}", self.secondary_table)
+            .replace("{foreign_key}", self.foreign_key)
+            .replace("{news_table}", self.news_table)
+        )
+
+        async with self._get_cursor() as cursor:
+            start = time.perf_counter()
+            await cursor.executemany(query, params_seq)
+            query_seconds.labels("execute_many", query_label(query)).observe(time.perf_counter() - start)
+
+    async def maintenance(self, statement: str) -> List[tuple]:
+        """Runs a PRAGMA or VACUUM statement on the writer connection and returns all of its rows.
+
+        PRAGMA incremental_vacuum frees one page per step but its steps return no columns, so execute would stop after
+        the first page; it runs as a script instead, which steps it to completion (and returns no rows).
+        """
+        async with self._get_cursor() as cursor:
+            start = time.perf_counter()
+            if statement.lstrip().lower().startswith("pragma incremental_vacuum"):
+                await cursor.executescript(statement)
+                rows = []
+            else:
+                await cursor.execute(statement)
+                rows = await cursor.fetchall()
+            query_seconds.labels("maintenance", query_label(statement)).observe(time.perf_counter() - start)
+        return [tuple(row) for row in rows]
+
+    def upsert_query(self, table: str, columns: List[str], conflict: List[str] = None, update: List[str] = None,
+                     where: str = None) -> str:
+        """Builds the INSERT statement used by upsert_many, with placeholders already substituted.
+
+        Args:
+            table (str): Target table name or {placeholder}.
+            columns (List[str]): Column names (or {placeholders}) matching each row tuple.
+            conflict (List[str], optional): Conflict target columns, required when update is given.
+            update (List[str], optional): Columns overwritten from the new row on conflict instead of skipping it.
+            where (str, optional): Condition the existing row must meet to be updated; others are left untouched.
+
+        Returns:
+            str: INSERT ... ON CONFLICT statement with one ? per column.
+        """
+        on_conflict = "ON CONFLICT DO NOTHING"
+        if update:
+            on_conflict = (
+                f"ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET "
+                + ", ".join(f"{column} = excluded.{column}" for column in update)
+                + (f" WHERE {where}" if where else "")
+            )
+
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) {on_conflict}"
+            .replace("{primary_table}", self.primary_table)
+            .replace("{secondary_table}", self.secondary_table)
+            .replace("{foreign_key}", self.foreign_key)
+            .replace("{news_table}", self.news_table)
+        )
+
+    async def execute_transaction(self, statements: List[Tuple[str, List[Tuple]]]) -> List[int]:
+        """Runs several statements, each once per parameter tuple, in a single write transaction.
+
+        Either every statement is committed or none is, so derived tables can be kept in step with their source.
+
+        Args:
+            statements (List[Tuple[str, List[Tuple]]]): (query, params_seq) pairs, run in order; the queries may use
+                {primary_table}, {secondary_table}, {news_table} or {foreign_key} placeholders.
+
+        Returns:
+            List[int]: Rows changed by each statement.
+        """
+        changed = []
+        async with self._get_cursor() as cursor:
+            for query, params_seq in statements:
+                query = (
+                    query.replace("{primary_table}", self.primary_table)
+                    .replace("{secondary_table}", self.secondary_table)
+                    .replace("{foreign_key}", self.foreign_key)
+                    .replace("{news_table}", self.news_table)
+                )
+                if query_logger.isEnabledFor(logging.DEBUG):
+                    query_logger.debug("execute_transaction: %s rows: %s", query, len(params_seq))
+                if not params_seq:
+                    changed.append(0)
+                    continue
+                start = time.perf_counter()
+                await cursor.executemany(query, params_seq)
+                query_seconds.labels("execute_transaction", query_label(query)).observe(time.perf_counter() - start)
+                changed.append(max(cursor.rowcount, 0))
+        return changed
+
+    async def upsert_many(self, table: str, columns: List[str], rows: List[Tuple], batch_size: int = 0,
+                          conflict: List[str] = None, update: List[str] = None) -> int:
+        """Inserts rows, skipping (or updating) any that collide with an existing UNIQUE constraint.
+
+        Args:
+            table (str): Target table name or {placeholder}.
+            columns (List[str]): Column names (or {placeholders}) matching each row tuple.
+            rows (List[Tuple]): Row tuples to insert.
+            batch_size (int, optional): Rows per transaction; 0 writes everything in one transaction.
+            conflict (List[str], optional): Conflict target columns, required when update is given.
+            update (List[str], optional): Columns overwritten from the new row on conflict instead of skipping it.
+
+        Returns:
+            int: Number of rows inserted or updated.
+        """
+        if not rows:
+            return 0
+
+        query = self.upsert_query(table, columns, conflict, update)
+
+        inserted = 0
+        step = batch_size or len(rows)
+        for start in range(0, len(rows), step):
+            async with self._get_cursor() as cursor:
+                began = time.perf_counter()
+                await cursor.executemany(query, rows[start:start + step])
+                query_seconds.labels("upsert_many", query_label(query)).observe(time.perf_counter() - began)
+                inserted += max(cursor.rowcount, 0)
+        return inserted
+
+    async def get_ticker_ids(self, tickers: List[str]) -> dict:
+        """Resolves tickers to primary table ids, creating missing tickers in one transaction.
+
+        Ids are remembered in memory, so known tickers never touch the database.
+
+        Args:
+            tickers (List[str]): Ticker symbols to resolve.
+
+        Returns:
+            dict: Mapping of ticker symbol to primary table id.
+        """
+        missing = [ticker for ticker in dict.fromkeys(tickers) if ticker not in self.ticker_ids]
+        if missing:
+            await self.upsert_many("{primary_table}", ["ticker"], [(ticker,) for ticker in missing])
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = await self.fetch_all(
+                    f"SELECT id, ticker FROM {{primary_table}} WHERE ticker IN ({','.join('?' * len(chunk))})",
+                    tuple(chunk)
+                )
+                self.ticker_ids.update({row["ticker"]: row["id"] for row in rows})
+        return {ticker: self.ticker_ids[ticker] for ticker in tickers if ticker in self.ticker_ids}
 
     async def fetch_one(self, query: str, params: Tuple = ()) -> dict:
         """Fetches a single row from the database as a dictionary.
@@ -126,14 +580,14 @@ class Database:
             .replace("{news_table}", self.news_table)
         )
 
-        os.makedirs('/data', exist_ok=True)
-        async with aiofiles.open('/data/query.txt', 'a') as f:
-            await f.write(f"query: {query}\n")
-            await f.write(f"params: {params}\n")
+        if query_logger.isEnabledFor(logging.DEBUG):
+            query_logger.debug("fetch_one: %s params: %s", query, params)
 
-        async with self._get_cursor() as cursor:
+        async with self._get_read_cursor() as cursor:
+            start = time.perf_counter()
             await cursor.execute(query, params)
             result = await cursor.fetchone()
+            query_seconds.labels("fetch_one", query_label(query)).observe(time.perf_counter() - start)
             return dict(result) if result else None
 
     async def fetch_all(self, query: str, params: Tuple = ()) -> List[dict]:
@@ -152,11 +606,37 @@ class Database:
             .replace("{foreign_key}", self.foreign_key)
             .replace("{news_table}", self.news_table)
         )
-        async with self._get_cursor() as cursor:
+        async with self._get_read_cursor() as cursor:
+            start = time.perf_counter()
             await cursor.execute(query, params)
             rows = await cursor.fetchall()
+            query_seconds.labels("fetch_all", query_label(query)).observe(time.perf_counter() - start)
             return [dict(row) for row in rows]
 
+    async def fetch_rows(self, query: str, params: Tuple = ()) -> List[tuple]:
+        """Fetches all rows as plain tuples, skipping the per-row dict conversion of fetch_all.
+
+        Args:
+            query (str): SQL query with {primary_table} or {secondary_table} placeholders.
+            params (Tuple, optional): Parameters for the SQL query.
+
+        Returns:
+            List[tuple]: Fetched rows in column order.
+        """
+        query = (
+            query.replace("{primary_table}", self.primary_table)
+            .replace("{secondary_table}", self.secondary_table)
+            .replace("{foreign_key}", self.foreign_key)
+            .replace("{news_table}", self.news_table)
+        )
+        async with self._get_read_cursor() as cursor:
+            cursor.row_factory = None
+            start = time.perf_counter()
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+            query_seconds.labels("fetch_rows", query_label(query)).observe(time.perf_counter() - start)
+            return rows
+
     async def fetch_by_reference(self, primary_id: Any) -> List[dict]:
         """Fetches rows from the secondary table referencing a specific primary table ID.
 
@@ -188,6 +668,21 @@ class Database:
     async def close(self):
         """Closes the database connection and resets the singleton instance."""
         if self.conn is not None:
+            for reader in self.readers:
+                await reader.close()
+            self.readers = []
             await self.conn.close()
             self.conn = None
-            Database._instance = None
\ No newline at end of file
+            Database._instance = None
+
+def _pool_stat(name: str) -> dict:
+    """Reads one pool counter of the Database singleton per pool, for the callback metrics below."""
+    if Database._instance is None:
+        return {}
+    return {(pool,): stats[name] for pool, stats in Database._instance.pool_stats.items()}
+
+_registry = MetricsRegistry()
+_registry.callback("tickermind_db_pool_in_use", "Connections currently held, per pool", lambda: _pool_stat("in_use"), ("pool",))
+_registry.callback("tickermind_db_pool_waiting", "Tasks waiting for a connection, per pool", lambda: _pool_stat("waiting"), ("pool",))
+_registry.callback("tickermind_db_pool_acquired_total", "Connections handed out, per pool", lambda: _pool_stat("acquired"), ("pool",), kind="counter")
+_registry.callback("tickermind_db_pool_wait_seconds_total", "Time spent waiting for a connection, per pool", lambda: _pool_stat("wait_total"), ("pool",), kind="counter")
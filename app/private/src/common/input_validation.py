@@ -1,48 +1,143 @@
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off"}
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"expected a boolean, got {value!r}")
+
+# Query and form values arrive as strings; each type converts them (and already-typed values) to itself
+_CONVERTERS = {
+    str: lambda value: str(value).strip(),
+    int: lambda value: value if isinstance(value, int) and not isinstance(value, bool) else int(str(value).strip()),
+    float: lambda value: float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else float(str(value).strip()),
+    bool: _to_bool,
+}
+
 class InputValidator:
-    RULES = {
-        "userId": {"type": int, "mandatory": True},
-        "username": {"type": str, "mandatory": False}
-    }
-    
-    def validate(self, inputs):
-        errors = []
-        for name, rule in self.RULES.items():
-            if name not in inputs:
-                if rule["mandatory"]:
+    """Validates and converts request parameters against a declared schema.
+
+    Rules are compiled once into one check function per parameter, so validating a request only runs those checks.
+
+    Supported rule keys:
+        type: str, int, float or bool (default str); string values are converted to it
+        mandatory: the parameter must be present and non-empty
+        default: value used when the parameter is absent or empty
+        min / max: inclusive bounds for numbers, or lengths for strings
+        choices: allowed values (compared after conversion; strings case-insensitively)
+        pattern: regular expression a string value must fully match
+    """
+
+    def __init__(self, rules: Dict[str, dict], allow_unknown: bool = False):
+        """
+        Parameters:
+        - rules: Rule dict per parameter name
+        - allow_unknown: Pass through parameters without a rule instead of rejecting them
+        """
+        self.rules = rules
+        self.allow_unknown = allow_unknown
+        self.checks: List[Tuple[str, Callable[[Any], Any], dict]] = [
+            (name, self._compile(name, rule), rule) for name, rule in rules.items()
+        ]
+
+    @staticmethod
+    def _compile(name: str, rule: dict) -> Callable[[Any], Any]:
+        """Builds the conversion and check function for one parameter."""
+        kind = rule.get("type", str)
+        if kind not in _CONVERTERS:
+            raise TypeError(f"Unsupported type for {name}: {kind}")
+        convert = _CONVERTERS[kind]
+        low, high = rule.get("min"), rule.get("max")
+        choices = rule.get("choices")
+        if choices is not None and kind is str:
+            choices = {choice.lower(): choice for choice in choices}
+        pattern = re.compile(rule["pattern"]) if rule.get("pattern") else None
+
+        def check(value: Any) -> Any:
+            try:
+                value = convert(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid type for {name}: expected {kind.__name__}, got {value!r}")
+            size = len(value) if kind is str else value
+            if low is not None and size < low:
+                raise ValueError(f"{name} must be at least {low}{' characters' if kind is str else ''}")
+            if high is not None and size > high:
+                raise ValueError(f"{name} must be at most {high}{' characters' if kind is str else ''}")
+            if pattern is not None and not pattern.fullmatch(value):
+                raise ValueError(f"Invalid format for {name}: {value!r}")
+            if choices is not None:
+                if kind is str:
+                    if value.lower() not in choices:
+                        raise ValueError(f"Invalid value for {name}: expected one of {sorted(choices.values())}")
+                    value = choices[value.lower()]
+                elif value not in choices:
+                    raise ValueError(f"Invalid value for {name}: expected one of {sorted(choices)}")
+            return value
+
+        return check
+
+    def validate(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Validates inputs and returns them converted, with defaults filled in.
+
+        Raises:
+            ValueError: Listing every problem found, separated by "; ".
+        """
+        errors, result = [], {}
+        for name, check, rule in self.checks:
+            value = inputs.get(name)
+            if value is None or (isinstance(value, str) and not value.strip()):
+                if rule.get("mandatory"):
                     errors.append(f"Missing mandatory input: {name}")
+                elif "default" in rule:
+                    result[name] = rule["default"]
                 continue
-            
-            value = inputs[name]
-            if value is not None and not isinstance(value, rule["type"]):
-                errors.append(f"Invalid type for {name}: expected {rule['type'].__name__}, got {type(value).__name__}")
-        
+            try:
+                result[name] = check(value)
+            except ValueError as e:
+                errors.append(str(e))
+
+        for name, value in inputs.items():
+            if name not in self.rules:
+                if self.allow_unknown:
+                    result[name] = value
+                else:
+                    errors.append(f"Unknown input: {name}")
+
         if errors:
             raise ValueError("; ".join(errors))
-        return True
+        return result
 
 
 # Example usage:
 '''
-validator = InputValidator()
-    
-    # Valid input
+validator = InputValidator({
+    "userId": {"type": int, "mandatory": True, "min": 1},
+    "username": {"type": str, "mandatory": False, "max": 32}
+})
+
+    # Valid input; "123" is converted to 123
     try:
-        validator.validate({"userId": 123, "username": "john"})
-        print("Validation passed")
+        print(validator.validate({"userId": "123", "username": "john"}))
     except ValueError as e:
         print(f"Validation failed: {e}")
-    
+
     # Invalid: missing mandatory userId
     try:
         validator.validate({"username": "john"})
-        print("Validation passed")
     except ValueError as e:
         print(f"Validation failed: {e}")
-    
-    # Invalid: wrong type for userId
+
+    # Invalid: userId is not a number
     try:
-        validator.validate({"userId": "123", "username": "john"})
-        print("Validation passed")
+        validator.validate({"userId": "abc", "username": "john"})
     except ValueError as e:
         print(f"Validation failed: {e}")
-'''
\ No newline at end of file
+'''
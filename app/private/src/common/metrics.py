@@ -0,0 +1,221 @@
+import math
+from abc import ABC, abstractmethod
+import re
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Sequence, Tuple, Union
+
+# Seconds; spans sub-millisecond queries up to minute-long jobs
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One count per bucket plus the +Inf bucket; made cumulative only when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+class Metric(ABC):
+    """A named metric with optional labels; each distinct label value tuple gets its own child."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], object] = {}
+
+    @abstractmethod
+    def _new_child(self):
+        """Returns a new child holding the metric's value(s) for one label value tuple."""
+
+    def labels(self, *values):
+        """Returns the child for these label values (in labelnames order), creating it on first use."""
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self.children[values] = self._new_child()
+        return child
+
+    def samples(self):
+        """Yields (suffix, labels, value) for every sample of the metric."""
+        for values, child in self.children.items():
+            yield "", dict(zip(self.labelnames, values)), child.value
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self):
+        for values, child in self.children.items():
+            labels = dict(zip(self.labelnames, values))
+            total = 0
+            for bound, count in zip(self.bounds + (math.inf,), child.counts):
+                total += count
+                yield "_bucket", dict(labels, le=bound), total
+            yield "_sum", labels, child.sum
+            yield "_count", labels, total
+
+class CallbackMetric(Metric):
+    """A counter or gauge read from a function at scrape time, for values already tracked elsewhere (pool sizes,
+    cache counters); it costs nothing between scrapes."""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str],
+                 collect: Callable[[], Union[float, Dict[Tuple[str, ...], float]]]):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def _new_child(self):
+        raise TypeError(f"{self.name} is read from its callback and cannot be updated")
+
+    def samples(self):
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            yield "", dict(zip(self.labelnames, label_values)), value
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    return repr(float(value))
+
+class MetricsRegistry:
+    """Singleton registry of in-process metrics, rendered in the Prometheus text exposition format.
+
+    Updating a metric is a dict lookup and an addition on the event loop thread, so instrumentation stays on in
+    production; all formatting happens when /metrics is scraped.
+    """
+    _instance = None
+
+    def __new__(cls):
+        """Ensures a single registry per process.
+
+        Returns:
+            MetricsRegistry: Singleton instance of the MetricsRegistry class.
+        """
+        if cls._instance is None:
+            cls._instance = super(MetricsRegistry, cls).__new__(cls)
+            cls._instance.metrics = OrderedDict()
+        return cls._instance
+
+    def _register(self, metric_class, name: str, *args, **kwargs) -> Metric:
+        """Returns the metric registered under name, creating it first; modules may ask for the same metric twice."""
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = metric_class(name, *args, **kwargs)
+        elif not isinstance(metric, metric_class):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def callback(self, name: str, documentation: str, collect: Callable, labelnames: Sequence[str] = (),
+                 kind: str = "gauge") -> CallbackMetric:
+        """Registers a metric whose value (or {label values: value} dict) is returned by collect() at scrape time."""
+        return self._register(CallbackMetric, name, documentation, kind, labelnames, collect)
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text format (version 0.0.4)."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                if labels:
+                    label_text = ",".join(
+                        f'{key}="{_format_value(val) if key == "le" else _escape(val)}"' for key, val in labels.items()
+                    )
+                    lines.append(f"{metric.name}{suffix}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{metric.name}{suffix} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+_STATEMENT = re.compile(r"\b(INSERT\s+(?:OR\s+\w+\s+)?INTO|UPDATE|DELETE\s+FROM|SELECT)\b", re.IGNORECASE)
+_TABLE = re.compile(r"\b(?:INTO|UPDATE|FROM)\s+(\w+)", re.IGNORECASE)
+
+@lru_cache(maxsize=2048)
+def query_label(query: str) -> str:
+    """Short, low-cardinality name of a SQL statement: its verb and first table (e.g. "select news_table")."""
+    statement = _STATEMENT.search(query)
+    if statement is None:
+        return query.split(None, 1)[0].lower() if query.strip() else "empty"
+    verb = statement.group(1).split()[0].lower()
+    table = _TABLE.search(query, statement.start())
+    return f"{verb} {table.group(1)}" if table else verb
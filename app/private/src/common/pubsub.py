@@ -0,0 +1,116 @@
+import asyncio
+import os
+from typing import Dict, Iterable, List, Optional
+from common.metrics import MetricsRegistry
+
+# Most tickers with undelivered changes one subscriber may hold before it is asked to resync instead
+HUB_MAX_PENDING = int(os.getenv("HUB_MAX_PENDING", "5000"))
+
+class Subscription:
+    """One client's view of the hub: the tickers it follows and its coalesced, undelivered changes."""
+
+    def __init__(self, tickers: Optional[Iterable[str]] = None, max_pending: int = HUB_MAX_PENDING):
+        """
+        Parameters:
+        - tickers: Tickers to receive changes for; None receives every ticker
+        - max_pending: Most tickers with undelivered changes before the subscription overflows
+        """
+        self.tickers = set(tickers) if tickers else None
+        self.max_pending = max_pending
+        # ticker -> fields changed since the last delivery; a newer value for a field replaces the older one
+        self.pending: Dict[str, dict] = {}
+        self.overflowed = False
+        self.event = asyncio.Event()
+
+    def offer(self, ticker: str, fields: dict):
+        if self.tickers is not None and ticker not in self.tickers:
+            return
+        if ticker in self.pending:
+            self.pending[ticker].update(fields)
+        elif self.overflowed:
+            return
+        elif len(self.pending) >= self.max_pending:
+            # A consumer this far behind gets a full resync; dropping its backlog keeps memory bounded
+            self.pending.clear()
+            self.overflowed = True
+        else:
+            self.pending[ticker] = dict(fields)
+        self.event.set()
+
+    async def next(self, timeout: float) -> Optional[List[dict]]:
+        """Waits for changes and takes everything pending.
+
+        Returns:
+            Optional[List[dict]]: One {"ticker": ..., **fields} delta per changed ticker; an empty list when the
+            subscriber overflowed and must resync; None if nothing changed within the timeout.
+        """
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.event.clear()
+        if self.overflowed:
+            self.overflowed = False
+            return []
+        pending, self.pending = self.pending, {}
+        return [{"ticker": ticker, **fields} for ticker, fields in pending.items()]
+
+class Hub:
+    """Singleton in-process pub/sub hub for live ticker updates.
+
+    Jobs publish the fields of a ticker they have just committed; only fields whose value differs from the last
+    published one reach subscribers, and each subscriber coalesces changes per ticker until it reads them.
+    """
+    _instance = None
+
+    def __new__(cls):
+        """Ensures a single instance of the Hub class.
+
+        Returns:
+            Hub: Singleton instance of the Hub class.
+        """
+        if cls._instance is None:
+            cls._instance = super(Hub, cls).__new__(cls)
+            cls._instance.subscribers = set()
+            # ticker -> last published value of every field
+            cls._instance.latest = {}
+            cls._instance.counts = {"published": 0, "unchanged": 0, "overflows": 0}
+        return cls._instance
+
+    def subscribe(self, tickers: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = Subscription(tickers)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def publish(self, ticker: str, fields: dict):
+        """Publishes the current values of some fields of a ticker; unchanged fields are dropped."""
+        latest = self.latest.setdefault(ticker, {})
+        delta = {name: value for name, value in fields.items() if latest.get(name, object()) != value}
+        if not delta:
+            self.counts["unchanged"] += 1
+            return
+        latest.update(delta)
+        self.counts["published"] += 1
+        for subscription in self.subscribers:
+            was_overflowed = subscription.overflowed
+            subscription.offer(ticker, delta)
+            if subscription.overflowed and not was_overflowed:
+                self.counts["overflows"] += 1
+
+    def stats(self) -> dict:
+        """Returns publish counters, the number of subscribers and their total pending tickers."""
+        return dict(
+            self.counts,
+            subscribers=len(self.subscribers),
+            pending=sum(len(subscription.pending) for subscription in self.subscribers)
+        )
+
+_registry = MetricsRegistry()
+_registry.callback(
+    "tickermind_stream_events_total", "Live ticker changes by outcome (published, unchanged, subscriber overflows)",
+    lambda: {(outcome,): count for outcome, count in Hub().counts.items()}, ("outcome",), kind="counter"
+)
+_registry.callback("tickermind_stream_subscribers", "Open live streams", lambda: len(Hub().subscribers))
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from common.metrics import MetricsRegistry
+
+# Maximum number of cached responses and how long one may be served without a version change
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+class DataVersions:
+    """Singleton of per-domain data version counters.
+
+    Jobs bump a domain after committing writes to it ("prices", "news", "sentiment", "indicators"); cached
+    responses built from an older version of any domain they read are then never served again.
+    """
+    _instance = None
+
+    def __new__(cls):
+        """Ensures a single instance of the DataVersions class.
+
+        Returns:
+            DataVersions: Singleton instance of the DataVersions class.
+        """
+        if cls._instance is None:
+            cls._instance = super(DataVersions, cls).__new__(cls)
+            # Start from the boot time so ETags from a previous process never match after a restart
+            cls._instance.epoch = int(time.time())
+            cls._instance.versions = {}
+        return cls._instance
+
+    def bump(self, *domains: str):
+        """Marks each domain as changed."""
+        for domain in domains:
+            self.versions[domain] = self.versions.get(domain, 0) + 1
+
+    def get(self, domains: Iterable[str]) -> Tuple[int, ...]:
+        """Returns the boot epoch followed by the current version of each domain."""
+        return (self.epoch, *(self.versions.get(domain, 0) for domain in domains))
+
+class ResponseCache:
+    """Singleton LRU cache of serialized responses, valid while their data versions are current and within the TTL."""
+    _instance = None
+
+    def __new__(cls, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        """Ensures a single instance of the ResponseCache class.
+
+        Args:
+            max_size (int): Maximum number of cached responses.
+            ttl (float): Seconds a response may be served before it is rebuilt, even without a version change.
+
+        Returns:
+            ResponseCache: Singleton instance of the ResponseCache class.
+        """
+        if cls._instance is None:
+            cls._instance = super(ResponseCache, cls).__new__(cls)
+            cls._instance.max_size = max_size
+            cls._instance.ttl = ttl
+            # key -> (versions, expires, body)
+            cls._instance.entries = OrderedDict()
+            # Builds in progress, so concurrent misses for one key share a single query
+            cls._instance.inflight = {}
+            cls._instance.counts = {"hits": 0, "misses": 0, "shared": 0, "not_modified": 0}
+        return cls._instance
+
+    @staticmethod
+    def key(cmd: str, varsIn: Dict[str, str]) -> str:
+        """Normalizes a command and its parameters (order-insensitive, Cmd excluded) into a cache key."""
+        params = sorted((name, str(value).strip()) for name, value in varsIn.items() if name != "Cmd")
+        return cmd + "?" + "&".join(f"{name}={value}" for name, value in params)
+
+    @staticmethod
+    def etag(key: str, versions: Tuple[int, ...]) -> str:
+        """Returns the ETag of a response for key at the given data versions."""
+        digest = hashlib.sha1(f"{key}|{versions}".encode()).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+    def not_modified(self):
+        self.counts["not_modified"] += 1
+
+    def get(self, key: str, versions: Tuple[int, ...]) -> Optional[bytes]:
+        """Returns the cached body for key if it was built at these versions and has not expired."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        entry_versions, expires, body = entry
+        if entry_versions != versions or expires < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return body
+
+    def put(self, key: str, versions: Tuple[int, ...], body: bytes):
+        self.entries[key] = (versions, time.monotonic() + self.ttl, body)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    async def get_or_build(self, key: str, versions: Tuple[int, ...], build: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Returns the cached body for key, building it once if missing, stale or expired.
+
+        Args:
+            key (str): Cache key from ResponseCache.key.
+            versions (Tuple[int, ...]): Data versions read before building, from DataVersions.get.
+            build (Callable): Coroutine function producing the serialized response.
+
+        Returns:
+            bytes: Serialized response body.
+        """
+        body = self.get(key, versions)
+        if body is not None:
+            self.counts["hits"] += 1
+            return body
+
+        inflight = self.inflight.get(key)
+        if inflight is not None and inflight[0] == versions:
+            self.counts["shared"] += 1
+            return await asyncio.shield(inflight[1])
+
+        self.counts["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = (versions, future)
+        try:
+            body = await build()
+            # A write committed while building bumps the versions, so this entry is simply never served
+            self.put(key, versions, body)
+            future.set_result(body)
+            return body
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved so an unshared failure is not reported as unhandled
+            future.exception()
+            raise
+        finally:
+            if self.inflight.get(key, (None, None))[1] is future:
+                del self.inflight[key]
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current number of cached responses."""
+        lookups = self.counts["hits"] + self.counts["misses"] + self.counts["shared"]
+        return dict(
+            self.counts,
+            size=len(self.entries),
+            hit_rate=(self.counts["hits"] + self.counts["shared"]) / lookups if lookups else 0.0
+        )
+
+_registry = MetricsRegistry()
+_registry.callback(
+    "tickermind_response_cache_lookups_total", "Response cache lookups by result (hits, misses, shared builds, 304s)",
+    lambda: {(result,): count for result, count in ResponseCache().counts.items()}, ("result",), kind="counter"
+)
+_registry.callback("tickermind_response_cache_entries", "Responses currently cached", lambda: len(ResponseCache().entries))
@@ -0,0 +1,284 @@
+import math
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from common.database import Database
+from fastapi import HTTPException
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__, log_file="tasks.log")
+
+# Symbol directory in the nasdaqtrader.com format (nasdaqlisted.txt / otherlisted.txt) or one symbol per line
+UNIVERSE_FILE = os.getenv("UNIVERSE_FILE", "../data/nasdaqlisted.txt")
+UNIVERSE_INCLUDE_ETFS = os.getenv("UNIVERSE_INCLUDE_ETFS", "false").lower() == "true"
+BACKFILL_YEARS = int(os.getenv("BACKFILL_YEARS", "5"))
+# Days of history requested per ticker in one provider call, and tickers processed together
+BACKFILL_WINDOW_DAYS = int(os.getenv("BACKFILL_WINDOW_DAYS", "365"))
+BACKFILL_SHARD_SIZE = int(os.getenv("BACKFILL_SHARD_SIZE", "200"))
+# Consecutive failed fetches after which a ticker is marked failed instead of retried on the next run
+BACKFILL_MAX_ATTEMPTS = int(os.getenv("BACKFILL_MAX_ATTEMPTS", "5"))
+
+# Seconds per day; components.stocks.bars (and with it pandas) is only imported by the functions that load bars
+DAY = 86400
+
+_SYMBOL = re.compile(r"^[A-Z0-9.\-]+$")
+
+def load_listing(path: str = UNIVERSE_FILE) -> List[str]:
+    """Reads the symbol list, skipping test issues (and ETFs unless UNIVERSE_INCLUDE_ETFS=true).
+
+    Symbols are converted to Yahoo notation (BRK.B -> BRK-B); symbols Yahoo cannot quote (e.g. with $) are skipped.
+
+    Returns:
+        List[str]: Unique symbols in file order; empty if the file does not exist.
+    """
+    if not os.path.exists(path):
+        logger.warning(f"Universe file {path} not found")
+        return []
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if not lines:
+        return []
+
+    symbols = []
+    if "|" in lines[0]:
+        header = lines[0].split("|")
+        symbol_column = next(header.index(name) for name in ("Symbol", "NASDAQ Symbol", "ACT Symbol") if name in header)
+        test_column = header.index("Test Issue") if "Test Issue" in header else None
+        etf_column = header.index("ETF") if "ETF" in header else None
+        for line in lines[1:]:
+            if line.startswith("File Creation Time"):
+                continue
+            fields = line.split("|")
+            if len(fields) != len(header):
+                continue
+            if test_column is not None and fields[test_column] == "Y":
+                continue
+            if etf_column is not None and fields[etf_column] == "Y" and not UNIVERSE_INCLUDE_ETFS:
+                continue
+            symbols.append(fields[symbol_column])
+    else:
+        symbols = [line for line in lines if not line.startswith("#")]
+
+    symbols = [symbol.strip().upper().replace(".", "-") for symbol in symbols]
+    return list(dict.fromkeys(symbol for symbol in symbols if _SYMBOL.match(symbol)))
+
+def _backfill_start() -> int:
+    """First bar time a backfill loads: BACKFILL_YEARS ago, aligned to whole windows so tickers share windows."""
+    window = BACKFILL_WINDOW_DAYS * DAY
+    start = int(time.time()) - BACKFILL_YEARS * 365 * DAY
+    return start - start % window
+
+async def sync_universe(path: str = UNIVERSE_FILE, interval="1d") -> Dict[str, int]:
+    """Diffs the listing file against the stocks table and queues backfill for every ticker in the universe.
+
+    New symbols are added to stocks, symbols no longer listed leave the universe (their data is kept), and each
+    added ticker gets a checkpoint starting BACKFILL_YEARS back; a ticker that returns resumes from its old one,
+    with its failed attempts forgotten.
+
+    Returns:
+        Dict[str, int]: Numbers of added, removed and total universe tickers, and of newly queued backfills.
+    """
+    from components.stocks.bars import interval_seconds
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    symbols = load_listing(path)
+    if not symbols:
+        return {"added": 0, "removed": 0, "total": 0, "queued": 0}
+
+    current = {row[0] for row in await db.fetch_rows("SELECT ticker FROM {primary_table} WHERE in_universe = 1")}
+    listed = set(symbols)
+    added = [symbol for symbol in symbols if symbol not in current]
+    removed = [ticker for ticker in current if ticker not in listed]
+
+    ticker_ids = await db.get_ticker_ids(added)
+    seconds = interval_seconds(interval)
+    _, _, queued = await db.execute_transaction([
+        ("UPDATE {primary_table} SET in_universe = 1 WHERE id = ?", [(ticker_ids[symbol],) for symbol in added]),
+        ("UPDATE {primary_table} SET in_universe = 0 WHERE ticker = ?", [(ticker,) for ticker in removed]),
+        ("""
+            INSERT INTO backfill_checkpoint ({foreign_key}, interval, next_ts, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT ({foreign_key}, interval) DO UPDATE SET status = 'pending', attempts = 0, updated_at = excluded.updated_at
+            WHERE status IN ('done', 'failed')
+        """, [(ticker_ids[symbol], seconds, _backfill_start(), int(time.time())) for symbol in added]),
+    ])
+    logger.info(f"Universe: {len(symbols)} tickers, {len(added)} added, {len(removed)} removed")
+    return {"added": len(added), "removed": len(removed), "total": len(symbols), "queued": queued}
+
+class BackfillProgress:
+    """Throughput and ETA of a running backfill, counted in windows (one ticker-window is one unit of work)."""
+
+    def __init__(self, tickers: int, windows: int):
+        self.tickers = tickers
+        self.windows = windows
+        self.windows_done = 0
+        self.rows = 0
+        self.tickers_done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    def status(self) -> dict:
+        elapsed = (self.finished or time.monotonic()) - self.started
+        rate = self.windows_done / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.windows - self.windows_done, 0)
+        return {
+            "running": self.finished is None,
+            "tickers": self.tickers,
+            "tickers_done": self.tickers_done,
+            "failed": self.failed,
+            "windows": self.windows,
+            "windows_done": self.windows_done,
+            "rows": self.rows,
+            "elapsed": elapsed,
+            "rows_per_second": self.rows / elapsed if elapsed > 0 else 0.0,
+            "windows_per_second": rate,
+            "eta_seconds": remaining / rate if rate > 0 else None,
+        }
+
+# Progress of the current (or last) backfill run
+progress: Optional[BackfillProgress] = None
+
+async def _load_shard(fetcher, shard: List[tuple], seconds: int, interval: str, end: int) -> Dict[str, dict]:
+    """Loads one shard window by window, saving each ticker's checkpoint after every window it completes.
+
+    Returns:
+        Dict[str, dict]: Latest bar per ticker that received data, in the form store_prices accepts.
+    """
+    from components.data_collection.yfinance import latest_row
+    from components.stocks.bars import append_bars, frame_to_rows
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    window = BACKFILL_WINDOW_DAYS * DAY
+    positions = {ticker: (stock_id, next_ts) for stock_id, ticker, next_ts in shard}
+    latest = {}
+
+    while positions:
+        # Tickers resumed from different checkpoints are fetched in separate groups, one window each
+        window_start = min(next_ts for _, next_ts in positions.values())
+        group = [ticker for ticker, (_, next_ts) in positions.items() if next_ts == window_start]
+        window_end = window_start + window
+        frames = await fetcher.fetch(
+            group, period="max", interval=interval,
+            start=datetime.fromtimestamp(window_start, timezone.utc).strftime("%Y-%m-%d"),
+            end=datetime.fromtimestamp(window_end, timezone.utc).strftime("%Y-%m-%d")
+        )
+
+        rows, done, advanced, failed = [], [], [], []
+        for ticker in group:
+            stock_id, _ = positions[ticker]
+            frame = frames.get(ticker)
+            if frame is None:
+                failed.append((int(time.time()), BACKFILL_MAX_ATTEMPTS, stock_id, seconds))
+                del positions[ticker]
+                continue
+            ticker_rows = frame_to_rows(stock_id, interval, frame)
+            rows += ticker_rows
+            if ticker_rows:
+                latest[ticker] = latest_row(ticker, frame)
+            advanced.append((window_end, len(ticker_rows), window_end >= end, int(time.time()), stock_id, seconds))
+            if window_end >= end:
+                done.append(ticker)
+                del positions[ticker]
+            else:
+                positions[ticker] = (stock_id, window_end)
+
+        await append_bars(rows)
+        # Checkpoints only move after the window's bars are committed; a crash in between refetches one window
+        await db.execute_transaction([
+            ("""
+                UPDATE backfill_checkpoint
+                SET next_ts = ?, rows = rows + ?, status = CASE WHEN ? THEN 'done' ELSE 'pending' END, attempts = 0,
+                    updated_at = ?
+                WHERE {foreign_key} = ? AND interval = ?
+            """, advanced),
+            ("""
+                UPDATE backfill_checkpoint
+                SET attempts = attempts + 1, updated_at = ?,
+                    status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END
+                WHERE {foreign_key} = ? AND interval = ?
+            """, failed),
+        ])
+        progress.windows_done += len(advanced)
+        progress.rows += len(rows)
+        progress.tickers_done += len(done)
+        progress.failed += len(failed)
+        if failed:
+            # A failed ticker's remaining windows will not be loaded in this run
+            progress.windows -= len(failed) * math.ceil((end - window_start) / window)
+    return latest
+
+async def backfill(interval: str = "1d") -> dict:
+    """Loads missing history for every pending universe ticker, shard by shard, resuming from saved checkpoints.
+
+    After each shard the indicator state of its tickers is rebuilt over the new history, and their latest bar is
+    stored like a regular price update so the ticker snapshot and live subscribers pick them up.
+
+    Returns:
+        dict: Final progress (see BackfillProgress.status).
+    """
+    from components.data_collection.yfinance import get_fetcher
+    from components.stocks.bars import interval_seconds
+    from components.stocks.indicator_state import rebuild
+    from utils.tasks import store_prices
+    global progress
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    seconds = interval_seconds(interval)
+    window = BACKFILL_WINDOW_DAYS * DAY
+    end = int(time.time())
+
+    pending = await db.fetch_rows(
+        """
+        SELECT c.{foreign_key}, s.ticker, c.next_ts FROM backfill_checkpoint c
+        JOIN {primary_table} s ON s.id = c.{foreign_key}
+        WHERE c.interval = ? AND c.status = 'pending' AND s.in_universe = 1
+        ORDER BY c.{foreign_key}
+        """,
+        (seconds,)
+    )
+    progress = BackfillProgress(len(pending), sum(math.ceil(max(end - next_ts, 1) / window) for _, _, next_ts in pending))
+    if not pending:
+        progress.finished = time.monotonic()
+        return progress.status()
+
+    fetcher = get_fetcher()
+    for start in range(0, len(pending), BACKFILL_SHARD_SIZE):
+        shard = pending[start:start + BACKFILL_SHARD_SIZE]
+        latest = await _load_shard(fetcher, shard, seconds, interval, end)
+        if latest:
+            ids = await db.get_ticker_ids(list(latest))
+            await rebuild(list(ids.values()), seconds)
+            await store_prices(db, list(latest.values()), interval=interval)
+        status = progress.status()
+        eta = f"{status['eta_seconds']:.0f}s" if status["eta_seconds"] is not None else "unknown"
+        logger.info(
+            f"Backfill: {status['tickers_done']}/{status['tickers']} tickers, {status['rows']} bars, "
+            f"{status['rows_per_second']:.0f} bars/s, ETA {eta}"
+        )
+    progress.finished = time.monotonic()
+    return progress.status()
+
+async def universe_status(interval: str = "1d") -> dict:
+    """Returns universe size, checkpoint counts by status and the progress of the current or last backfill."""
+    from components.stocks.bars import interval_seconds
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    size = await db.fetch_one("SELECT COUNT(*) AS count FROM {primary_table} WHERE in_universe = 1")
+    rows = await db.fetch_rows(
+        "SELECT status, COUNT(*), SUM(rows) FROM backfill_checkpoint WHERE interval = ? GROUP BY status",
+        (interval_seconds(interval),)
+    )
+    return {
+        "universe": size["count"],
+        "checkpoints": {status: {"tickers": count, "rows": total or 0} for status, count, total in rows},
+        "backfill": progress.status() if progress else None,
+    }
+
+class universe:
+    def __init__(self):
+        pass
+
+    async def Gsad(self, cmd: str, varsIn: dict = None) -> dict | None:
+        match cmd:
+            case "Status":
+                return {"data": await universe_status(), "status": 200}
+            case _:
+                raise HTTPException(400, "Invalid Cmd")
@@ -1,15 +1,194 @@
-import yfinance as yf
+import asyncio
 import os
+from abc import ABC, abstractmethod
 import pandas as pd
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Union
+from common.metrics import MetricsRegistry
+from common.rate_limit import RateLimiter
 from utils.logs import setup_logger
 
 logger = setup_logger(__name__)
 
+CHUNK_SIZE = int(os.getenv("MARKET_DATA_CHUNK_SIZE", "100"))
+MAX_WORKERS = int(os.getenv("MARKET_DATA_WORKERS", "4"))
+REQUESTS_PER_SECOND = float(os.getenv("MARKET_DATA_RPS", "2"))
+RETRIES = int(os.getenv("MARKET_DATA_RETRIES", "2"))
+
+_registry = MetricsRegistry()
+fetch_seconds = _registry.histogram("tickermind_provider_fetch_seconds", "Provider request time (one chunk or page)", ("provider",))
+fetch_errors = _registry.counter("tickermind_provider_fetch_errors_total", "Provider requests that raised", ("provider",))
+fetch_missing = _registry.counter("tickermind_provider_missing_total", "Tickers still without data after all retries", ("provider",))
+
 class StockDataError(Exception):
     """Custom exception for stock data fetching errors."""
     pass
 
+class MarketDataProvider(ABC):
+    """Source of OHLCV history. Implementations are synchronous and are called from worker threads."""
+
+    @abstractmethod
+    def fetch(self, tickers: List[str], period: str, interval: str, start: Optional[str] = None,
+              end: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Fetch history for several tickers in one request, either the trailing `period` or the [start, end) date range.
+
+        Returns a frame with Open/High/Low/Close/Volume columns for every ticker that returned data.
+        Tickers missing from the result are treated as failed.
+        """
+
+class YFinanceProvider(MarketDataProvider):
+    """Fetches multi-symbol history from Yahoo Finance with a single yf.download call per chunk."""
+
+    def fetch(self, tickers: List[str], period: str, interval: str, start: Optional[str] = None,
+              end: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        # Imported on first use: yfinance and its HTTP stack add about a second to the import of this module
+        import yfinance as yf
+        window = {"start": start, "end": end} if start else {"period": period}
+        df = yf.download(
+            tickers, interval=interval, group_by="ticker",
+            auto_adjust=False, threads=False, progress=False, **window
+        )
+        frames = {}
+        for ticker in tickers:
+            if isinstance(df.columns, pd.MultiIndex):
+                if ticker not in df.columns.get_level_values(0):
+                    continue
+                frame = df[ticker]
+            else:
+                frame = df
+            frame = frame.dropna(how="all")
+            # A range before a listing or after a delisting is legitimately empty; only trailing periods require data
+            if not frame.empty or start:
+                frames[ticker] = frame
+        return frames
+
+class StaticProvider(MarketDataProvider):
+    """Serves pre-built frames from memory; used to run the fetch path without network access."""
+
+    def __init__(self, frames: Dict[str, pd.DataFrame], failing: Optional[Dict[str, int]] = None):
+        """
+        Parameters:
+        - frames: History per ticker
+        - failing: Number of times each ticker should raise before succeeding
+        """
+        self.frames = frames
+        self.failing = dict(failing or {})
+        self.calls = []
+
+    def fetch(self, tickers: List[str], period: str, interval: str, start: Optional[str] = None,
+              end: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        self.calls.append(list(tickers))
+        for ticker in tickers:
+            if self.failing.get(ticker, 0) > 0:
+                self.failing[ticker] -= 1
+                raise StockDataError(f"Simulated failure for {ticker}")
+        frames = {ticker: self.frames[ticker] for ticker in tickers if ticker in self.frames}
+        if start:
+            # Like Yahoo, a ticker that exists but has no bars in the range comes back as an empty frame
+            frames = {ticker: frame[(frame.index >= start) & (frame.index < end)] for ticker, frame in frames.items()}
+        return frames
+
+class PriceFetcher:
+    """Fetches history for many tickers in chunks on a bounded thread pool, retrying failed tickers on their own."""
+
+    def __init__(self, provider: MarketDataProvider = None, chunk_size: int = CHUNK_SIZE, max_workers: int = MAX_WORKERS,
+                 requests_per_second: float = REQUESTS_PER_SECOND, retries: int = RETRIES):
+        self.provider = provider or YFinanceProvider()
+        self.chunk_size = max(1, chunk_size)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="market-data")
+        self.semaphore = asyncio.Semaphore(max_workers)
+        self.limiter = RateLimiter(requests_per_second)
+        self.retries = retries
+
+    async def _fetch_chunk(self, tickers: List[str], period: str, interval: str, start: Optional[str],
+                           end: Optional[str]) -> Dict[str, pd.DataFrame]:
+        async with self.semaphore:
+            await self.limiter.wait()
+            loop = asyncio.get_running_loop()
+            provider = type(self.provider).__name__
+            began = time.perf_counter()
+            try:
+                return await loop.run_in_executor(self.executor, self.provider.fetch, tickers, period, interval, start, end)
+            except Exception:
+                fetch_errors.labels(provider).inc()
+                raise
+            finally:
+                fetch_seconds.labels(provider).observe(time.perf_counter() - began)
+
+    async def fetch(self, tickers: List[str], period: str, interval: str, start: Optional[str] = None,
+                    end: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Fetch history for every ticker, either the trailing `period` or the [start, end) date range.
+        A failing chunk or ticker never fails the others.
+
+        Returns a frame per ticker that succeeded; failed tickers are logged and left out.
+        """
+        results: Dict[str, pd.DataFrame] = {}
+        chunks = [tickers[i:i + self.chunk_size] for i in range(0, len(tickers), self.chunk_size)]
+
+        for attempt in range(self.retries + 1):
+            outcomes = await asyncio.gather(
+                *(self._fetch_chunk(chunk, period, interval, start, end) for chunk in chunks), return_exceptions=True
+            )
+            failed = []
+            for chunk, outcome in zip(chunks, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.warning(f"Fetching {len(chunk)} tickers failed (attempt {attempt + 1}): {outcome}")
+                    failed.extend(chunk)
+                    continue
+                results.update(outcome)
+                failed.extend(ticker for ticker in chunk if ticker not in outcome)
+
+            if not failed:
+                break
+            if attempt < self.retries:
+                # Retry each failed ticker alone so one bad symbol cannot sink its neighbours again
+                chunks = [[ticker] for ticker in failed]
+                await asyncio.sleep(2 ** attempt)
+            else:
+                fetch_missing.labels(type(self.provider).__name__).inc(len(failed))
+                logger.warning(f"No data for {len(failed)} tickers after {self.retries + 1} attempts: {failed[:20]}")
+        return results
+
+_fetcher: Optional[PriceFetcher] = None
+
+def get_fetcher() -> PriceFetcher:
+    """Return the shared fetcher, creating a Yahoo Finance backed one on first use."""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = PriceFetcher()
+    return _fetcher
+
+def set_provider(provider: MarketDataProvider, **kwargs) -> PriceFetcher:
+    """Replace the shared fetcher with one backed by `provider` (for example a StaticProvider in tests)."""
+    global _fetcher
+    _fetcher = PriceFetcher(provider, **kwargs)
+    return _fetcher
+
+def _optional(value) -> Optional[float]:
+    return None if pd.isna(value) else float(value)
+
+def latest_row(ticker: str, df: pd.DataFrame) -> Optional[dict]:
+    """Latest bar with a close, or None. Yahoo leaves values of the still-forming bar and of partial rows in
+    multi-ticker downloads empty; a missing open, high, low or volume is returned as None."""
+    df = df.dropna(subset=["Close"])
+    if df.empty:
+        return None
+    row = df.iloc[-1]
+    volume = _optional(row["Volume"])
+    return {
+        "ticker": ticker,
+        "date": df.index[-1].strftime("%Y-%m-%d %H:%M:%S"),
+        "timestamp": df.index[-1],
+        "open": _optional(row["Open"]),
+        "high": _optional(row["High"]),
+        "low": _optional(row["Low"]),
+        "close": float(row["Close"]),
+        "volume": None if volume is None else int(volume)
+    }
+
 async def get_latest_stock_price(ticker: str, interval: str = "1d") -> Optional[dict]:
     """
     Fetch the latest stock price for a given ticker with specified interval.
@@ -18,59 +197,40 @@ async def get_latest_stock_price(ticker: str, interval: str = "1d") -> Optional[
     if interval not in valid_intervals:
         logger.warning(f"Invalid interval {interval}, defaulting to 5m")
         interval = "1d"
-        
+
     try:
         logger.info(f"Fetching latest price for {ticker} with {interval} interval")
-        stock = yf.Ticker(ticker)
-        df = stock.history(period=interval, interval=interval)
-        
-        if df.empty:
+        frames = await get_fetcher().fetch([ticker], period=interval, interval=interval)
+        df = frames.get(ticker)
+
+        row = None if df is None else latest_row(ticker, df)
+        if row is None:
             logger.warning(f"No recent data found for {ticker}")
-            return None
-            
-        latest_data = {
-            "ticker": ticker,
-            "date": df.index[-1].strftime("%Y-%m-%d %H:%M:%S"),
-            "close": df["Close"].iloc[-1],
-            "volume": df["Volume"].iloc[-1]
-        }
-        return latest_data
-        
+        return row
+
     except Exception as e:
         logger.error(f"Failed to fetch latest price for {ticker}: {str(e)}")
         raise StockDataError(f"Error fetching latest price for {ticker}: {str(e)}")
-    
+
 async def get_latest_stock_prices(tickers: List[str], interval: str = "1d") -> List[Dict]:
     """
     Fetch the latest stock prices for a list of tickers with specified interval.
+
+    Returns one entry per ticker, in order; tickers without data are None.
     """
     valid_intervals = ["1d", "5d", "1mo", "3mo", "6mo"]
     if interval not in valid_intervals:
         logger.warning(f"Invalid interval {interval}, defaulting to 1d")
         interval = "1d"
-        
+
+    logger.info(f"Fetching latest prices for {len(tickers)} tickers with {interval} interval")
+    frames = await get_fetcher().fetch(list(tickers), period=interval, interval=interval)
+
     results = []
-    try:
-        logger.info(f"Fetching latest prices for {tickers} with {interval} interval")
-        for ticker in tickers:
-            stock = yf.Ticker(ticker)
-            df = stock.history(period=interval, interval=interval)
-            
-            if df.empty:
-                logger.warning(f"No recent data found for {ticker}")
-                results.append(None)
-                continue
-                
-            latest_data = {
-                "ticker": ticker,
-                "date": df.index[-1].strftime("%Y-%m-%d %H:%M:%S"),
-                "close": df["Close"].iloc[-1],
-                "volume": df["Volume"].iloc[-1]
-            }
-            results.append(latest_data)
-        
-        return results
-        
-    except Exception as e:
-        logger.error(f"Failed to fetch latest prices for {tickers}: {str(e)}")
-        raise StockDataError(f"Error fetching latest prices for {tickers}: {str(e)}")
\ No newline at end of file
+    for ticker in tickers:
+        df = frames.get(ticker)
+        row = None if df is None else latest_row(ticker, df)
+        if row is None:
+            logger.warning(f"No recent data found for {ticker}")
+        results.append(row)
+    return results
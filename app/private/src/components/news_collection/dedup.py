@@ -0,0 +1,209 @@
+import os
+import re
+import unicodedata
+import zlib
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from common.database import Database
+from fastapi import HTTPException
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__, log_file="tasks.log")
+
+# Estimated Jaccard similarity (of word shingles) at which a story counts as a copy of an earlier one
+DEDUP_THRESHOLD = float(os.getenv("NEWS_DEDUP_THRESHOLD", "0.6"))
+# LSH layout: BANDS x ROWS MinHash values per story. Two stories become candidates when any band matches, which
+# happens with probability 1 - (1 - s^ROWS)^BANDS (about 0.89 at s = 0.6 for 16 x 4). Signatures and buckets are
+# persisted, so changing these requires clearing news_minhash and news_lsh.
+BANDS = int(os.getenv("NEWS_DEDUP_BANDS", "16"))
+ROWS = int(os.getenv("NEWS_DEDUP_ROWS", "4"))
+SHINGLE_SIZE = 3
+# Stories processed per transaction
+CHUNK_SIZE = int(os.getenv("NEWS_DEDUP_CHUNK_SIZE", "1000"))
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240611)
+# Universal hash functions (a * x + b) mod p standing in for random permutations; x and p fit 31 bits, so the
+# products fit uint64. Fixed seed: persisted signatures must stay comparable across restarts.
+_A = _rng.integers(1, _PRIME, size=BANDS * ROWS, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, size=BANDS * ROWS, dtype=np.uint64)
+# Odd multipliers combining a band's values into one 64-bit bucket key
+_MIX = _rng.integers(1, 1 << 62, size=ROWS, dtype=np.uint64) | np.uint64(1)
+
+_WORD = re.compile(r"\w+")
+
+# Counters since startup; persistent totals are read from news_table
+stats = {"checked": 0, "linked": 0, "labels_copied": 0}
+
+def shingles(text: str) -> List[int]:
+    """Hashes the overlapping SHINGLE_SIZE-word sequences of a normalized text to 31-bit integers."""
+    words = _WORD.findall(unicodedata.normalize("NFKC", text or "").casefold())
+    if len(words) < SHINGLE_SIZE:
+        return [zlib.crc32(" ".join(words).encode("utf-8")) & _PRIME] if words else []
+    return list({
+        zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8")) & _PRIME
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    })
+
+def signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature of a text (BANDS * ROWS uint32 values), or None for a text without words."""
+    values = shingles(text)
+    if not values:
+        return None
+    x = np.asarray(values, dtype=np.uint64)
+    return ((np.outer(x, _A) + _B) % np.uint64(_PRIME)).min(axis=0).astype(np.uint32)
+
+def buckets(sig: np.ndarray) -> List[int]:
+    """LSH bucket key of each band of a signature, as signed 64-bit integers for SQLite."""
+    bands = sig.astype(np.uint64).reshape(BANDS, ROWS)
+    # uint64 arithmetic wraps, which is the intended mod 2^64 mixing
+    keys = (bands * _MIX).sum(axis=1, dtype=np.uint64) ^ np.arange(BANDS, dtype=np.uint64)
+    return keys.view(np.int64).tolist()
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures: the share of equal MinHash values."""
+    return float(np.mean(a == b))
+
+async def _candidates(db: Database, keys: Dict[int, List[int]]) -> Dict[Tuple[int, int], List[int]]:
+    """Looks up the stored stories sharing any band bucket with the given stories.
+
+    Args:
+        keys (Dict[int, List[int]]): Bucket keys per band index.
+
+    Returns:
+        Dict[Tuple[int, int], List[int]]: Stored story ids per (band, bucket key) hit.
+    """
+    found = {}
+    for band, band_keys in keys.items():
+        band_keys = list(set(band_keys))
+        for start in range(0, len(band_keys), 500):
+            chunk = band_keys[start:start + 500]
+            rows = await db.fetch_rows(
+                f"SELECT bucket, news_id FROM news_lsh WHERE band = ? AND bucket IN ({','.join('?' * len(chunk))})",
+                (band, *chunk)
+            )
+            for bucket, news_id in rows:
+                found.setdefault((band, bucket), []).append(news_id)
+    return found
+
+async def _link_chunk(db: Database, rows: List[Tuple[int, Optional[str], str]]) -> int:
+    """Signs, matches and indexes one chunk of (id, story_id, description) rows in id order; returns how many were
+    linked as copies."""
+    signed = [(news_id, signature(text)) for news_id, _, text in rows]
+    # news_table holds a row per (ticker, story); rows of the same story are not copies of one another
+    story_of = {news_id: story_id for news_id, story_id, _ in rows}
+    band_keys = {news_id: buckets(sig) for news_id, sig in signed if sig is not None}
+
+    keys_by_band: Dict[int, List[int]] = {}
+    for keys in band_keys.values():
+        for band, key in enumerate(keys):
+            keys_by_band.setdefault(band, []).append(key)
+    stored = await _candidates(db, keys_by_band)
+
+    candidate_ids = {news_id for ids in stored.values() for news_id in ids}
+    signatures, canonical_of = {}, {}
+    for start in range(0, len(candidate_ids), 500):
+        chunk = list(candidate_ids)[start:start + 500]
+        for news_id, blob, canonical_id, story_id in await db.fetch_rows(
+            f"""
+            SELECT m.news_id, m.signature, n.canonical_id, n.story_id FROM news_minhash m
+            JOIN {{news_table}} n ON n.id = m.news_id
+            WHERE m.news_id IN ({','.join('?' * len(chunk))})
+            """,
+            tuple(chunk)
+        ):
+            story_of[news_id] = story_id
+            signatures[news_id] = np.frombuffer(blob, dtype=np.uint32)
+            canonical_of[news_id] = canonical_id or news_id
+
+    minhash_rows, lsh_rows, links = [], [], []
+    for news_id, sig in signed:
+        if sig is None:
+            minhash_rows.append((news_id, None))
+            continue
+        keys = band_keys[news_id]
+        story_id = story_of[news_id]
+        matches = {
+            match for band, key in enumerate(keys) for match in stored.get((band, key), [])
+            if story_id is None or story_of[match] != story_id
+        }
+        best, best_score = None, DEDUP_THRESHOLD
+        for match in sorted(matches):
+            score = similarity(sig, signatures[match])
+            if score >= best_score and (best is None or score > best_score):
+                best, best_score = match, score
+        if best is not None:
+            links.append((canonical_of[best], best_score, news_id))
+            canonical_of[news_id] = canonical_of[best]
+        else:
+            canonical_of[news_id] = news_id
+
+        # Later stories of the same chunk are matched against this one too
+        signatures[news_id] = sig
+        for band, key in enumerate(keys):
+            stored.setdefault((band, key), []).append(news_id)
+            lsh_rows.append((band, key, news_id))
+        minhash_rows.append((news_id, sig.tobytes()))
+
+    await db.execute_transaction([
+        ("INSERT OR IGNORE INTO news_minhash (news_id, signature) VALUES (?, ?)", minhash_rows),
+        ("INSERT OR IGNORE INTO news_lsh (band, bucket, news_id) VALUES (?, ?, ?)", lsh_rows),
+        ("UPDATE {news_table} SET canonical_id = ?, similarity = ? WHERE id = ?", links),
+    ])
+    return len(links)
+
+async def link_duplicates() -> int:
+    """Links every story not checked yet to its most similar earlier story above DEDUP_THRESHOLD, if any.
+
+    A copy points at its match's canonical story, so all copies of a story share one canonical row; the sentiment
+    job then labels copies from it instead of scoring them (see utils.tasks.create_sentiment_labels).
+
+    Returns:
+        int: Number of stories linked as copies.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    linked = 0
+    while True:
+        rows = await db.fetch_rows(
+            """
+            SELECT id, story_id, description FROM {news_table}
+            WHERE id > (SELECT COALESCE(MAX(news_id), 0) FROM news_minhash)
+            ORDER BY id
+            LIMIT ?
+            """,
+            (CHUNK_SIZE,)
+        )
+        if not rows:
+            break
+        linked += await _link_chunk(db, rows)
+        stats["checked"] += len(rows)
+    stats["linked"] += linked
+    if linked:
+        logger.info(f"Linked {linked} near-duplicate stories")
+    return linked
+
+async def dedup_stats() -> dict:
+    """Returns stored totals (stories, copies, share deduplicated) and the counters since startup."""
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    totals = await db.fetch_one(
+        "SELECT COUNT(*) AS stories, COUNT(canonical_id) AS duplicates, AVG(similarity) AS avg_similarity FROM {news_table}"
+    )
+    return {
+        "threshold": DEDUP_THRESHOLD,
+        "stories": totals["stories"],
+        "duplicates": totals["duplicates"],
+        "dedup_ratio": totals["duplicates"] / totals["stories"] if totals["stories"] else 0.0,
+        "avg_similarity": totals["avg_similarity"],
+        "since_start": dict(stats),
+    }
+
+class dedup:
+    def __init__(self):
+        pass
+
+    async def Gsad(self, cmd: str, varsIn: dict = None) -> dict | None:
+        match cmd:
+            case "Stats":
+                return {"data": await dedup_stats(), "status": 200}
+            case _:
+                raise HTTPException(400, "Invalid Cmd")
@@ -1,59 +1,221 @@
-from typing import List
-import pandas as pd
-from datetime import datetime, timezone
-import requests
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from common.metrics import MetricsRegistry
+from common.rate_limit import RateLimiter
 from utils.logs import setup_logger
+import logging
 import os
-import aiofiles
-
-import tickertick as tt
-import tickertick.query as query
 
 logger = setup_logger(__name__)
+# Raw feed dumps, only written when NEWS_LOG_LEVEL=DEBUG
+news_logger = setup_logger("news", log_file="news.log", level=os.getenv("NEWS_LOG_LEVEL", "INFO"), console=False)
 
-async def fetch_news_from_tickertick(tickers, from_date, to_date):
-    stories = []
+# Tickers per feed query; 1 queries every ticker on its own
+NEWS_BATCH_SIZE = int(os.getenv("NEWS_BATCH_SIZE", "3"))
+NEWS_WORKERS = int(os.getenv("NEWS_WORKERS", "2"))
+# TickerTick allows 10 requests per minute per IP
+NEWS_REQUESTS_PER_SECOND = float(os.getenv("NEWS_RPS", str(10 / 60)))
+NEWS_PAGE_SIZE = int(os.getenv("NEWS_PAGE_SIZE", "100"))
+# Pages read per query and run; older stories beyond them are left out rather than fetched on a later run
+NEWS_MAX_PAGES = int(os.getenv("NEWS_MAX_PAGES", "5"))
+# How far back the first run for a ticker (one without a watermark) reaches
+NEWS_LOOKBACK_DAYS = int(os.getenv("NEWS_LOOKBACK_DAYS", "7"))
 
-    try:
-        logger.info(f"Fetching TickerTick for {tickers} from {from_date} to {to_date}")
-        ticker_queries = [query.BroadTicker(ticker) for ticker in tickers]
+_registry = MetricsRegistry()
+# Shared with the price providers (components.data_collection.yfinance), labelled by feed class
+fetch_seconds = _registry.histogram("tickermind_provider_fetch_seconds", "Provider request time (one chunk or page)", ("provider",))
+fetch_errors = _registry.counter("tickermind_provider_fetch_errors_total", "Provider requests that raised", ("provider",))
+
+# (story time in epoch milliseconds, story id): the newest story already ingested for a ticker
+Watermark = Tuple[int, str]
+
+class NewsFeed(ABC):
+    """Source of news stories, newest first. Implementations are synchronous and are called from worker threads."""
+
+    @abstractmethod
+    def fetch(self, tickers: List[str], count: int, last_story: Optional[str] = None) -> List[dict]:
+        """
+        Fetch up to `count` stories about any of `tickers`, newest first, starting after the story `last_story`.
+
+        Each story is a dict with id, time (epoch milliseconds), site, url, description and tags (the upper case
+        tickers the story mentions).
+        """
+
+class TickerTickFeed(NewsFeed):
+    def fetch(self, tickers: List[str], count: int, last_story: Optional[str] = None) -> List[dict]:
+        import tickertick as tt
+        import tickertick.query as query
+        ticker_queries = [query.BroadTicker(ticker.lower()) for ticker in tickers]
         feed = tt.get_feed(
-            query=query.Or(*ticker_queries),
-            no=999
+            query=ticker_queries[0] if len(ticker_queries) == 1 else query.Or(*ticker_queries),
+            no=count, last_story=last_story, do_multiple=False
         )
-        
-        os.makedirs('/data', exist_ok=True)
-        async with aiofiles.open('/data/news_log5.txt', 'a') as f:
-            await f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - News:\n{feed}\n")
-
-        for story in feed:
-            story_time = story.time
-            stories.append({
-                "date": story_time.strftime("%Y-%m-%d"),
-                "description": getattr(story, 'description', ''),
-                "ticker": ','.join(tickers),
-                "source": getattr(story, 'site', '')
-            })
-        
-        if not stories:
-            logger.warning(f"No articles found for {tickers} in TickerTick.")
-            return pd.DataFrame()
-        
-        return pd.DataFrame(stories)
-    except Exception as e:
-        logger.error(f"Error fetching TickerTick for {tickers}: {str(e)}")
-        return pd.DataFrame()
-    
+        if news_logger.isEnabledFor(logging.DEBUG):
+            news_logger.debug(f"News for {tickers}:\n{feed}")
+        return [
+            {
+                "id": story.id,
+                "time": int(story.time.timestamp() * 1000),
+                "site": story.site or "",
+                "url": story.url,
+                "description": story.description or "",
+                "tags": [tag.upper() for tag in story.tags],
+            }
+            for story in feed
+        ]
+
+class StaticFeed(NewsFeed):
+    """Serves stories from memory with the TickerTick paging rules; used to run ingestion without network access."""
+
+    def __init__(self, stories: List[dict], failing: Optional[Dict[str, int]] = None):
+        """
+        Parameters:
+        - stories: Stories in the NewsFeed.fetch format, in any order. A story may also list under "matches"
+          tickers whose query returns it without it being tagged with them (TickerTick also matches company names)
+        - failing: Number of times each ticker's query should raise before succeeding
+        """
+        self.stories = sorted(stories, key=lambda story: (story["time"], story["id"]), reverse=True)
+        self.failing = dict(failing or {})
+        self.calls = []
+
+    def fetch(self, tickers: List[str], count: int, last_story: Optional[str] = None) -> List[dict]:
+        self.calls.append((list(tickers), last_story))
+        for ticker in tickers:
+            if self.failing.get(ticker, 0) > 0:
+                self.failing[ticker] -= 1
+                raise RuntimeError(f"Simulated feed failure for {ticker}")
+        wanted = set(tickers)
+        matching = [story for story in self.stories if wanted.intersection(story["tags"] + story.get("matches", []))]
+        if last_story is not None:
+            ids = [story["id"] for story in matching]
+            matching = matching[ids.index(last_story) + 1:] if last_story in ids else []
+        return matching[:count]
+
+def attribute(story: dict, tickers: List[str]) -> List[str]:
+    """Returns the queried tickers a story is about: those it is tagged with.
+
+    An untagged story returned for a single-ticker query still belongs to that ticker, since the feed matched it
+    (e.g. on the company name); in a batch there is no telling which ticker it was matched for, so it is dropped.
+    """
+    tags = set(story["tags"])
+    mentioned = [ticker for ticker in tickers if ticker in tags]
+    if not mentioned and len(tickers) == 1:
+        return list(tickers)
+    return mentioned
+
+class NewsIngestor:
+    """Pulls new stories per ticker batch on a bounded, rate limited thread pool, reading each feed only back to the
+    oldest watermark of its batch."""
+
+    def __init__(self, feed: NewsFeed = None, batch_size: int = NEWS_BATCH_SIZE, max_workers: int = NEWS_WORKERS,
+                 requests_per_second: float = NEWS_REQUESTS_PER_SECOND, page_size: int = NEWS_PAGE_SIZE,
+                 max_pages: int = NEWS_MAX_PAGES):
+        self.feed = feed or TickerTickFeed()
+        self.batch_size = max(1, batch_size)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="news-feed")
+        self.semaphore = asyncio.Semaphore(max_workers)
+        self.limiter = RateLimiter(requests_per_second)
+        self.page_size = page_size
+        self.max_pages = max_pages
+
+    async def _page(self, tickers: List[str], last_story: Optional[str]) -> List[dict]:
+        async with self.semaphore:
+            await self.limiter.wait()
+            loop = asyncio.get_running_loop()
+            feed = type(self.feed).__name__
+            began = time.perf_counter()
+            try:
+                return await loop.run_in_executor(self.executor, self.feed.fetch, tickers, self.page_size, last_story)
+            except Exception:
+                fetch_errors.labels(feed).inc()
+                raise
+            finally:
+                fetch_seconds.labels(feed).observe(time.perf_counter() - began)
+
+    async def _scan(self, tickers: List[str], floor: Watermark) -> Tuple[List[dict], Optional[Watermark]]:
+        """Reads one batch's feed page by page until it reaches a story at or below floor.
+
+        Returns:
+            Tuple[List[dict], Optional[Watermark]]: Stories newer than floor, and the newest story's watermark.
+        """
+        stories, newest, last_story = [], None, None
+        for _ in range(self.max_pages):
+            page = await self._page(tickers, last_story)
+            if not page:
+                break
+            if newest is None:
+                newest = (page[0]["time"], page[0]["id"])
+            fresh = [story for story in page if (story["time"], story["id"]) > floor]
+            stories += fresh
+            if len(fresh) < len(page) or len(page) < self.page_size:
+                break
+            last_story = page[-1]["id"]
+        return stories, newest
+
+    async def fetch(self, watermarks: Dict[str, Watermark]) -> Tuple[Dict[str, List[dict]], Dict[str, Watermark]]:
+        """
+        Fetch the stories newer than each ticker's watermark. A failing batch never fails the others;
+        its tickers keep their watermarks and are retried on the next run.
+
+        Returns the new stories per ticker and the advanced watermarks of the tickers whose batch succeeded.
+        """
+        tickers = list(watermarks)
+        batches = [tickers[i:i + self.batch_size] for i in range(0, len(tickers), self.batch_size)]
+        outcomes = await asyncio.gather(
+            *(self._scan(batch, min(watermarks[ticker] for ticker in batch)) for batch in batches),
+            return_exceptions=True
+        )
+
+        stories: Dict[str, List[dict]] = {ticker: [] for ticker in tickers}
+        advanced: Dict[str, Watermark] = {}
+        for batch, outcome in zip(batches, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning(f"Fetching news for {batch} failed: {outcome}")
+                continue
+            batch_stories, newest = outcome
+            for story in batch_stories:
+                for ticker in attribute(story, batch):
+                    # The batch was read back to its oldest watermark; skip what this ticker already has
+                    if (story["time"], story["id"]) > watermarks[ticker]:
+                        stories[ticker].append(story)
+            # Every ticker of the batch has now been read up to the batch's newest story
+            for ticker in batch:
+                if newest is not None and newest > watermarks[ticker]:
+                    advanced[ticker] = newest
+        return stories, advanced
+
+def initial_watermark() -> Watermark:
+    """Watermark of a ticker seen for the first time: NEWS_LOOKBACK_DAYS ago."""
+    return (int((time.time() - NEWS_LOOKBACK_DAYS * 86400) * 1000), "")
+
+_ingestor: Optional[NewsIngestor] = None
+
+def get_ingestor() -> NewsIngestor:
+    """Return the shared ingestor, creating a TickerTick backed one on first use."""
+    global _ingestor
+    if _ingestor is None:
+        _ingestor = NewsIngestor()
+    return _ingestor
+
+def set_feed(feed: NewsFeed, **kwargs) -> NewsIngestor:
+    """Replace the shared ingestor with one backed by `feed` (for example a StaticFeed in tests)."""
+    global _ingestor
+    _ingestor = NewsIngestor(feed, **kwargs)
+    return _ingestor
+
 async def get_nasdaq_tickers_from_tickertick() -> List[str]:
     """
     Fetch all NASDAQ stock tickers.
     """
     try:
         logger.info("Fetching NASDAQ tickers")
-        # Using yfinance to get NASDAQ listings
-        nasdaq_tickers = yf.Tickers('^IXIC').tickers  # ^IXIC is NASDAQ Composite Index
-        tickers = [ticker for ticker in nasdaq_tickers if ticker.endswith('.O')]  # Filter for NASDAQ stocks
+        # The index itself has no constituent list; the symbol directory file is the source of the universe
+        from components.data_collection.universe import load_listing
+        tickers = load_listing()
         logger.info(f"Retrieved {len(tickers)} NASDAQ tickers")
         return tickers
     except Exception as e:
-        logger.error(f"Failed to fetch NASDAQ tickers: {str(e)}")
\ No newline at end of file
+        logger.error(f"Failed to fetch NASDAQ tickers: {str(e)}")
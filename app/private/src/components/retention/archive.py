@@ -0,0 +1,193 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from common.database import Database
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__, log_file="tasks.log")
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "../data/archive")
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+
+# Column order of archived news and bar rows; the archive keeps every column so a row can be read back as stored
+NEWS_COLUMNS = (
+    ("id", "int64"), ("stock_id", "int64"), ("ticker", "string"), ("date", "string"), ("description", "string"),
+    ("source", "string"), ("sentiment_label", "string"), ("sentiment_positive", "float64"),
+    ("sentiment_negative", "float64"), ("sentiment_neutral", "float64"), ("story_id", "string"), ("url", "string"),
+    ("canonical_id", "int64"), ("similarity", "float64"), ("published_at", "int64"),
+)
+BAR_COLUMNS = (
+    ("stock_id", "int64"), ("interval", "int64"), ("ts", "int64"), ("open", "float64"), ("high", "float64"),
+    ("low", "float64"), ("close", "float64"), ("volume", "int64"),
+)
+
+# Recorded partitions, loaded on first read and extended by add_partitions; the archive is only written by this
+# process, so the cache never goes stale
+_manifest: Optional[List[dict]] = None
+
+def _schema(columns: Sequence[Tuple[str, str]]):
+    import pyarrow as pa
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in columns])
+
+def write_partition(dataset: str, partition: str, columns: Sequence[Tuple[str, str]], rows: List[tuple]) -> Tuple[str, int]:
+    """Writes rows (tuples in `columns` order) to a new compressed Parquet file under ARCHIVE_DIR/dataset/partition.
+
+    The file is written under a temporary name and renamed, so a reader never sees a partial file. It only becomes
+    visible to reads once add_partitions records it.
+
+    Returns:
+        Tuple[str, int]: Path and size in bytes of the written file.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _schema(columns)
+    table = pa.Table.from_arrays([pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)], schema=schema)
+    directory = os.path.join(ARCHIVE_DIR, dataset, partition)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{time.time_ns()}.parquet")
+    pq.write_table(table, path + ".tmp", compression=ARCHIVE_COMPRESSION)
+    os.replace(path + ".tmp", path)
+    return path, os.path.getsize(path)
+
+PARTITION_INSERT = """
+    INSERT INTO archive_partition (path, dataset, interval, rows, bytes, min_key, max_key, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def partition_row(path: str, size: int, dataset: str, interval: Optional[int], rows: int, min_key, max_key) -> tuple:
+    """PARTITION_INSERT parameters; the insert goes in the same transaction that deletes the archived rows."""
+    return (path, dataset, interval, rows, size, min_key, max_key, int(time.time()))
+
+async def manifest() -> List[dict]:
+    """Returns every recorded partition (path, dataset, interval, rows, bytes, min_key, max_key)."""
+    global _manifest
+    if _manifest is None:
+        db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+        _manifest = await db.fetch_all("SELECT path, dataset, interval, rows, bytes, min_key, max_key FROM archive_partition")
+    return _manifest
+
+async def add_partitions(rows: List[tuple]):
+    """Makes partitions committed with PARTITION_INSERT visible to reads."""
+    if _manifest is None:
+        # Not loaded yet; the first read loads them from archive_partition
+        return
+    for path, dataset, interval, count, size, min_key, max_key, _ in rows:
+        _manifest.append({
+            "path": path, "dataset": dataset, "interval": interval, "rows": count, "bytes": size,
+            "min_key": min_key, "max_key": max_key,
+        })
+
+def sweep(partitions: List[dict]) -> int:
+    """Deletes files under ARCHIVE_DIR that no partition refers to: leftovers of a run interrupted between writing
+    a file and committing its partition, whose rows are therefore still in the database.
+
+    Args:
+        partitions (List[dict]): Every recorded partition (see manifest).
+
+    Returns:
+        int: Number of files deleted.
+    """
+    known = {os.path.abspath(partition["path"]) for partition in partitions}
+    removed = 0
+    for directory, _, files in os.walk(ARCHIVE_DIR):
+        for name in files:
+            path = os.path.abspath(os.path.join(directory, name))
+            if path not in known and (name.endswith(".parquet") or name.endswith(".tmp")):
+                os.remove(path)
+                removed += 1
+    return removed
+
+def _read_news_file(path: str, filters: dict, before: Optional[Tuple[str, int]], after: Optional[Tuple[str, int]]) -> List[tuple]:
+    import pyarrow.parquet as pq
+    predicates = []
+    if filters.get("stock_ids") is not None:
+        predicates.append(("stock_id", "in", list(filters["stock_ids"])))
+    if filters.get("from"):
+        predicates.append(("date", ">=", filters["from"]))
+    if filters.get("to"):
+        predicates.append(("date", "<=", filters["to"]))
+    if filters.get("label"):
+        predicates.append(("sentiment_label", "==", filters["label"]))
+    if filters.get("source"):
+        predicates.append(("source", "==", filters["source"]))
+    if before:
+        predicates.append(("date", "<=", before[0]))
+    if after:
+        predicates.append(("date", ">=", after[0]))
+    table = pq.read_table(
+        path, columns=["id", "ticker", "sentiment_label", "date", "description", "source"], filters=predicates or None
+    )
+    rows = zip(*(table.column(name).to_pylist() for name in table.column_names))
+    return [
+        row for row in rows
+        if (before is None or (row[3], row[0]) < before) and (after is None or (row[3], row[0]) > after)
+    ]
+
+async def read_news(filters: dict, before: Optional[Tuple[str, int]], limit: int,
+                    after: Optional[Tuple[str, int]] = None) -> List[tuple]:
+    """Reads archived stories in the same (id, ticker, label, date, description, source) form and newest-first
+    (date, id) order as Sentiment.GetList's database page.
+
+    Args:
+        filters (dict): stock_ids (None for all), from/to dates, label and source; absent keys do not filter.
+        before (Tuple[str, int], optional): Only rows older than this (date, id) cursor.
+        limit (int): Most rows to return.
+        after (Tuple[str, int], optional): Only rows newer than this (date, id); the caller already has the rest.
+
+    Returns:
+        List[tuple]: Up to `limit` rows, newest first.
+    """
+    if filters.get("stock_ids") == []:
+        return []
+    partitions = [
+        partition for partition in await manifest()
+        if partition["dataset"] == "news"
+        and (before is None or partition["min_key"] <= before[0])
+        and (after is None or partition["max_key"] >= after[0])
+        and (not filters.get("from") or partition["max_key"] >= filters["from"])
+        and (not filters.get("to") or partition["min_key"] <= filters["to"])
+    ]
+    partitions.sort(key=lambda partition: partition["max_key"], reverse=True)
+    rows: List[tuple] = []
+    for partition in partitions:
+        # Partitions are visited newest first; once `limit` rows are newer than everything left, stop
+        if len(rows) >= limit and rows[limit - 1][3] > partition["max_key"]:
+            break
+        rows += await asyncio.to_thread(_read_news_file, partition["path"], filters, before, after)
+        rows.sort(key=lambda row: (row[3], row[0]), reverse=True)
+        del rows[limit:]
+    return rows
+
+def _read_bars_file(path: str, stock_ids: List[int], start: int, end: int) -> List[tuple]:
+    import pyarrow.parquet as pq
+    table = pq.read_table(
+        path, columns=["stock_id", "ts", "open", "high", "low", "close", "volume"],
+        filters=[("stock_id", "in", stock_ids), ("ts", ">=", start), ("ts", "<=", end)]
+    )
+    return list(zip(*(table.column(name).to_pylist() for name in table.column_names)))
+
+async def read_bars(stock_ids: List[int], interval: int, start: int, end: int) -> List[tuple]:
+    """Reads archived raw bars of the given tickers and interval with start <= ts <= end.
+
+    Returns:
+        List[tuple]: (stock_id, ts, open, high, low, close, volume) rows, unordered; empty without a matching partition.
+    """
+    rows = []
+    for partition in await manifest():
+        if partition["dataset"] == "bars" and partition["interval"] == interval \
+                and partition["min_key"] <= end and partition["max_key"] >= start:
+            rows += await asyncio.to_thread(_read_bars_file, partition["path"], list(stock_ids), start, end)
+    return rows
+
+def summary(partitions: List[dict]) -> Dict[str, dict]:
+    """Files, rows, bytes and key range of the archive per dataset."""
+    result = {}
+    for partition in partitions:
+        entry = result.setdefault(partition["dataset"], {"files": 0, "rows": 0, "bytes": 0, "oldest": None, "newest": None})
+        entry["files"] += 1
+        entry["rows"] += partition["rows"]
+        entry["bytes"] += partition["bytes"]
+        entry["oldest"] = min(entry["oldest"], partition["min_key"]) if entry["oldest"] is not None else partition["min_key"]
+        entry["newest"] = max(entry["newest"], partition["max_key"]) if entry["newest"] is not None else partition["max_key"]
+    return result
@@ -0,0 +1,341 @@
+import asyncio
+import os
+import time
+from datetime import date, datetime, time as clock, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from common.database import Database
+from common.response_cache import DataVersions
+from components.retention import archive
+from components.stocks.intervals import INTERVALS
+from fastapi import HTTPException
+from utils.cron.sessions import EXCHANGE_TZ, session_bounds
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__, log_file="tasks.log")
+
+# Retention policies, in days; 0 keeps the data forever
+# Raw intraday bars older than this are rolled up into daily bars (and archived raw, see ARCHIVE_BARS)
+INTRADAY_BARS_DAYS = int(os.getenv("RETENTION_INTRADAY_DAYS", "30"))
+# Legacy stock_data rows older than this are deleted once bars holds their day; each ticker's last two always stay
+STOCK_DATA_DAYS = int(os.getenv("RETENTION_STOCK_DATA_DAYS", "30"))
+# Stories older than this move to Parquet once scored (unscored stories wait for the sentiment job)
+NEWS_DAYS = int(os.getenv("RETENTION_NEWS_DAYS", "180"))
+# Write raw intraday bars to Parquet before rolling them up, so bars.read_bars still returns them
+ARCHIVE_BARS = os.getenv("RETENTION_ARCHIVE_BARS", "true").lower() == "true"
+# Rows per transaction (and per archive file); the writer is released between chunks
+CHUNK_SIZE = int(os.getenv("RETENTION_CHUNK_SIZE", "20000"))
+# Free pages returned to the file system after each chunk
+VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "2000"))
+# Convert a database created before incremental auto-vacuum with a one-time full VACUUM on the next run. Off by
+# default: the VACUUM rewrites the whole file while holding the writer, blocking every write until it finishes
+CONVERT_DATABASE = os.getenv("RETENTION_CONVERT_DATABASE", "false").lower() == "true"
+
+DAY = 86400
+# Intraday interval lengths, in seconds
+INTRADAY_INTERVALS = tuple(seconds for seconds in INTERVALS.values() if seconds < INTERVALS["1d"])
+
+BAR_INSERT = """
+    INSERT INTO bars ({foreign_key}, interval, ts, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT DO NOTHING
+"""
+
+# Outcome of the current or last run
+last_run: Dict = {}
+
+def _month(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m")
+
+def _day_start(ts: int, days: int = 0) -> int:
+    """Epoch seconds of the exchange-time midnight that starts the trading date of `ts`, moved by `days` days."""
+    day = datetime.fromtimestamp(ts, EXCHANGE_TZ).date() + timedelta(days=days)
+    return int(datetime.combine(day, clock(), EXCHANGE_TZ).timestamp())
+
+def _day_key(day: date) -> int:
+    """Key of the daily bar of a trading date: the date at 00:00 UTC, as bars.bar_timestamp keys the provider's
+    daily bars."""
+    return int(datetime.combine(day, clock(), timezone.utc).timestamp())
+
+def roll_up(rows: List[tuple]) -> List[tuple]:
+    """Combines intraday (stock_id, interval, ts, open, high, low, close, volume) rows, in ts order per ticker, into
+    one daily bar per ticker and trading date: first open, highest high, lowest low, last close, summed volume.
+
+    Like the provider's daily bars, only bars starting within the regular session count; pre-market and
+    after-hours bars are left out.
+    """
+    days: Dict[Tuple[int, int], list] = {}
+    # (regular open, regular close) in epoch seconds per trading date, None on closed days
+    regular: Dict[date, Optional[Tuple[float, float]]] = {}
+    for stock_id, _, ts, open_, high, low, close, volume in rows:
+        day = datetime.fromtimestamp(ts, EXCHANGE_TZ).date()
+        if day not in regular:
+            bounds = session_bounds(day)
+            regular[day] = None if bounds is None else (bounds[1].timestamp(), bounds[2].timestamp())
+        if regular[day] is None or not regular[day][0] <= ts < regular[day][1]:
+            continue
+        key = (stock_id, _day_key(day))
+        bar = days.get(key)
+        if bar is None:
+            days[key] = [stock_id, DAY, key[1], open_, high, low, close, volume]
+            continue
+        if bar[3] is None:
+            bar[3] = open_
+        if high is not None:
+            bar[4] = high if bar[4] is None else max(bar[4], high)
+        if low is not None:
+            bar[5] = low if bar[5] is None else min(bar[5], low)
+        if close is not None:
+            bar[6] = close
+        if volume is not None:
+            bar[7] = volume + (bar[7] or 0)
+    return [tuple(bar) for bar in days.values() if bar[6] is not None]
+
+async def _release(db: Database, incremental: bool) -> int:
+    """Returns up to VACUUM_PAGES free pages to the file system; returns how many were released."""
+    if not incremental:
+        return 0
+    before = (await db.maintenance("PRAGMA freelist_count"))[0][0]
+    await db.maintenance(f"PRAGMA incremental_vacuum({VACUUM_PAGES})")
+    return before - (await db.maintenance("PRAGMA freelist_count"))[0][0]
+
+async def _ensure_incremental(db: Database) -> bool:
+    """True when the database releases free pages with PRAGMA incremental_vacuum, converting it first if allowed."""
+    if (await db.maintenance("PRAGMA auto_vacuum"))[0][0] == 2:
+        return True
+    if not CONVERT_DATABASE:
+        logger.info("Freed pages stay in the database file until it is converted (RETENTION_CONVERT_DATABASE=true)")
+        return False
+    logger.info("Enabling incremental auto-vacuum with a one-time VACUUM")
+    await db.maintenance("PRAGMA auto_vacuum = INCREMENTAL")
+    await db.maintenance("VACUUM")
+    return (await db.maintenance("PRAGMA auto_vacuum"))[0][0] == 2
+
+async def roll_up_intraday(days: int, incremental: bool) -> dict:
+    """Replaces intraday bars older than `days` (in whole exchange-time days) with daily bars, chunk by chunk.
+
+    A daily bar the provider already delivered is kept over the rolled up one. With ARCHIVE_BARS, each chunk's raw
+    bars are written to Parquet and recorded in the transaction that deletes them.
+
+    Returns:
+        dict: Raw bars removed, daily bars created, archive files written and pages released.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    cutoff = _day_start(int(time.time()) - days * DAY)
+    result = {"bars": 0, "daily": 0, "files": 0, "pages_released": 0}
+    query = """
+        SELECT {foreign_key}, interval, ts, open, high, low, close, volume FROM bars
+        WHERE {foreign_key} = ? AND interval = ? AND ts >= ? AND ts < ?
+        ORDER BY ts LIMIT ?
+    """
+
+    async def flush(interval: int, rows: List[tuple], ranges: List[tuple]):
+        partitions = []
+        if ARCHIVE_BARS:
+            months: Dict[str, List[tuple]] = {}
+            for row in rows:
+                months.setdefault(_month(row[2]), []).append(row)
+            for month, month_rows in months.items():
+                path, size = await asyncio.to_thread(
+                    archive.write_partition, "bars", f"interval={interval}/month={month}", archive.BAR_COLUMNS, month_rows
+                )
+                partitions.append(archive.partition_row(
+                    path, size, "bars", interval, len(month_rows), min(row[2] for row in month_rows), max(row[2] for row in month_rows)
+                ))
+        daily, deleted, _ = await db.execute_transaction([
+            (BAR_INSERT, roll_up(rows)),
+            ("DELETE FROM bars WHERE {foreign_key} = ? AND interval = ? AND ts >= ? AND ts < ?", ranges),
+            (archive.PARTITION_INSERT, partitions),
+        ])
+        await archive.add_partitions(partitions)
+        result["bars"] += deleted
+        result["daily"] += daily
+        result["files"] += len(partitions)
+        result["pages_released"] += await _release(db, incremental)
+
+    for interval in INTRADAY_INTERVALS:
+        # One primary key probe per ticker, instead of a range query per ticker that mostly finds nothing
+        stock_ids = [row[0] for row in await db.fetch_rows(
+            """
+            SELECT s.id FROM {primary_table} s
+            WHERE EXISTS (SELECT 1 FROM bars b WHERE b.{foreign_key} = s.id AND b.interval = ? AND b.ts < ?)
+            ORDER BY s.id
+            """,
+            (interval, cutoff)
+        )]
+        rows, ranges = [], []
+        for stock_id in stock_ids:
+            start = -2 ** 63
+            while True:
+                chunk = await db.fetch_rows(query, (stock_id, interval, start, cutoff, CHUNK_SIZE))
+                if not chunk:
+                    break
+                if len(chunk) == CHUNK_SIZE:
+                    # Only whole days are rolled up; the last day continues in the next chunk
+                    last_day = _day_start(chunk[-1][2])
+                    whole = [row for row in chunk if row[2] < last_day]
+                    if not whole:
+                        # A single day with more than CHUNK_SIZE bars
+                        whole = await db.fetch_rows(query, (stock_id, interval, start, _day_start(last_day, 1), 2 ** 62))
+                    chunk = whole
+                end = _day_start(chunk[-1][2], 1)
+                rows += chunk
+                ranges.append((stock_id, interval, chunk[0][2], end))
+                start = end
+                if len(rows) >= CHUNK_SIZE:
+                    await flush(interval, rows, ranges)
+                    rows, ranges = [], []
+        if rows:
+            await flush(interval, rows, ranges)
+    return result
+
+async def purge_stock_data(days: int, incremental: bool) -> dict:
+    """Deletes legacy stock_data rows older than `days` whose day is in bars, keeping each ticker's last two rows
+    (the ticker snapshot rebuild reads its close and previous close from them).
+
+    Returns:
+        dict: Rows deleted and pages released.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    result = {"rows": 0, "pages_released": 0}
+    while True:
+        deleted, = await db.execute_transaction([("""
+            DELETE FROM {secondary_table} WHERE id IN (
+                SELECT d.id FROM {secondary_table} d
+                WHERE d.date < ?
+                  AND d.date < (
+                      SELECT p.date FROM {secondary_table} p WHERE p.{foreign_key} = d.{foreign_key}
+                      ORDER BY p.date DESC LIMIT 1 OFFSET 1
+                  )
+                  AND EXISTS (
+                      SELECT 1 FROM bars b
+                      WHERE b.{foreign_key} = d.{foreign_key} AND b.interval = ? AND b.ts = CAST(strftime('%s', date(d.date)) AS INTEGER)
+                  )
+                LIMIT ?
+            )
+        """, [(cutoff, DAY, CHUNK_SIZE)])])
+        result["rows"] += deleted
+        result["pages_released"] += await _release(db, incremental)
+        if deleted < CHUNK_SIZE:
+            return result
+
+async def archive_news(days: int, incremental: bool) -> dict:
+    """Moves scored stories (and stories without text) older than `days` to monthly Parquet partitions, chunk by
+    chunk, dropping their dedup signatures and LSH buckets with them. Sentiment.GetList keeps returning them, and the
+    sentiment aggregates already counted them.
+
+    Returns:
+        dict: Stories archived, files written and pages released.
+    """
+    import numpy as np
+    from components.news_collection.dedup import buckets
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    result = {"stories": 0, "files": 0, "pages_released": 0}
+    after = ("", 0)
+    while True:
+        rows = await db.fetch_rows(
+            """
+            SELECT n.id, n.{foreign_key}, s.ticker, n.date, n.description, n.source, n.sentiment_label,
+                   n.sentiment_positive, n.sentiment_negative, n.sentiment_neutral, n.story_id, n.url,
+                   n.canonical_id, n.similarity, n.published_at
+            FROM {news_table} n LEFT JOIN {primary_table} s ON s.id = n.{foreign_key}
+            WHERE n.date < ? AND (n.date, n.id) > (?, ?)
+              AND (n.sentiment_label IS NOT NULL OR n.description IS NULL OR n.description = '')
+            ORDER BY n.date, n.id
+            LIMIT ?
+            """,
+            (cutoff, *after, CHUNK_SIZE)
+        )
+        if not rows:
+            return result
+        after = (rows[-1][3], rows[-1][0])
+        ids = [(row[0],) for row in rows]
+
+        # news_lsh is keyed by bucket, so the archived stories' rows are found from their signatures
+        lsh_rows = []
+        for start in range(0, len(ids), 500):
+            chunk = [news_id for news_id, in ids[start:start + 500]]
+            for news_id, blob in await db.fetch_rows(
+                f"SELECT news_id, signature FROM news_minhash WHERE news_id IN ({','.join('?' * len(chunk))})", tuple(chunk)
+            ):
+                if blob is not None:
+                    lsh_rows += [(band, key, news_id) for band, key in enumerate(buckets(np.frombuffer(blob, dtype=np.uint32)))]
+
+        months: Dict[str, List[tuple]] = {}
+        for row in rows:
+            months.setdefault(row[3][:7], []).append(row)
+        partitions = []
+        for month, month_rows in months.items():
+            path, size = await asyncio.to_thread(archive.write_partition, "news", f"month={month}", archive.NEWS_COLUMNS, month_rows)
+            partitions.append(archive.partition_row(
+                path, size, "news", None, len(month_rows), min(row[3] for row in month_rows), max(row[3] for row in month_rows)
+            ))
+        await db.execute_transaction([
+            (archive.PARTITION_INSERT, partitions),
+            ("DELETE FROM news_lsh WHERE band = ? AND bucket = ? AND news_id = ?", lsh_rows),
+            ("DELETE FROM news_minhash WHERE news_id = ?", ids),
+            ("DELETE FROM {news_table} WHERE id = ?", ids),
+        ])
+        await archive.add_partitions(partitions)
+        DataVersions().bump("news")
+        result["stories"] += len(rows)
+        result["files"] += len(partitions)
+        result["pages_released"] += await _release(db, incremental)
+
+async def run_retention() -> dict:
+    """Applies every retention policy with a non-zero number of days, in chunks.
+
+    Returns:
+        dict: Per-policy results, files swept and the run time.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    started = time.monotonic()
+    last_run.clear()
+    last_run.update(started_at=int(time.time()), finished_at=None)
+    incremental = await _ensure_incremental(db)
+    swept = archive.sweep(await archive.manifest())
+    if swept:
+        logger.warning(f"Removed {swept} archive files left by an interrupted run")
+
+    policies = (
+        ("intraday_bars", INTRADAY_BARS_DAYS, roll_up_intraday),
+        ("stock_data", STOCK_DATA_DAYS, purge_stock_data),
+        ("news", NEWS_DAYS, archive_news),
+    )
+    for name, days, apply in policies:
+        if days > 0:
+            last_run[name] = await apply(days, incremental)
+    # Pages freed beyond VACUUM_PAGES per chunk, still released a step at a time
+    released = 0
+    while pages := await _release(db, incremental):
+        released += pages
+    last_run.update(finished_at=int(time.time()), seconds=time.monotonic() - started, swept=swept, pages_released=released,
+                    incremental_vacuum=incremental)
+    logger.info(f"Retention run finished in {last_run['seconds']:.1f}s: " + ", ".join(
+        f"{name} {last_run[name]}" for name, days, _ in policies if days > 0
+    ))
+    return dict(last_run)
+
+async def retention_status() -> dict:
+    """Returns the policies, the last run's outcome, archive totals per dataset and the database's page usage."""
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    pages = {}
+    for pragma in ("page_count", "freelist_count", "page_size", "auto_vacuum"):
+        pages[pragma] = (await db.fetch_one(f"PRAGMA {pragma}"))[pragma]
+    return {
+        "policies": {"intraday_bars_days": INTRADAY_BARS_DAYS, "stock_data_days": STOCK_DATA_DAYS, "news_days": NEWS_DAYS},
+        "last_run": dict(last_run) or None,
+        "archive": archive.summary(await archive.manifest()),
+        "database": pages,
+    }
+
+class retention:
+    def __init__(self):
+        pass
+
+    async def Gsad(self, cmd: str, varsIn: dict = None) -> dict | None:
+        match cmd:
+            case "Status":
+                return {"data": await retention_status(), "status": 200}
+            case _:
+                raise HTTPException(400, "Invalid Cmd")
@@ -0,0 +1,68 @@
+"""Sentiment model tooling, run from the source directory:
+
+    python -m components.sentiment export [--model NAME] [--output FILE] [--int8]
+        One-time conversion of the model to ONNX for SENTIMENT_BACKEND=onnx.
+
+    python -m components.sentiment parity [--model NAME | --tiny] [--backends torch-int8,onnx] [--texts FILE]
+        Label agreement and throughput of the other backends against fp32 torch. --tiny uses a randomly
+        initialized small BERT instead of the configured model, so it runs offline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from components.sentiment.backends import BACKENDS, export_onnx, onnx_path
+from components.sentiment.finbert import BATCH_SIZE, MODEL_NAME
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m components.sentiment")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Export the model to ONNX")
+    export.add_argument("--model", default=MODEL_NAME)
+    export.add_argument("--output", help="Output file (default: the onnx backend's configured path)")
+    export.add_argument("--int8", action="store_true", help="Quantize the exported weights to int8")
+
+    check = commands.add_parser("parity", help="Compare backends against fp32 torch")
+    check.add_argument("--model", default=MODEL_NAME)
+    check.add_argument("--tiny", action="store_true", help="Use a random tiny BERT (offline)")
+    check.add_argument("--backends", default="torch-int8,onnx")
+    check.add_argument("--texts", help="File with one text per line (default: stored stories, else built-in samples)")
+    check.add_argument("--limit", type=int, default=512, help="Most stored stories to read")
+    check.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    check.add_argument("--repeats", type=int, default=3)
+    check.add_argument("--threads", type=int, default=0)
+    check.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(export_onnx(args.model, args.output, int8=args.int8))
+        return
+
+    from components.sentiment.parity import SAMPLE_TEXTS, format_report, parity, stored_texts, tiny_model
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    unknown = [name for name in backends if name not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backends {unknown}; expected names from {list(BACKENDS)}")
+    if args.texts:
+        with open(args.texts) as lines:
+            texts = [line.strip() for line in lines if line.strip()]
+    else:
+        texts = asyncio.run(stored_texts(args.limit)) if os.path.exists("../data/stocks.db") else []
+        texts = texts or SAMPLE_TEXTS
+
+    with tempfile.TemporaryDirectory() as scratch:
+        model, onnx_file = args.model, None
+        if args.tiny:
+            model = tiny_model(os.path.join(scratch, "tiny-bert"), texts)
+            onnx_file = export_onnx(model, os.path.join(scratch, "tiny-bert.onnx")) if "onnx" in backends else None
+        elif "onnx" in backends and not os.path.exists(onnx_path(model)):
+            # An unexported model is compared through a scratch export rather than reported as missing
+            onnx_file = export_onnx(model, os.path.join(scratch, "model.onnx"))
+        report = parity(model, texts, backends, batch_size=args.batch_size, repeats=args.repeats, threads=args.threads,
+                        onnx_file=onnx_file)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+import numpy as np
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__)
+
+# Forward pass implementation: torch (fp32, GPU when available), torch-int8 (dynamically quantized, CPU) or onnx
+BACKEND = os.getenv("SENTIMENT_BACKEND", "torch")
+# Directory of exported models; the onnx backend reads <model name with / as -->.onnx from it
+MODEL_DIR = os.getenv("SENTIMENT_MODEL_DIR", "../data/models")
+# Explicit exported model file, overriding the one derived from MODEL_DIR
+ONNX_PATH = os.getenv("SENTIMENT_ONNX_PATH", "")
+ONNX_OPSET = 17
+ONNX_INPUTS = ["input_ids", "attention_mask", "token_type_ids"]
+
+def onnx_path(model_name: str) -> str:
+    """Where the onnx backend expects, and the export writes, the exported model."""
+    return ONNX_PATH or os.path.join(MODEL_DIR, model_name.strip("/").replace("/", "--") + ".onnx")
+
+class SentimentBackend(ABC):
+    """Runs the classifier's forward pass on tokenized batches. Tokenization, batching and softmax stay in
+    SentimentEngine, so every backend sees identical inputs.
+
+    Implementations are loaded once per worker process; `threads` is the intra-op thread count (0 keeps the
+    runtime's default).
+    """
+    name = None
+
+    def __init__(self):
+        # {index: label name} from the model config
+        self.id2label: Dict[int, str] = {}
+
+    @abstractmethod
+    def load(self, model_name: str, threads: int = 0):
+        """Loads the model and fills id2label."""
+
+    @abstractmethod
+    def logits(self, batch: Dict[str, np.ndarray]) -> np.ndarray:
+        """Returns the (batch, labels) logits of a padded batch of int64 input_ids, attention_mask and token_type_ids."""
+
+class TorchBackend(SentimentBackend):
+    """The Hugging Face model in fp32, on the GPU when there is one."""
+    name = "torch"
+
+    def _device(self):
+        import torch
+        return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    def _prepare(self, model):
+        return model
+
+    def load(self, model_name: str, threads: int = 0):
+        import torch
+        from transformers import AutoModelForSequenceClassification
+        if threads:
+            torch.set_num_threads(threads)
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                # Already set by an earlier parallel call in this process
+                pass
+        self.device = self._device()
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model.eval()
+        self.model = self._prepare(model).to(self.device)
+        self.id2label = dict(getattr(model.config, "id2label", None) or {})
+
+    def logits(self, batch: Dict[str, np.ndarray]) -> np.ndarray:
+        import torch
+        inputs = {name: torch.from_numpy(values).to(self.device) for name, values in batch.items()}
+        with torch.inference_mode():
+            return self.model(**inputs).logits.float().cpu().numpy()
+
+class QuantizedTorchBackend(TorchBackend):
+    """fp32 model with every Linear layer dynamically quantized to int8 (weights stored int8, activations quantized
+    per batch). CPU only; roughly halves the memory per worker."""
+    name = "torch-int8"
+
+    def _device(self):
+        import torch
+        return torch.device("cpu")
+
+    def _prepare(self, model):
+        import warnings
+        import torch
+        with warnings.catch_warnings():
+            # Recent torch releases flag eager mode quantization as deprecated; it remains the CPU int8 path here
+            warnings.simplefilter("ignore")
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+class OnnxBackend(SentimentBackend):
+    """ONNX Runtime on the CPU, reading a model written once by `python -m components.sentiment export`."""
+    name = "onnx"
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Parameters:
+        - path: Exported model file; default: onnx_path(model_name)
+        """
+        super().__init__()
+        self.path = path
+
+    def load(self, model_name: str, threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoConfig
+        path = self.path or onnx_path(model_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No exported model at {path}; run `python -m components.sentiment export` first")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        # Models without token types (e.g. DistilBERT) are exported without that input
+        self.inputs = [node.name for node in self.session.get_inputs()]
+        self.id2label = dict(getattr(AutoConfig.from_pretrained(model_name), "id2label", None) or {})
+
+    def logits(self, batch: Dict[str, np.ndarray]) -> np.ndarray:
+        return self.session.run(["logits"], {name: batch[name] for name in self.inputs})[0]
+
+BACKENDS = {backend.name: backend for backend in (TorchBackend, QuantizedTorchBackend, OnnxBackend)}
+
+def get_backend(name: str = BACKEND) -> SentimentBackend:
+    """Returns a new, unloaded backend by name, raising ValueError for unknown names."""
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown sentiment backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    return backend()
+
+def export_onnx(model_name: str, path: Optional[str] = None, int8: bool = False) -> str:
+    """Exports the fp32 model to ONNX with dynamic batch and sequence axes, and checks ONNX Runtime reproduces the
+    torch logits on a padded sample batch.
+
+    Args:
+        model_name (str): Hugging Face model id or local path.
+        path (str, optional): Output file; default: onnx_path(model_name).
+        int8 (bool): Also quantize the exported weights to int8 (ONNX Runtime dynamic quantization) in place.
+
+    Returns:
+        str: Path of the written model.
+    """
+    import warnings
+    import onnxruntime as ort
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    path = path or onnx_path(model_name)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    # Two texts of different lengths, so the traced graph carries real padding in the attention mask
+    sample = tokenizer(["Shares rose after the earnings beat.", "Guidance cut"], padding=True, return_tensors="np")
+    names = [name for name in ONNX_INPUTS if name in sample]
+    inputs = tuple(torch.from_numpy(sample[name].astype(np.int64)) for name in names)
+    axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    axes["logits"] = {0: "batch"}
+    with warnings.catch_warnings():
+        # The TorchScript exporter warns about its own deprecation and about traced Python conditionals
+        warnings.simplefilter("ignore")
+        torch.onnx.export(model, inputs, path, input_names=names, output_names=["logits"], dynamic_axes=axes,
+                          opset_version=ONNX_OPSET, dynamo=False)
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(path, path + ".int8", weight_type=QuantType.QInt8)
+        os.replace(path + ".int8", path)
+
+    with torch.inference_mode():
+        expected = model(**dict(zip(names, inputs))).logits.numpy()
+    session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+    actual = session.run(["logits"], {name: sample[name].astype(np.int64) for name in names})[0]
+    agree = bool((actual.argmax(axis=1) == expected.argmax(axis=1)).all())
+    logger.info(f"Exported {model_name} to {path} (max logit difference {np.abs(actual - expected).max():.2e})")
+    if not agree and not int8:
+        raise RuntimeError(f"Exported model at {path} disagrees with the torch model on the sample batch")
+    return path
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+def classify(tokenizer, backend: SentimentBackend, labels: List[str], texts: List[str], batch_size: int,
+             max_tokens: int) -> List[Dict]:
+    """Scores texts with a loaded backend, batching texts of similar length together.
+
+    Returns:
+        List[Dict]: One dict per input text, in input order, with "label" and one probability per label.
+    """
+    encoded = tokenizer(list(texts), truncation=True, max_length=max_tokens)
+    # Sorting by token length keeps padding per batch to a minimum
+    order = sorted(range(len(texts)), key=lambda i: len(encoded["input_ids"][i]))
+    names = [name for name in ONNX_INPUTS if name in encoded]
+    results: List[Optional[Dict]] = [None] * len(texts)
+
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        batch = tokenizer.pad({name: [encoded[name][i] for i in bucket] for name in names}, return_tensors="np")
+        probs = softmax(backend.logits({name: batch[name].astype(np.int64) for name in names})).tolist()
+
+        for i, row in zip(bucket, probs):
+            best = max(range(len(row)), key=row.__getitem__)
+            result = {"label": labels[best]}
+            result.update({label: row[idx] for idx, label in enumerate(labels)})
+            results[i] = result
+
+    return results
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable
+from common.database import Database
+from common.metrics import MetricsRegistry
+
+CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "50000"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+def content_hash(text: str) -> str:
+    """Hashes text after normalizing unicode, case and whitespace so trivially different copies collide.
+
+    Args:
+        text (str): Story text to hash.
+
+    Returns:
+        str: Hex digest identifying the normalized text.
+    """
+    normalized = _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text or "").casefold()).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+class SentimentCache:
+    """Singleton sentiment result cache: an in-process LRU in front of the sentiment_cache table."""
+    _instance = None
+
+    def __new__(cls, capacity: int = CACHE_SIZE):
+        """Ensures a single cache per process.
+
+        Args:
+            capacity (int): Maximum number of results held in memory.
+
+        Returns:
+            SentimentCache: Singleton instance of the SentimentCache class.
+        """
+        if cls._instance is None:
+            cls._instance = super(SentimentCache, cls).__new__(cls)
+            cls._instance.capacity = capacity
+            cls._instance.entries = OrderedDict()
+            cls._instance.memory_hits = 0
+            cls._instance.db_hits = 0
+            cls._instance.misses = 0
+        return cls._instance
+
+    def _remember(self, key: str, result: Dict):
+        """Inserts or refreshes an entry in the LRU, evicting the oldest when full."""
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """Looks up cached results, checking memory first and SQLite for the rest.
+
+        Args:
+            keys (Iterable[str]): Content hashes to look up.
+
+        Returns:
+            Dict[str, Dict]: Cached results for the keys that were found.
+        """
+        found, missing = {}, []
+        for key in dict.fromkeys(keys):
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                found[key] = self.entries[key]
+                self.memory_hits += 1
+            else:
+                missing.append(key)
+
+        db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+        db_found = 0
+        # Stay well below SQLite's bound parameter limit
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            rows = await db.fetch_all(
+                f"SELECT hash, label, positive, negative, neutral FROM sentiment_cache WHERE hash IN ({','.join('?' * len(chunk))})",
+                tuple(chunk)
+            )
+            for row in rows:
+                key = row.pop("hash")
+                found[key] = row
+                self._remember(key, row)
+            db_found += len(rows)
+        self.db_hits += db_found
+        self.misses += len(missing) - db_found
+        return found
+
+    async def put_many(self, results: Dict[str, Dict]):
+        """Stores freshly scored results in memory and SQLite.
+
+        Args:
+            results (Dict[str, Dict]): Scoring results keyed by content hash.
+        """
+        if not results:
+            return
+        for key, result in results.items():
+            self._remember(key, result)
+
+        db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+        await db.execute_many(
+            "INSERT OR REPLACE INTO sentiment_cache (hash, label, positive, negative, neutral) VALUES (?, ?, ?, ?, ?)",
+            [(key, r["label"], r["positive"], r["negative"], r["neutral"]) for key, r in results.items()]
+        )
+
+    def stats(self) -> dict:
+        """Returns hit and miss counters since process start.
+
+        Returns:
+            dict: Memory hits, database hits, misses, overall hit rate and current LRU size.
+        """
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            "size": len(self.entries),
+        }
+
+_registry = MetricsRegistry()
+_registry.callback(
+    "tickermind_sentiment_cache_lookups_total", "Sentiment cache lookups by result (memory, database, miss)",
+    lambda: {
+        ("memory",): SentimentCache().memory_hits, ("database",): SentimentCache().db_hits, ("miss",): SentimentCache().misses
+    },
+    ("result",), kind="counter"
+)
@@ -0,0 +1,165 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+from common.metrics import SIZE_BUCKETS, MetricsRegistry
+from components.sentiment.backends import BACKEND, get_backend
+from components.sentiment.finbert import SentimentEngine, MODEL_NAME, BATCH_SIZE, MAX_TOKENS
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__)
+
+WORKERS = int(os.getenv("SENTIMENT_WORKERS", str(min(4, os.cpu_count() or 1))))
+TORCH_THREADS = int(os.getenv("SENTIMENT_TORCH_THREADS", "0"))
+QUEUE_SIZE = int(os.getenv("SENTIMENT_QUEUE_SIZE", "0"))
+
+_registry = MetricsRegistry()
+batch_seconds = _registry.histogram("tickermind_inference_batch_seconds", "Time to score one batch, including the worker round trip")
+batch_size = _registry.histogram("tickermind_inference_batch_size", "Texts per scored batch", buckets=SIZE_BUCKETS)
+texts_scored = _registry.counter("tickermind_inference_texts_total", "Texts scored by the sentiment model")
+throughput = _registry.gauge("tickermind_inference_texts_per_second", "Texts per second of the last scored batch")
+
+def _init_worker(model_name: str, batch_size: int, max_tokens: int, backend: str, threads: int):
+    """Runs once in each worker process: loads the model with the configured backend and thread count."""
+    SentimentEngine(model_name=model_name, batch_size=batch_size, max_tokens=max_tokens, backend=backend, threads=threads).load()
+
+def _score(texts: List[str]) -> List[Dict]:
+    """Scores a batch inside a worker process with its resident engine."""
+    return SentimentEngine().score(texts)
+
+def _loaded() -> int:
+    """No-op task: by the time a worker runs it, its initializer has loaded the model. Holding the worker briefly
+    leaves the other warm-up tasks to the other workers."""
+    time.sleep(0.2)
+    return os.getpid()
+
+class InferenceExecutor:
+    """Singleton process pool that runs sentiment inference away from the event loop."""
+    _instance = None
+
+    def __new__(cls, workers: int = WORKERS, torch_threads: int = TORCH_THREADS, queue_size: int = QUEUE_SIZE):
+        """Ensures a single inference pool per process.
+
+        Args:
+            workers (int): Number of worker processes, each holding its own model.
+            torch_threads (int): Intra-op threads per worker (torch or ONNX Runtime); 0 splits the CPU cores evenly.
+            queue_size (int): Maximum number of batches waiting for a worker; 0 uses twice the worker count.
+
+        Returns:
+            InferenceExecutor: Singleton instance of the InferenceExecutor class.
+        """
+        if cls._instance is None:
+            cls._instance = super(InferenceExecutor, cls).__new__(cls)
+            cls._instance.workers = max(1, workers)
+            cls._instance.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // cls._instance.workers)
+            cls._instance.queue_size = queue_size or 2 * cls._instance.workers
+            cls._instance.pool = None
+        return cls._instance
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Starts the worker processes on first use."""
+        if self.pool is None:
+            # Fails here with a readable error rather than as a broken pool from inside the workers
+            get_backend(BACKEND)
+            logger.info(f"Starting {self.workers} {BACKEND} sentiment workers with {self.torch_threads} threads each")
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # torch is not fork-safe once initialised, so workers always start fresh
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(MODEL_NAME, BATCH_SIZE, MAX_TOKENS, BACKEND, self.torch_threads),
+            )
+        return self.pool
+
+    async def warm(self) -> int:
+        """Starts the worker processes and waits until they have loaded the model.
+
+        Returns:
+            int: Number of distinct workers that answered.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        try:
+            pids = await asyncio.gather(*(loop.run_in_executor(pool, _loaded) for _ in range(self.workers)))
+        except Exception:
+            # A worker that failed to load the model breaks the pool; the next batch starts a fresh one
+            self.shutdown()
+            raise
+        return len(set(pids))
+
+    async def score(self, texts: List[str]) -> List[Dict]:
+        """Scores one batch of texts in a worker process.
+
+        Args:
+            texts (List[str]): Texts to classify.
+
+        Returns:
+            List[Dict]: One result per text, in input order.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        results = await loop.run_in_executor(self._get_pool(), _score, texts)
+        elapsed = time.perf_counter() - start
+        batch_seconds.observe(elapsed)
+        batch_size.observe(len(texts))
+        texts_scored.inc(len(texts))
+        throughput.set(len(texts) / elapsed if elapsed > 0 else 0.0)
+        return results
+
+    async def run(self, batches: AsyncIterator[Tuple[List, List[str]]], write: Callable[[List, List[Dict]], Awaitable[None]]) -> int:
+        """Streams batches through the worker pool and hands each result to the writer as it completes.
+
+        The producer blocks once queue_size batches are waiting, so a large backlog never sits in memory.
+
+        Args:
+            batches (AsyncIterator[Tuple[List, List[str]]]): Yields (keys, texts) pairs; keys are passed through to write.
+            write (Callable): Awaited with (keys, results) for every finished batch, one at a time.
+
+        Returns:
+            int: Number of texts scored.
+        """
+        jobs: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        done: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        scored = 0
+
+        async def produce():
+            async for keys, texts in batches:
+                await jobs.put((keys, texts))
+            for _ in range(self.workers):
+                await jobs.put(None)
+
+        async def dispatch():
+            while (job := await jobs.get()) is not None:
+                keys, texts = job
+                await done.put((keys, await self.score(texts)))
+            await done.put(None)
+
+        async def drain():
+            nonlocal scored
+            finished = 0
+            while finished < self.workers:
+                item = await done.get()
+                if item is None:
+                    finished += 1
+                    continue
+                keys, results = item
+                await write(keys, results)
+                scored += len(results)
+
+        tasks = [asyncio.create_task(produce()), asyncio.create_task(drain())]
+        tasks += [asyncio.create_task(dispatch()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+        return scored
+
+    def shutdown(self):
+        """Stops the worker processes."""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
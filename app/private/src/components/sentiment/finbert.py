@@ -0,0 +1,78 @@
+import os
+from typing import Dict, List
+from components.sentiment.backends import BACKEND, classify, get_backend
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__)
+
+MODEL_NAME = os.getenv("SENTIMENT_MODEL", "ProsusAI/finbert")
+BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "32"))
+# Texts are truncated to this many tokens, FinBERT's full input length. Lowering it speeds up long descriptions but
+# can change their labels
+MAX_TOKENS = int(os.getenv("SENTIMENT_MAX_TOKENS", "512"))
+
+# ProsusAI/finbert output order, used when the model config carries no usable labels
+LABELS = ["positive", "negative", "neutral"]
+
+def label_order(id2label: Dict[int, str]) -> List[str]:
+    """Label names in output order from a model config's id2label, or LABELS when they are not FinBERT's."""
+    labels = [str(id2label.get(i, "")).lower() for i in range(len(id2label))]
+    return labels if sorted(labels) == sorted(LABELS) else LABELS
+
+class SentimentEngine:
+    """Singleton FinBERT scorer that loads the model once per process and scores text in batches."""
+    _instance = None
+
+    def __new__(cls, model_name: str = MODEL_NAME, batch_size: int = BATCH_SIZE, max_tokens: int = MAX_TOKENS,
+                backend: str = BACKEND, threads: int = 0):
+        """Ensures a single engine (and therefore a single loaded model) per process.
+
+        Args:
+            model_name (str): Hugging Face model id or local path of the FinBERT checkpoint.
+            batch_size (int): Maximum number of texts per forward pass.
+            max_tokens (int): Truncation length for each text.
+            backend (str): Forward pass implementation, a name from components.sentiment.backends.BACKENDS.
+            threads (int): Intra-op threads of the backend; 0 keeps its default.
+
+        Returns:
+            SentimentEngine: Singleton instance of the SentimentEngine class.
+        """
+        if cls._instance is None:
+            cls._instance = super(SentimentEngine, cls).__new__(cls)
+            cls._instance.model_name = model_name
+            cls._instance.batch_size = max(1, batch_size)
+            cls._instance.max_tokens = max_tokens
+            cls._instance.backend_name = backend
+            cls._instance.threads = threads
+            cls._instance.tokenizer = None
+            cls._instance.backend = None
+            cls._instance.labels = LABELS
+        return cls._instance
+
+    def load(self):
+        """Loads the tokenizer and model if they are not loaded yet."""
+        if self.backend is not None:
+            return
+
+        from transformers import AutoTokenizer
+
+        logger.info(f"Loading sentiment model {self.model_name} with the {self.backend_name} backend")
+        backend = get_backend(self.backend_name)
+        backend.load(self.model_name, self.threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.backend = backend
+        self.labels = label_order(backend.id2label)
+
+    def score(self, texts: List[str]) -> List[Dict]:
+        """Scores a list of texts, batching texts of similar length together.
+
+        Args:
+            texts (List[str]): Texts to classify.
+
+        Returns:
+            List[Dict]: One dict per input text, in input order, with "label" and one probability per label.
+        """
+        if not texts:
+            return []
+        self.load()
+        return classify(self.tokenizer, self.backend, self.labels, texts, self.batch_size, self.max_tokens)
@@ -0,0 +1,149 @@
+import os
+import time
+from typing import List, Optional, Sequence
+from components.sentiment.backends import OnnxBackend, classify, get_backend
+from components.sentiment.finbert import BATCH_SIZE, LABELS, MAX_TOKENS, label_order
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__)
+
+# Used when no texts are given and the database has no stories yet
+SAMPLE_TEXTS = [
+    "Apple shares climb after record iPhone sales beat analyst estimates",
+    "Tesla recalls thousands of vehicles over faulty seat belt warning",
+    "Microsoft to acquire gaming studio in all-cash deal",
+    "Nvidia guidance disappoints as data center growth slows",
+    "Amazon workers strike at warehouses across Europe",
+    "Intel cuts dividend and announces layoffs amid restructuring",
+    "Meta platforms reports steady ad revenue for the quarter",
+    "Netflix subscriber growth surges on password sharing crackdown",
+    "Alphabet faces antitrust lawsuit over search advertising practices",
+    "Starbucks holds annual shareholder meeting in Seattle",
+    "Moderna stock falls after vaccine trial misses primary endpoint",
+    "AMD unveils new chips at trade show",
+    "Oil prices steady as traders await inventory data",
+    "Federal Reserve holds rates unchanged, signals patience on cuts",
+    "PayPal beats earnings expectations and raises full year outlook",
+    "Boeing deliveries drop for a third straight month",
+]
+
+def tiny_model(path: str, texts: Sequence[str]) -> str:
+    """Writes a randomly initialized two-layer BERT classifier, with a word vocabulary built from `texts`, for
+    exercising the backends offline. Its labels are arbitrary but deterministic.
+
+    Returns:
+        str: path, now loadable with from_pretrained.
+    """
+    import re
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+    os.makedirs(path, exist_ok=True)
+    words = sorted({word for text in texts for word in re.findall(r"\w+|[^\w\s]", text.lower())})
+    with open(os.path.join(path, "vocab.txt"), "w") as vocab:
+        vocab.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words) + "\n")
+    BertTokenizerFast(os.path.join(path, "vocab.txt")).save_pretrained(path)
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(words) + 5, hidden_size=64, num_hidden_layers=2, num_attention_heads=2, intermediate_size=128,
+        max_position_embeddings=MAX_TOKENS + 2, num_labels=len(LABELS),
+        id2label=dict(enumerate(LABELS)), label2id={label: i for i, label in enumerate(LABELS)},
+    )
+    BertForSequenceClassification(config).eval().save_pretrained(path)
+    return path
+
+def _timed_run(tokenizer, backend, labels: List[str], texts: List[str], batch_size: int, repeats: int):
+    """Scores texts `repeats` times after one warm-up batch; returns the last results and texts per second."""
+    classify(tokenizer, backend, labels, texts[:batch_size], batch_size, MAX_TOKENS)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        results = classify(tokenizer, backend, labels, texts, batch_size, MAX_TOKENS)
+    elapsed = time.perf_counter() - start
+    return results, len(texts) * repeats / elapsed if elapsed > 0 else 0.0
+
+def parity(model_name: str, texts: List[str], backends: Sequence[str] = ("torch-int8", "onnx"),
+           batch_size: int = BATCH_SIZE, repeats: int = 3, threads: int = 0, onnx_file: Optional[str] = None) -> dict:
+    """Scores the same texts with the fp32 torch backend and each other backend, in this process.
+
+    Args:
+        model_name (str): Hugging Face model id or local path.
+        texts (List[str]): Texts to score.
+        backends (Sequence[str]): Backends compared against fp32 torch.
+        repeats (int): Timed passes over the texts per backend.
+        threads (int): Intra-op threads for every backend; 0 keeps their defaults.
+        onnx_file (str, optional): Exported model for the onnx backend; default: its configured path.
+
+    Returns:
+        dict: fp32 throughput, and per backend its label agreement with fp32 (share of texts with the same label),
+        largest probability difference, throughput and speedup; a backend that cannot load reports its error.
+    """
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    reference = get_backend("torch")
+    reference.load(model_name, threads)
+    labels = label_order(reference.id2label)
+    expected, reference_speed = _timed_run(tokenizer, reference, labels, texts, batch_size, repeats)
+
+    compared = []
+    for name in backends:
+        try:
+            backend = OnnxBackend(onnx_file) if name == "onnx" else get_backend(name)
+            backend.load(model_name, threads)
+            results, speed = _timed_run(tokenizer, backend, labels, texts, batch_size, repeats)
+        except Exception as e:
+            logger.warning(f"Backend {name} failed: {e}")
+            compared.append({"backend": name, "error": str(e)})
+            continue
+        agreeing = sum(result["label"] == reference_result["label"] for result, reference_result in zip(results, expected))
+        compared.append({
+            "backend": name,
+            "agreement": agreeing / len(texts) if texts else 1.0,
+            "disagreements": len(texts) - agreeing,
+            "max_probability_difference": max(
+                (abs(result[label] - reference_result[label]) for result, reference_result in zip(results, expected) for label in labels),
+                default=0.0
+            ),
+            "texts_per_second": speed,
+            "speedup": speed / reference_speed if reference_speed else None,
+        })
+    return {
+        "model": model_name,
+        "texts": len(texts),
+        "batch_size": batch_size,
+        "reference": {"backend": "torch", "texts_per_second": reference_speed},
+        "backends": compared,
+    }
+
+async def stored_texts(limit: int) -> List[str]:
+    """Returns up to `limit` of the newest distinct story descriptions in the database."""
+    from common.database import Database
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    try:
+        rows = await db.fetch_rows(
+            """
+            SELECT description FROM {news_table}
+            WHERE canonical_id IS NULL AND description IS NOT NULL AND description != ''
+            ORDER BY id DESC LIMIT ?
+            """,
+            (limit,)
+        )
+    finally:
+        await db.close()
+    return [row[0] for row in rows]
+
+def format_report(report: dict) -> str:
+    """Renders a parity report as a small table."""
+    lines = [
+        f"{report['model']}: {report['texts']} texts, batch size {report['batch_size']}",
+        f"  {'backend':<12}{'agreement':>10}{'max dprob':>11}{'texts/s':>10}{'speedup':>9}",
+        f"  {'torch':<12}{'-':>10}{'-':>11}{report['reference']['texts_per_second']:>10.1f}{1.0:>9.2f}",
+    ]
+    for entry in report["backends"]:
+        if "error" in entry:
+            lines.append(f"  {entry['backend']:<12}error: {entry['error']}")
+            continue
+        lines.append(
+            f"  {entry['backend']:<12}{entry['agreement']:>10.1%}{entry['max_probability_difference']:>11.4f}"
+            f"{entry['texts_per_second']:>10.1f}{entry['speedup']:>9.2f}"
+        )
+    return "\n".join(lines)
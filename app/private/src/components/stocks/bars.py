@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from common.database import Database
+from components.retention import archive
+from components.stocks.intervals import INTERVALS
+
+COLUMNS = ("ts", "open", "high", "low", "close", "volume")
+
+def interval_seconds(interval) -> int:
+    """Converts an interval name such as "1d" (or a number of seconds) to seconds."""
+    if isinstance(interval, int):
+        return interval
+    if interval not in INTERVALS:
+        raise ValueError(f"Unsupported interval {interval}; expected one of {list(INTERVALS)}")
+    return INTERVALS[interval]
+
+def bar_timestamp(value, interval) -> int:
+    """Converts a bar time to the epoch seconds used as its key.
+
+    Daily and longer bars are keyed by their trading date at 00:00 UTC so the key does not depend on the
+    exchange timezone; intraday bars use the exact instant (naive times are taken as UTC).
+    """
+    ts = pd.Timestamp(value)
+    if interval_seconds(interval) >= INTERVALS["1d"]:
+        return int(pd.Timestamp(ts.date()).tz_localize("UTC").timestamp())
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.timestamp())
+
+def frame_to_rows(stock_id: int, interval, df: pd.DataFrame) -> List[Tuple]:
+    """Converts a provider frame with Open/High/Low/Close/Volume columns to bar rows."""
+    seconds = interval_seconds(interval)
+    df = df.dropna(subset=["Close"])
+    return [
+        (stock_id, seconds, bar_timestamp(index, seconds), float(row.Open), float(row.High), float(row.Low),
+         float(row.Close), int(row.Volume) if row.Volume == row.Volume else None)
+        for index, row in zip(df.index, df.itertuples(index=False))
+    ]
+
+async def append_bars(rows: List[Tuple], batch_size: int = 0) -> int:
+    """Bulk-writes bar rows; a bar that already exists (e.g. today's still-forming bar) is overwritten.
+
+    Args:
+        rows (List[Tuple]): (stock_id, interval_seconds, ts, open, high, low, close, volume) tuples.
+        batch_size (int, optional): Rows per transaction; 0 writes everything in one transaction.
+
+    Returns:
+        int: Number of bars inserted or updated.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    return await db.upsert_many(
+        "bars",
+        ["{foreign_key}", "interval", "ts", "open", "high", "low", "close", "volume"],
+        rows,
+        batch_size=batch_size,
+        conflict=["{foreign_key}", "interval", "ts"],
+        update=["open", "high", "low", "close", "volume"]
+    )
+
+def _to_arrays(rows: List[tuple], offset: int = 0) -> Dict[str, np.ndarray]:
+    """Splits fetched bar tuples into one NumPy array per column."""
+    if not rows:
+        return {column: np.empty(0, dtype=np.int64 if column == "ts" else np.float64) for column in COLUMNS}
+    data = np.array([row[offset:] for row in rows], dtype=np.float64)
+    arrays = {column: data[:, i] for i, column in enumerate(COLUMNS)}
+    arrays["ts"] = arrays["ts"].astype(np.int64)
+    return arrays
+
+async def _with_archived(rows: List[tuple], stock_ids: List[int], seconds: int, start: Optional[int], end: Optional[int]) -> List[tuple]:
+    """Adds raw bars archived by components.retention to (stock_id, ts, ...) rows ordered by stock id and ts.
+
+    Archived intraday bars were deleted from the table when rolled up, so on the same ts the table's row wins.
+    """
+    archived = await archive.read_bars(stock_ids, seconds, start if start is not None else -2**63, end if end is not None else 2**63 - 1)
+    if not archived:
+        return rows
+    stored = {(row[0], row[1]) for row in rows}
+    return sorted(rows + [row for row in archived if (row[0], row[1]) not in stored], key=lambda row: (row[0], row[1]))
+
+async def read_bars(stock_id: int, interval, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Reads bars for one ticker in [start, end] with a primary key range scan.
+
+    Args:
+        stock_id (int): Primary table id of the ticker.
+        interval: Interval name or seconds.
+        start (int, optional): First epoch timestamp to include.
+        end (int, optional): Last epoch timestamp to include.
+
+    Returns:
+        Dict[str, np.ndarray]: ts (int64) and open/high/low/close/volume (float64) arrays in time order.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    rows = await db.fetch_rows(
+        """
+        SELECT {foreign_key}, ts, open, high, low, close, volume FROM bars
+        WHERE {foreign_key} = ? AND interval = ? AND ts BETWEEN ? AND ?
+        ORDER BY ts
+        """,
+        (stock_id, interval_seconds(interval), start if start is not None else -2**63, end if end is not None else 2**63 - 1)
+    )
+    return _to_arrays(await _with_archived(rows, [stock_id], interval_seconds(interval), start, end), offset=1)
+
+async def read_bars_many(stock_ids: List[int], interval, start: Optional[int] = None, end: Optional[int] = None) -> Dict[int, Dict[str, np.ndarray]]:
+    """Reads bars for several tickers in one query.
+
+    Returns:
+        Dict[int, Dict[str, np.ndarray]]: read_bars-style arrays per stock id; tickers without bars are omitted.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    result = {}
+    for offset in range(0, len(stock_ids), 500):
+        chunk = list(stock_ids[offset:offset + 500])
+        rows = await db.fetch_rows(
+            f"""
+            SELECT {{foreign_key}}, ts, open, high, low, close, volume FROM bars
+            WHERE {{foreign_key}} IN ({','.join('?' * len(chunk))}) AND interval = ? AND ts BETWEEN ? AND ?
+            ORDER BY {{foreign_key}}, ts
+            """,
+            (*chunk, interval_seconds(interval), start if start is not None else -2**63, end if end is not None else 2**63 - 1)
+        )
+        grouped = {}
+        for row in await _with_archived(rows, chunk, interval_seconds(interval), start, end):
+            grouped.setdefault(row[0], []).append(row)
+        for stock_id, stock_rows in grouped.items():
+            result[stock_id] = _to_arrays(stock_rows, offset=1)
+    return result
+
+async def migrate_stock_data() -> int:
+    """Copies daily close/volume rows from the legacy stock_data table into bars.
+
+    The legacy table has no open/high/low, so migrated bars use the close for all three. Rows already present in
+    bars are left untouched, so the migration is safe to run on every start.
+
+    Returns:
+        int: Number of bars created.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    before = await db.fetch_one("SELECT COUNT(*) AS count FROM bars WHERE interval = ?", (INTERVALS["1d"],))
+    await db.execute(
+        """
+        INSERT INTO bars ({foreign_key}, interval, ts, open, high, low, close, volume)
+        SELECT {foreign_key}, ?, CAST(strftime('%s', date(date)) AS INTEGER), close, close, close, close, volume
+        FROM {secondary_table}
+        WHERE {foreign_key} IS NOT NULL
+        ON CONFLICT DO NOTHING
+        """,
+        (INTERVALS["1d"],)
+    )
+    after = await db.fetch_one("SELECT COUNT(*) AS count FROM bars WHERE interval = ?", (INTERVALS["1d"],))
+    return after["count"] - before["count"]
@@ -0,0 +1,388 @@
+import math
+from array import array
+from typing import Dict, List, Optional, Tuple
+from common.database import Database
+from common.response_cache import DataVersions
+from components.stocks.bars import interval_seconds
+from components.stocks.indicators import (
+    SMA_WINDOWS, EMA_SPANS, MACD_SIGNAL_SPAN, RSI_PERIOD, ATR_PERIOD, BOLLINGER_WINDOW, BOLLINGER_WIDTH,
+    VOLUME_WINDOW, HISTORY, LOOKBACK, SNAPSHOT_COLUMNS, _alpha, compute, load_bars, write_snapshot, refresh_sentiment
+)
+from fastapi import HTTPException
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__)
+
+_ALPHAS = tuple(_alpha(span) for span in EMA_SPANS)
+_SIGNAL_ALPHA = _alpha(MACD_SIGNAL_SPAN)
+_NAN = float("nan")
+# Scalars serialized ahead of the sums, EMAs and ring buffers
+_SCALARS = 13
+
+class IndicatorState:
+    """Incremental indicator state for one ticker and interval, updated in O(1) per bar.
+
+    Performs exactly the same floating-point operations, in the same order, as indicators.compute() does for
+    one ticker, so streaming values equal a batch recompute over the same bars.
+    """
+    __slots__ = (
+        "n", "ts", "close", "volume", "prev", "change", "sums", "sumsq", "vol_sum", "vol_sumsq",
+        "ema", "signal", "avg_gain", "avg_loss", "atr", "closes", "volumes",
+    )
+
+    def __init__(self):
+        self.n = 0
+        self.ts = None
+        self.close = _NAN
+        self.volume = _NAN
+        self.prev = _NAN
+        self.change = _NAN
+        self.sums = array("d", [0.0] * len(SMA_WINDOWS))
+        self.sumsq = 0.0
+        self.vol_sum = 0.0
+        self.vol_sumsq = 0.0
+        self.ema = array("d", [_NAN] * len(EMA_SPANS))
+        self.signal = _NAN
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.atr = 0.0
+        # Ring buffers: the bar j steps before the latest one lives at index (n - 1 - j) % size
+        self.closes = array("d", [_NAN] * HISTORY)
+        self.volumes = array("d", [_NAN] * VOLUME_WINDOW)
+
+    def copy(self) -> "IndicatorState":
+        return IndicatorState.from_bytes(self.to_bytes())
+
+    def update(self, ts: int, high: Optional[float], low: Optional[float], close: float, volume: Optional[float]):
+        """Applies the next bar."""
+        x = float(close)
+        h = x if high is None or high != high else float(high)
+        l = x if low is None or low != low else float(low)
+        v = 0.0 if volume is None or volume != volume else float(volume)
+        n1 = self.n + 1
+
+        for i, w in enumerate(SMA_WINDOWS):
+            old = self.closes[(n1 - 1 - w) % HISTORY]
+            s = self.sums[i] + x
+            if n1 > w:
+                s = s - old
+            if w == BOLLINGER_WINDOW:
+                sq = self.sumsq + x * x
+                if n1 > w:
+                    sq = sq - old * old
+                self.sumsq = sq
+            self.sums[i] = s
+
+        old_v = self.volumes[(n1 - 1 - VOLUME_WINDOW) % VOLUME_WINDOW]
+        vs = self.vol_sum + v
+        vsq = self.vol_sumsq + v * v
+        if n1 > VOLUME_WINDOW:
+            vs = vs - old_v
+            vsq = vsq - old_v * old_v
+        self.vol_sum = vs
+        self.vol_sumsq = vsq
+
+        for i, alpha in enumerate(_ALPHAS):
+            self.ema[i] = x if n1 == 1 else self.ema[i] + alpha * (x - self.ema[i])
+        macd = self.ema[0] - self.ema[1]
+        self.signal = macd if n1 == 1 else self.signal + _SIGNAL_ALPHA * (macd - self.signal)
+
+        prev = self.prev
+        k = n1 - 1
+        if k >= 1:
+            d = x - prev
+            gain, loss = max(d, 0.0), max(-d, 0.0)
+            a = self.avg_gain + gain if k <= RSI_PERIOD else self.avg_gain * (RSI_PERIOD - 1) + gain
+            self.avg_gain = a / RSI_PERIOD if k >= RSI_PERIOD else a
+            a = self.avg_loss + loss if k <= RSI_PERIOD else self.avg_loss * (RSI_PERIOD - 1) + loss
+            self.avg_loss = a / RSI_PERIOD if k >= RSI_PERIOD else a
+
+        tr = h - l if n1 == 1 else max(h - l, max(abs(h - prev), abs(l - prev)))
+        a = self.atr + tr if n1 <= ATR_PERIOD else self.atr * (ATR_PERIOD - 1) + tr
+        self.atr = a / ATR_PERIOD if n1 >= ATR_PERIOD else a
+
+        self.closes[(n1 - 1) % HISTORY] = x
+        self.volumes[(n1 - 1) % VOLUME_WINDOW] = v
+        self.change = x - prev
+        self.prev = x
+        self.close = x
+        self.volume = v
+        self.ts = int(ts)
+        self.n = n1
+
+    def values(self) -> Dict[str, float]:
+        """Returns the latest indicator values, NaN where not yet defined (same rules as the batch engine)."""
+        n = self.n
+        values = {"close": self.close, "change": self.change if n >= 2 else _NAN, "volume": self.volume}
+        for i, w in enumerate(SMA_WINDOWS):
+            values[f"sma{w}"] = self.sums[i] / w if n >= w else _NAN
+        for i, span in enumerate(EMA_SPANS):
+            values[f"ema{span}"] = self.ema[i]
+        values["macd"] = self.ema[0] - self.ema[1]
+        values["macd_signal"] = self.signal
+        values["macd_hist"] = values["macd"] - self.signal
+
+        if n - 1 >= RSI_PERIOD:
+            if self.avg_loss == 0:
+                rsi = 50.0 if self.avg_gain == 0 else 100.0
+            else:
+                rsi = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+        else:
+            rsi = _NAN
+        values[f"rsi{RSI_PERIOD}"] = rsi
+
+        sma = self.sums[SMA_WINDOWS.index(BOLLINGER_WINDOW)]
+        mid = sma / BOLLINGER_WINDOW
+        std = math.sqrt(max(self.sumsq / BOLLINGER_WINDOW - mid * mid, 0.0))
+        full = n >= BOLLINGER_WINDOW
+        values["bb_middle"] = mid if full else _NAN
+        values["bb_upper"] = mid + BOLLINGER_WIDTH * std if full else _NAN
+        values["bb_lower"] = mid - BOLLINGER_WIDTH * std if full else _NAN
+
+        values[f"atr{ATR_PERIOD}"] = self.atr if n >= ATR_PERIOD else _NAN
+
+        mean_v = self.vol_sum / VOLUME_WINDOW
+        std_v = math.sqrt(max(self.vol_sumsq / VOLUME_WINDOW - mean_v * mean_v, 0.0))
+        z = (self.volume - mean_v) / std_v if std_v > 0 else 0.0
+        values["volume_z"] = z if n >= VOLUME_WINDOW else _NAN
+        return values
+
+    def to_bytes(self) -> bytes:
+        """Serializes the state as a flat array of doubles."""
+        scalars = array("d", [
+            self.n, _NAN if self.ts is None else self.ts, self.close, self.volume, self.prev, self.change,
+            self.sumsq, self.vol_sum, self.vol_sumsq, self.signal, self.avg_gain, self.avg_loss, self.atr,
+        ])
+        return (scalars + self.sums + self.ema + self.closes + self.volumes).tobytes()
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "IndicatorState":
+        data = array("d")
+        data.frombytes(blob)
+        state = cls()
+        (n, ts, state.close, state.volume, state.prev, state.change, state.sumsq, state.vol_sum, state.vol_sumsq,
+         state.signal, state.avg_gain, state.avg_loss, state.atr) = data[:_SCALARS]
+        state.n = int(n)
+        state.ts = None if ts != ts else int(ts)
+        offset = _SCALARS
+        state.sums = data[offset:offset + len(SMA_WINDOWS)]
+        offset += len(SMA_WINDOWS)
+        state.ema = data[offset:offset + len(EMA_SPANS)]
+        offset += len(EMA_SPANS)
+        state.closes = data[offset:offset + HISTORY]
+        state.volumes = data[offset + HISTORY:offset + HISTORY + VOLUME_WINDOW]
+        return state
+
+    @classmethod
+    def from_batch(cls, state: Dict, i: int, ts: Optional[int]) -> "IndicatorState":
+        """Builds the state of ticker row i from the state returned by indicators.compute()."""
+        result = cls()
+        n = int(state["n"][i])
+        if n == 0:
+            return result
+        result.n = n
+        result.ts = ts
+        result.prev = float(state["prev"][i])
+        result.close = result.prev
+        result.volume = float(state["volumes"][i, -1])
+        result.change = float(state["change"][i])
+        result.sums = array("d", [float(state["sums"][w][i]) for w in SMA_WINDOWS])
+        result.sumsq = float(state["sumsq"][i])
+        result.vol_sum = float(state["vol_sum"][i])
+        result.vol_sumsq = float(state["vol_sumsq"][i])
+        result.ema = array("d", [float(state["ema"][span][i]) for span in EMA_SPANS])
+        result.signal = float(state["signal"][i])
+        result.avg_gain = float(state["avg_gain"][i])
+        result.avg_loss = float(state["avg_loss"][i])
+        result.atr = float(state["atr"][i])
+        for buffer, recent in ((result.closes, state["closes"][i]), (result.volumes, state["volumes"][i])):
+            size = len(buffer)
+            for j in range(min(n, size, len(recent))):
+                buffer[(n - 1 - j) % size] = float(recent[len(recent) - 1 - j])
+        return result
+
+class _Entry:
+    """State after the latest bar plus the state before it, so a revised latest bar can be re-applied."""
+    __slots__ = ("current", "prior")
+
+    def __init__(self, current: IndicatorState, prior: Optional[IndicatorState]):
+        self.current = current
+        self.prior = prior
+
+# In-memory states keyed by (stock_id, interval_seconds); persisted in indicator_state
+_states: Dict[Tuple[int, int], _Entry] = {}
+
+async def _load(keys: List[Tuple[int, int]]):
+    """Loads persisted states for keys that are not in memory yet."""
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    by_interval = {}
+    for stock_id, seconds in keys:
+        if (stock_id, seconds) not in _states:
+            by_interval.setdefault(seconds, []).append(stock_id)
+    for seconds, stock_ids in by_interval.items():
+        for start in range(0, len(stock_ids), 500):
+            chunk = stock_ids[start:start + 500]
+            rows = await db.fetch_rows(
+                f"SELECT {{foreign_key}}, state, prior FROM indicator_state WHERE interval = ? AND {{foreign_key}} IN ({','.join('?' * len(chunk))})",
+                (seconds, *chunk)
+            )
+            for stock_id, state, prior in rows:
+                _states[(stock_id, seconds)] = _Entry(
+                    IndicatorState.from_bytes(state), IndicatorState.from_bytes(prior) if prior else None
+                )
+
+async def rebuild(stock_ids: List[int], interval) -> Dict[int, _Entry]:
+    """Rebuilds states from each ticker's last LOOKBACK bars: a batch pass over all but the latest bar, then an
+    update with it, so the state before the latest bar is kept for revising it.
+
+    Every path that builds states from the bar store (seeding, stale bars in apply_bars, reset_all) goes through
+    here, so a ticker's state does not depend on how it was built.
+
+    Args:
+        stock_ids (List[int]): Tickers to rebuild.
+        interval: Interval name or seconds.
+
+    Returns:
+        Dict[int, _Entry]: Rebuilt entries per stock id (tickers without bars are omitted).
+    """
+    seconds = interval_seconds(interval)
+    rebuilt = {}
+    for start in range(0, len(stock_ids), 500):
+        ids, matrices = await load_bars(seconds, list(stock_ids[start:start + 500]), LOOKBACK)
+        if not len(ids):
+            continue
+        # Dropping the last column drops each ticker's latest bar, because histories are right-aligned
+        _, state = compute(*(matrices[name][:, :-1] for name in ("close", "high", "low", "volume")))
+        for i, stock_id in enumerate(ids):
+            prior = IndicatorState.from_batch(state, i, int(matrices["ts"][i, -2]) if state["n"][i] else None)
+            current = prior.copy()
+            current.update(int(matrices["ts"][i, -1]), matrices["high"][i, -1], matrices["low"][i, -1],
+                           matrices["close"][i, -1], matrices["volume"][i, -1])
+            entry = _Entry(current, prior)
+            _states[(int(stock_id), seconds)] = entry
+            rebuilt[int(stock_id)] = entry
+    return rebuilt
+
+async def _persist(keys: List[Tuple[int, int]]):
+    """Writes states and snapshot rows for the given keys in one transaction each."""
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    await db.upsert_many(
+        "indicator_state",
+        ["{foreign_key}", "interval", "state", "prior"],
+        [
+            (stock_id, seconds, _states[(stock_id, seconds)].current.to_bytes(),
+             _states[(stock_id, seconds)].prior.to_bytes() if _states[(stock_id, seconds)].prior else None)
+            for stock_id, seconds in keys
+        ],
+        conflict=["{foreign_key}", "interval"],
+        update=["state", "prior"]
+    )
+    rows = []
+    for stock_id, seconds in keys:
+        current = _states[(stock_id, seconds)].current
+        values = current.values()
+        row = [stock_id, seconds, current.ts]
+        row += [None if values[name] != values[name] else values[name] for name in SNAPSHOT_COLUMNS[1:]]
+        rows.append(tuple(row))
+    await write_snapshot(rows)
+
+async def apply_bars(rows: List[Tuple]) -> int:
+    """Advances indicator states with newly stored bars and refreshes their snapshot rows.
+
+    A bar with a new timestamp is applied on top of the current state; a revised bar for the latest timestamp
+    (the still-forming daily bar) is re-applied on top of the state before it. A bar older than the latest one
+    means history changed underneath the state, so that ticker is rebuilt from the bar store.
+
+    Args:
+        rows (List[Tuple]): (stock_id, interval_seconds, ts, open, high, low, close, volume) tuples, as passed to append_bars.
+
+    Returns:
+        int: Number of ticker states updated.
+    """
+    rows = sorted(rows, key=lambda row: (row[1], row[0], row[2]))
+    keys = list(dict.fromkeys((row[0], row[1]) for row in rows))
+    await _load(keys)
+
+    stale = {}
+    for stock_id, seconds, ts, _, high, low, close, volume in rows:
+        entry = _states.get((stock_id, seconds))
+        if entry is None or stock_id in stale.get(seconds, ()):
+            stale.setdefault(seconds, set()).add(stock_id)
+            continue
+        if entry.current.ts is None or ts > entry.current.ts:
+            entry.prior = entry.current.copy()
+            entry.current.update(ts, high, low, close, volume)
+        elif ts == entry.current.ts and entry.prior is not None:
+            entry.current = entry.prior.copy()
+            entry.current.update(ts, high, low, close, volume)
+        else:
+            stale.setdefault(seconds, set()).add(stock_id)
+
+    created = []
+    for seconds, stock_ids in stale.items():
+        created += [stock_id for stock_id in stock_ids if (stock_id, seconds) not in _states]
+        await rebuild(sorted(stock_ids), seconds)
+
+    keys = [key for key in keys if key in _states]
+    await _persist(keys)
+    if created:
+        await refresh_sentiment(created)
+    return len(keys)
+
+async def seed_all(interval="1d") -> int:
+    """Builds states for every ticker that has bars but no persisted state yet.
+
+    Returns:
+        int: Number of ticker states built.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    seconds = interval_seconds(interval)
+    rows = await db.fetch_rows(
+        """
+        SELECT DISTINCT b.{foreign_key} FROM bars b
+        WHERE b.interval = ? AND NOT EXISTS (
+            SELECT 1 FROM indicator_state s WHERE s.{foreign_key} = b.{foreign_key} AND s.interval = b.interval
+        )
+        """,
+        (seconds,)
+    )
+    stock_ids = [row[0] for row in rows]
+    if not stock_ids:
+        return 0
+    rebuilt = await rebuild(stock_ids, seconds)
+    await _persist([(stock_id, seconds) for stock_id in rebuilt])
+    await refresh_sentiment(list(rebuilt))
+    logger.info(f"Seeded indicator state for {len(rebuilt)} tickers at interval {seconds}s")
+    return len(rebuilt)
+
+async def reset_all(interval="1d") -> int:
+    """Rebuilds every ticker's state and snapshot row from the bar store, e.g. after bars were corrected in bulk.
+
+    Returns:
+        int: Number of ticker states replaced.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    seconds = interval_seconds(interval)
+    stock_ids = [row[0] for row in await db.fetch_rows(
+        "SELECT DISTINCT {foreign_key} FROM bars WHERE interval = ? ORDER BY {foreign_key}", (seconds,)
+    )]
+    rebuilt = await rebuild(stock_ids, seconds)
+    await _persist([(stock_id, seconds) for stock_id in rebuilt])
+    await refresh_sentiment(list(rebuilt))
+    DataVersions().bump("indicators")
+    logger.info(f"Reset indicator state for {len(rebuilt)} tickers at interval {seconds}s")
+    return len(rebuilt)
+
+class indicators:
+    def __init__(self):
+        pass
+
+    async def Gsad(self, cmd: str, varsIn: dict = None) -> dict | None:
+        varsIn = varsIn or {}
+        match cmd:
+            case "Rebuild":
+                # Recompute indicators and their incremental state for every ticker from the bar store
+                count = await reset_all(varsIn.get("Interval", "1d"))
+                return {"data": {"tickers": count}, "status": 200}
+            case _:
+                raise HTTPException(400, "Invalid Cmd")
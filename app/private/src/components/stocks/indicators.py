@@ -0,0 +1,250 @@
+import os
+import numpy as np
+from typing import Dict, List, Tuple
+from common.database import Database
+from components.stocks.bars import interval_seconds
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__)
+
+SMA_WINDOWS = (20, 50, 200)
+EMA_SPANS = (12, 26)
+MACD_SIGNAL_SPAN = 9
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+BOLLINGER_WINDOW = 20
+BOLLINGER_WIDTH = 2.0
+VOLUME_WINDOW = 20
+
+# Closes kept per ticker so the longest SMA window can drop its oldest value
+HISTORY = max(SMA_WINDOWS)
+# Bars per ticker loaded for a full recompute: the longest window plus enough bars for the EMA and Wilder
+# averages to forget their starting values
+LOOKBACK = max(int(os.getenv("INDICATOR_LOOKBACK", str(HISTORY + 300))), HISTORY)
+
+SNAPSHOT_COLUMNS = [
+    "ts", "close", "change", "volume",
+    "sma20", "sma50", "sma200", "ema12", "ema26",
+    "rsi14", "macd", "macd_signal", "macd_hist",
+    "bb_upper", "bb_middle", "bb_lower", "atr14", "volume_z",
+]
+
+def _alpha(span: int) -> float:
+    return 2.0 / (span + 1)
+
+def align(rows: List[tuple], lookback: int = 0) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Right-aligns per-ticker bar rows into (tickers x time) matrices.
+
+    Each ticker's most recent bar lands in the last column and shorter histories are padded with NaN on the
+    left, so column t-w always holds the bar w steps before column t for every ticker.
+
+    Args:
+        rows (List[tuple]): (stock_id, ts, open, high, low, close, volume) rows in any order.
+        lookback (int, optional): Keep only the most recent bars per ticker; 0 keeps everything.
+
+    Returns:
+        Tuple: Stock ids (N,) and a dict of (N, T) float64 matrices for ts/high/low/close/volume.
+    """
+    if not rows:
+        return np.empty(0, dtype=np.int64), {}
+    data = np.array(rows, dtype=np.float64)
+    # Sorting here is cheaper than an ORDER BY, which SQLite answers with a temp b-tree
+    data = data[np.lexsort((data[:, 1], data[:, 0]))]
+    stock_ids, starts, counts = np.unique(data[:, 0].astype(np.int64), return_index=True, return_counts=True)
+    group = np.repeat(np.arange(len(stock_ids)), counts)
+    rank = np.arange(len(data)) - starts[group]
+
+    width = int(counts.max()) if not lookback else min(int(counts.max()), lookback)
+    keep = rank >= counts[group] - width
+    col = width - counts[group] + rank
+
+    matrices = {}
+    for name, index in (("ts", 1), ("high", 3), ("low", 4), ("close", 5), ("volume", 6)):
+        matrix = np.full((len(stock_ids), width), np.nan)
+        matrix[group[keep], col[keep]] = data[keep, index]
+        matrices[name] = matrix
+
+    # Missing volume counts as zero; missing high/low collapse onto the close
+    valid = ~np.isnan(matrices["close"])
+    matrices["volume"] = np.where(valid, np.nan_to_num(matrices["volume"]), np.nan)
+    matrices["high"] = np.where(np.isnan(matrices["high"]), matrices["close"], matrices["high"])
+    matrices["low"] = np.where(np.isnan(matrices["low"]), matrices["close"], matrices["low"])
+    return stock_ids, matrices
+
+def compute(close: np.ndarray, high: np.ndarray, low: np.ndarray, volume: np.ndarray) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """Runs every indicator recurrence across all tickers at once, one time step per iteration.
+
+    The loop is over time only; each step is a handful of NumPy operations over the whole universe. Rolling
+    windows are maintained as running sums and EMA/Wilder averages as carried values, which is the same
+    arithmetic an incremental update performs bar by bar.
+
+    Args:
+        close, high, low, volume (np.ndarray): Right-aligned (N, T) matrices from align().
+
+    Returns:
+        Tuple: Latest indicator values per ticker (arrays of shape (N,), NaN where undefined) and the
+        recurrence state after the last bar.
+    """
+    tickers, steps = close.shape
+    n = np.zeros(tickers, dtype=np.int64)
+    sums = {w: np.zeros(tickers) for w in SMA_WINDOWS}
+    sumsq = np.zeros(tickers)
+    vol_sum = np.zeros(tickers)
+    vol_sumsq = np.zeros(tickers)
+    ema = {span: np.full(tickers, np.nan) for span in EMA_SPANS}
+    signal = np.full(tickers, np.nan)
+    avg_gain = np.zeros(tickers)
+    avg_loss = np.zeros(tickers)
+    atr = np.zeros(tickers)
+    prev = np.full(tickers, np.nan)
+    change = np.full(tickers, np.nan)
+    zeros = np.zeros(tickers)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for t in range(steps):
+            m = ~np.isnan(close[:, t])
+            x, h, l, v = close[:, t], high[:, t], low[:, t], volume[:, t]
+            n1 = n + m
+
+            for w in SMA_WINDOWS:
+                old = close[:, t - w] if t >= w else zeros
+                s = sums[w] + x
+                s = s - np.where(n1 > w, old, 0.0)
+                if w == BOLLINGER_WINDOW:
+                    sq = sumsq + x * x
+                    sq = sq - np.where(n1 > w, old * old, 0.0)
+                    sumsq = np.where(m, sq, sumsq)
+                sums[w] = np.where(m, s, sums[w])
+
+            old_v = volume[:, t - VOLUME_WINDOW] if t >= VOLUME_WINDOW else zeros
+            vs = vol_sum + v
+            vs = vs - np.where(n1 > VOLUME_WINDOW, old_v, 0.0)
+            vsq = vol_sumsq + v * v
+            vsq = vsq - np.where(n1 > VOLUME_WINDOW, old_v * old_v, 0.0)
+            vol_sum = np.where(m, vs, vol_sum)
+            vol_sumsq = np.where(m, vsq, vol_sumsq)
+
+            for span in EMA_SPANS:
+                e = np.where(n1 == 1, x, ema[span] + _alpha(span) * (x - ema[span]))
+                ema[span] = np.where(m, e, ema[span])
+            macd = ema[EMA_SPANS[0]] - ema[EMA_SPANS[1]]
+            sig = np.where(n1 == 1, macd, signal + _alpha(MACD_SIGNAL_SPAN) * (macd - signal))
+            signal = np.where(m, sig, signal)
+
+            # Wilder averages: plain sums until the period fills, then the mean, then (avg * (p - 1) + x) / p
+            d = x - prev
+            k = n1 - 1
+            for avg, move in ((avg_gain, np.maximum(d, 0.0)), (avg_loss, np.maximum(-d, 0.0))):
+                a = np.where(k <= RSI_PERIOD, avg + move, avg * (RSI_PERIOD - 1) + move)
+                a = np.where(k >= RSI_PERIOD, a / RSI_PERIOD, a)
+                avg[:] = np.where(m & (k >= 1), a, avg)
+
+            tr = np.where(n1 == 1, h - l, np.maximum(h - l, np.maximum(np.abs(h - prev), np.abs(l - prev))))
+            a = np.where(n1 <= ATR_PERIOD, atr + tr, atr * (ATR_PERIOD - 1) + tr)
+            a = np.where(n1 >= ATR_PERIOD, a / ATR_PERIOD, a)
+            atr = np.where(m, a, atr)
+
+            change = np.where(m, x - prev, change)
+            prev = np.where(m, x, prev)
+            n = n1
+
+        values = _values(n, close[:, -1] if steps else zeros, volume[:, -1] if steps else zeros, change, sums,
+                         sumsq, vol_sum, vol_sumsq, ema, signal, avg_gain, avg_loss, atr)
+
+    state = {
+        "n": n, "sums": sums, "sumsq": sumsq, "vol_sum": vol_sum, "vol_sumsq": vol_sumsq, "ema": ema,
+        "signal": signal, "avg_gain": avg_gain, "avg_loss": avg_loss, "atr": atr, "prev": prev,
+        "change": change, "closes": close[:, -HISTORY:], "volumes": volume[:, -VOLUME_WINDOW:],
+    }
+    return values, state
+
+def _values(n, x, v, change, sums, sumsq, vol_sum, vol_sumsq, ema, signal, avg_gain, avg_loss, atr) -> Dict[str, np.ndarray]:
+    """Derives the published indicator values from the recurrence state."""
+    values = {"close": x, "change": np.where(n >= 2, change, np.nan), "volume": v}
+    for w in SMA_WINDOWS:
+        values[f"sma{w}"] = np.where(n >= w, sums[w] / w, np.nan)
+    for span in EMA_SPANS:
+        values[f"ema{span}"] = ema[span]
+    values["macd"] = ema[EMA_SPANS[0]] - ema[EMA_SPANS[1]]
+    values["macd_signal"] = signal
+    values["macd_hist"] = values["macd"] - signal
+
+    rs = avg_gain / avg_loss
+    rsi = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), 100.0 - 100.0 / (1.0 + rs))
+    values[f"rsi{RSI_PERIOD}"] = np.where(n - 1 >= RSI_PERIOD, rsi, np.nan)
+
+    mid = sums[BOLLINGER_WINDOW] / BOLLINGER_WINDOW
+    std = np.sqrt(np.maximum(sumsq / BOLLINGER_WINDOW - mid * mid, 0.0))
+    full = n >= BOLLINGER_WINDOW
+    values["bb_middle"] = np.where(full, mid, np.nan)
+    values["bb_upper"] = np.where(full, mid + BOLLINGER_WIDTH * std, np.nan)
+    values["bb_lower"] = np.where(full, mid - BOLLINGER_WIDTH * std, np.nan)
+
+    values[f"atr{ATR_PERIOD}"] = np.where(n >= ATR_PERIOD, atr, np.nan)
+
+    mean_v = vol_sum / VOLUME_WINDOW
+    std_v = np.sqrt(np.maximum(vol_sumsq / VOLUME_WINDOW - mean_v * mean_v, 0.0))
+    z = np.where(std_v > 0, (v - mean_v) / std_v, 0.0)
+    values["volume_z"] = np.where(n >= VOLUME_WINDOW, z, np.nan)
+    return values
+
+async def write_snapshot(rows: List[tuple]) -> int:
+    """Upserts indicator_snapshot rows in one transaction."""
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    return await db.upsert_many(
+        "indicator_snapshot",
+        ["{foreign_key}", "interval"] + SNAPSHOT_COLUMNS,
+        rows,
+        conflict=["{foreign_key}", "interval"],
+        update=SNAPSHOT_COLUMNS
+    )
+
+async def refresh_sentiment(stock_ids: List[int] = None):
+    """Copies each ticker's latest sentiment label into indicator_snapshot.
+
+    Args:
+        stock_ids (List[int], optional): Tickers to refresh; None refreshes every snapshot row.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    query = """
+        UPDATE indicator_snapshot SET sentiment = (
+            SELECT n.sentiment_label FROM {news_table} n
+            WHERE n.{foreign_key} = indicator_snapshot.{foreign_key} AND n.sentiment_label IS NOT NULL
+            ORDER BY n.date DESC, n.id DESC
+            LIMIT 1
+        )
+    """
+    if stock_ids is None:
+        await db.execute(query)
+        return
+    stock_ids = list(dict.fromkeys(stock_ids))
+    for start in range(0, len(stock_ids), 500):
+        chunk = stock_ids[start:start + 500]
+        await db.execute(f"{query} WHERE {{foreign_key}} IN ({','.join('?' * len(chunk))})", tuple(chunk))
+
+async def load_bars(interval, stock_ids: List[int], lookback: int = LOOKBACK) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Loads the last `lookback` bars of each ticker as right-aligned matrices (see align()).
+
+    Every indicator state is built over this window, whether a ticker is seeded, rebuilt after a history change
+    or reset with the Indicators.Rebuild command, so one ticker gets the same values whichever way it was built.
+
+    Args:
+        interval: Interval name or seconds.
+        stock_ids (List[int]): Tickers to load (at most 500 per call, for the IN clause).
+        lookback (int, optional): Most recent bars per ticker to load.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    # Only the last `lookback` bars per ticker leave SQLite, however long the stored history is
+    rows = await db.fetch_rows(
+        f"""
+        SELECT {{foreign_key}}, ts, open, high, low, close, volume FROM (
+            SELECT {{foreign_key}}, ts, open, high, low, close, volume,
+                   ROW_NUMBER() OVER (PARTITION BY {{foreign_key}} ORDER BY ts DESC) AS recent
+            FROM bars
+            WHERE interval = ? AND {{foreign_key}} IN ({','.join('?' * len(stock_ids))})
+        )
+        WHERE recent <= ?
+        """,
+        (interval_seconds(interval), *stock_ids, lookback)
+    )
+    return align(rows, lookback)
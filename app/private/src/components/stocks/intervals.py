@@ -0,0 +1,11 @@
+# Bar intervals are stored as their length in seconds. Kept free of pandas and numpy so the command registry can
+# validate interval names without importing the bar store.
+INTERVALS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1h": 3600,
+    "1d": 86400,
+    "1wk": 604800,
+}
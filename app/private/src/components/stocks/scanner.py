@@ -0,0 +1,184 @@
+from fastapi import HTTPException
+import re
+from functools import lru_cache
+from typing import List, Tuple
+from common.database import Database
+from components.stocks.bars import INTERVALS
+from components.stocks.indicators import SNAPSHOT_COLUMNS
+
+# Columns a scan may filter and sort on; ts is internal
+NUMERIC_FIELDS = [column for column in SNAPSHOT_COLUMNS if column != "ts"]
+TEXT_FIELDS = ["ticker", "sentiment"]
+FIELDS = NUMERIC_FIELDS + TEXT_FIELDS
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+_TOKEN = re.compile(r"""\s*(?:(?P<op><=|>=|!=|<>|=|<|>)|(?P<lparen>\()|(?P<rparen>\))|(?P<number>-?\d+(?:\.\d+)?)|(?P<string>'[^']*'|"[^"]*")|(?P<word>[A-Za-z_][A-Za-z0-9_.]*))""")
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    tokens, position = [], 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Unexpected input at position {position}: {expression[position:position + 10]!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+class _Parser:
+    """Recursive-descent parser turning a filter expression into a parameterized SQL condition.
+
+    Grammar:
+        expr       := and_expr (OR and_expr)*
+        and_expr   := not_expr (AND not_expr)*
+        not_expr   := NOT not_expr | '(' expr ')' | comparison
+        comparison := field op (number | field | word | 'string')
+    """
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.position = 0
+        self.params = []
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _next(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def _keyword(self, word: str) -> bool:
+        kind, value = self._peek()
+        if kind == "word" and value.upper() == word:
+            self.position += 1
+            return True
+        return False
+
+    def parse(self) -> str:
+        sql = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected token {self._peek()[1]!r}")
+        return sql
+
+    def _or(self) -> str:
+        parts = [self._and()]
+        while self._keyword("OR"):
+            parts.append(self._and())
+        return parts[0] if len(parts) == 1 else "(" + " OR ".join(parts) + ")"
+
+    def _and(self) -> str:
+        parts = [self._not()]
+        while self._keyword("AND"):
+            parts.append(self._not())
+        return parts[0] if len(parts) == 1 else "(" + " AND ".join(parts) + ")"
+
+    def _not(self) -> str:
+        if self._keyword("NOT"):
+            return f"NOT {self._not()}"
+        if self._peek()[0] == "lparen":
+            self._next()
+            sql = self._or()
+            if self._next()[0] != "rparen":
+                raise ValueError("Missing closing parenthesis")
+            return f"({sql})"
+        return self._comparison()
+
+    def _field(self, name: str) -> str:
+        field = name.lower()
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field {name!r}; expected one of {FIELDS}")
+        return "s.ticker" if field == "ticker" else f"i.{field}"
+
+    def _comparison(self) -> str:
+        kind, name = self._next()
+        if kind != "word":
+            raise ValueError(f"Expected a field name, got {name!r}")
+        field = self._field(name)
+        kind, op = self._next()
+        if kind != "op":
+            raise ValueError(f"Expected a comparison operator after {name!r}")
+        op = "!=" if op == "<>" else op
+
+        kind, value = self._next()
+        if kind == "number":
+            self.params.append(float(value))
+            return f"{field} {op} ?"
+        if kind == "string":
+            self.params.append(value[1:-1])
+            return f"{field} {op} ?"
+        if kind == "word":
+            # A bare word is another field when it names one (close>sma50), otherwise a text literal (sentiment=positive)
+            if value.lower() in FIELDS:
+                return f"{field} {op} {self._field(value)}"
+            text = value.upper() if field == "s.ticker" else value.lower()
+            self.params.append(text)
+            return f"{field} {op} ?"
+        raise ValueError(f"Expected a value after {name} {op}")
+
+@lru_cache(maxsize=1024)
+def compile_filter(expression: str) -> Tuple[str, tuple]:
+    """Compiles a filter expression such as "rsi14<30 AND close>sma50 AND sentiment=positive".
+
+    Args:
+        expression (str): Filter expression.
+
+    Returns:
+        Tuple[str, tuple]: SQL condition over the aliases i (indicator_snapshot) and s (stocks), and its parameters.
+    """
+    if not expression or not expression.strip():
+        return "1 = 1", ()
+    parser = _Parser(_tokenize(expression))
+    return parser.parse(), tuple(parser.params)
+
+def compile_order(sort: str) -> str:
+    """Compiles "field" or "-field" (descending) into an ORDER BY clause."""
+    if not sort:
+        return "s.ticker ASC"
+    descending = sort.startswith("-")
+    field = sort.lstrip("+-").lower()
+    if field not in FIELDS:
+        raise ValueError(f"Unknown sort field {field!r}; expected one of {FIELDS}")
+    column = "s.ticker" if field == "ticker" else f"i.{field}"
+    # NULLs (indicator not yet defined) always sort last
+    return f"{column} IS NULL, {column} {'DESC' if descending else 'ASC'}, s.ticker ASC"
+
+class scanner:
+    def __init__(self):
+        pass
+
+    async def Gsad(self, cmd: str, varsIn: dict = None) -> dict | None:
+        varsIn = varsIn or {}
+        match cmd:
+            case "Run":
+                # Initialize Database
+                db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+
+                interval = varsIn.get("Interval", "1d")
+                if interval not in INTERVALS:
+                    raise HTTPException(400, f"Invalid Interval: {interval}")
+                try:
+                    condition, params = compile_filter(varsIn.get("Filter", ""))
+                    order = compile_order(varsIn.get("Sort", ""))
+                    limit = min(max(int(varsIn.get("Limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+                except ValueError as e:
+                    raise HTTPException(400, f"Invalid scan: {str(e)}")
+
+                # One query over the precomputed snapshot, a row per ticker
+                query = f"""
+                    SELECT s.ticker, i.{', i.'.join(SNAPSHOT_COLUMNS)}, i.sentiment
+                    FROM indicator_snapshot i
+                    JOIN {{primary_table}} s ON s.id = i.{{foreign_key}}
+                    WHERE i.interval = ? AND {condition}
+                    ORDER BY {order}
+                    LIMIT ?
+                """
+                results = await db.fetch_all(query, (INTERVALS[interval], *params, limit))
+
+                # Return response with data key
+                return {"data": results, "status": 200}
+            case _:
+                raise HTTPException(400, "Invalid Cmd")
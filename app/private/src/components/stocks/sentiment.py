@@ -1,44 +1,197 @@
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+import base64
 import json
 import os
 import string
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
 from common.database import Database
+from components.retention import archive
+from components.stocks.sentiment_agg import BUCKETS, read_series
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+# Rows fetched per query while streaming; memory stays bounded by one page however many rows are sent
+STREAM_PAGE_SIZE = int(os.getenv("SENTIMENT_STREAM_PAGE_SIZE", "1000"))
+DEFAULT_SERIES_POINTS = 500
+MAX_SERIES_POINTS = 5000
+
+def to_epoch(value: str) -> int:
+    """Converts a From/To value (YYYY-MM-DD with optional HH:MM[:SS], UTC) to epoch seconds."""
+    try:
+        return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+
+def encode_cursor(date: str, row_id: int) -> str:
+    """Encodes the (date, id) of the last row on a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps([date, row_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Decodes a cursor from encode_cursor, raising ValueError if it was not produced by it."""
+    try:
+        date, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(date), int(row_id)
+    except Exception:
+        raise ValueError(f"Invalid Cursor: {cursor}")
+
+async def build_query(db: Database, varsIn: dict) -> Tuple[str, list, dict]:
+    """Builds the filter conditions for a news listing.
+
+    Args:
+        db (Database): Database used to resolve tickers to stock ids.
+        varsIn (dict): Optional Ticker (comma separated), From/To (inclusive dates), Label and Source filters.
+
+    Returns:
+        Tuple[str, list, dict]: WHERE conditions joined with AND, their parameters, and the same filters for
+        archive.read_news.
+    """
+    conditions, params, filters = [], [], {}
+    if varsIn.get("Ticker"):
+        tickers = [ticker.strip().upper() for ticker in varsIn["Ticker"].split(",") if ticker.strip()]
+        # Literal ids (rather than a subquery) let SQLite walk the (stock_id, date) index in page order
+        rows = await db.fetch_rows(
+            f"SELECT id FROM {{primary_table}} WHERE ticker IN ({','.join('?' * len(tickers))})", tuple(tickers)
+        )
+        if not rows:
+            return "0 = 1", [], {"stock_ids": []}
+        conditions.append(f"n.{{foreign_key}} IN ({','.join('?' * len(rows))})")
+        params += [row[0] for row in rows]
+        filters["stock_ids"] = [row[0] for row in rows]
+    if varsIn.get("From"):
+        conditions.append("n.date >= ?")
+        params.append(varsIn["From"])
+        filters["from"] = varsIn["From"]
+    if varsIn.get("To"):
+        conditions.append("n.date <= ?")
+        params.append(varsIn["To"])
+        filters["to"] = varsIn["To"]
+    if varsIn.get("Label"):
+        conditions.append("n.sentiment_label = ?")
+        params.append(varsIn["Label"].lower())
+        filters["label"] = varsIn["Label"].lower()
+    if varsIn.get("Source"):
+        conditions.append("n.source = ?")
+        params.append(varsIn["Source"])
+        filters["source"] = varsIn["Source"]
+    return " AND ".join(conditions) or "1 = 1", params, filters
+
+async def fetch_page(db: Database, conditions: str, params: list, filters: dict, after: Optional[Tuple[str, int]], limit: int) -> List[tuple]:
+    """Fetches one page of (id, ticker, label, date, description, source) rows older than the cursor, from the table
+    and from stories archived by components.retention."""
+    query = f"""
+        SELECT n.id, s.ticker, n.sentiment_label, n.date, n.description, n.source
+        FROM {{news_table}} n
+        LEFT JOIN {{primary_table}} s ON n.{{foreign_key}} = s.id
+        WHERE {conditions} {"AND (n.date, n.id) < (?, ?)" if after else ""}
+        ORDER BY n.date DESC, n.id DESC
+        LIMIT ?
+    """
+    rows = await db.fetch_rows(query, (*params, *(after or ()), limit))
+    # A full page only needs archived rows newer than its last row; archived stories are normally older than any
+    # left in the table, so this reads no archive file until the table runs out
+    archived = await archive.read_news(filters, before=after, limit=limit, after=(rows[-1][3], rows[-1][0]) if len(rows) == limit else None)
+    if not archived:
+        return rows
+    rows = sorted(rows + archived, key=lambda row: (row[3], row[0]), reverse=True)
+    return rows[:limit]
+
+def format_row(row: tuple) -> dict:
+    _, ticker, label, date, description, source = row
+    return {
+        "ticker": ticker,
+        "Sentiment_Label": label if label else "N/A",
+        "Date": date,
+        "Description": description if description else "N/A",
+        "Source": source
+    }
+
+async def stream_rows(db: Database, conditions: str, params: list, filters: dict, after: Optional[Tuple[str, int]], limit: Optional[int]) -> AsyncIterator[dict]:
+    """Yields formatted rows page by page, so no more than one page is held in memory."""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page_size = STREAM_PAGE_SIZE if remaining is None else min(STREAM_PAGE_SIZE, remaining)
+        rows = await fetch_page(db, conditions, params, filters, after, page_size)
+        for row in rows:
+            yield format_row(row)
+        if len(rows) < page_size:
+            return
+        after = (rows[-1][3], rows[-1][0])
+        if remaining is not None:
+            remaining -= len(rows)
+
+async def ndjson_body(rows: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield (json.dumps(row) + "\n").encode()
+
+async def json_body(rows: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    # Same {"data": [...], "status": 200} document as a paged response, written incrementally
+    yield b'{"data": ['
+    first = True
+    async for row in rows:
+        yield (b"" if first else b",") + json.dumps(row).encode()
+        first = False
+    yield b'], "status": 200}'
 
 class sentiment:
     def __init__(self):
         pass
 
     async def Gsad(self, cmd: str, varsIn: dict = None) -> dict | None:
+        varsIn = varsIn or {}
         match cmd:
             case "Get":
                 raise HTTPException(400, "Invalid Cmd")
             case "GetList":
                 # Initialize Database
                 db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
-                
-                # Query to get all sentiment rows with ticker and all relevant fields
-                query = """
-                    SELECT s.ticker, n.sentiment_label, n.date, n.description, n.source
-                    FROM {news_table} n
-                    LEFT JOIN {primary_table} s ON n.{foreign_key} = s.id
-                    ORDER BY n.date DESC
-                """
-                results = await db.fetch_all(query)
-
-                # Format results as array of objects with explicit keys
-                result_array = [
-                    {
-                        "ticker": row["ticker"],
-                        "Sentiment_Label": row["sentiment_label"] if row["sentiment_label"] else "N/A",
-                        "Date": row["date"],
-                        "Description": row["description"] if row["description"] else "N/A",
-                        "Source": row["source"]
-                    }
-                    for row in results
-                ]
+
+                try:
+                    conditions, params, filters = await build_query(db, varsIn)
+                    after = decode_cursor(varsIn["Cursor"]) if varsIn.get("Cursor") else None
+                    limit = int(varsIn["Limit"]) if varsIn.get("Limit") else None
+                except ValueError as e:
+                    raise HTTPException(400, str(e))
+
+                # Stream=ndjson|json sends every matching row (up to Limit) without materializing the result
+                stream = varsIn.get("Stream", "").lower()
+                if stream:
+                    if stream not in ("ndjson", "json"):
+                        raise HTTPException(400, f"Invalid Stream: {stream}")
+                    rows = stream_rows(db, conditions, params, filters, after, max(limit, 0) if limit is not None else None)
+                    if stream == "ndjson":
+                        return StreamingResponse(ndjson_body(rows), media_type="application/x-ndjson")
+                    return StreamingResponse(json_body(rows), media_type="application/json")
+
+                # Newest first, one page per request; pass next_cursor back as Cursor for the next page
+                limit = min(max(limit if limit is not None else DEFAULT_LIMIT, 1), MAX_LIMIT)
+                rows = await fetch_page(db, conditions, params, filters, after, limit)
+                next_cursor = encode_cursor(rows[-1][3], rows[-1][0]) if len(rows) == limit else None
 
                 # Return response with data key
-                return {"data": result_array, "status": 200}
+                return {"data": [format_row(row) for row in rows], "next_cursor": next_cursor, "status": 200}
+            case "GetSeries":
+                # Label counts, net score and decayed sentiment per hour or day, read from the maintained aggregates
+                db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+
+                ticker = varsIn.get("Ticker", "").strip().upper()
+                interval = varsIn.get("Interval") or "1d"
+                if interval not in BUCKETS:
+                    raise HTTPException(400, f"Invalid Interval: {interval}")
+                try:
+                    start = to_epoch(varsIn["From"]) if varsIn.get("From") else None
+                    end = to_epoch(varsIn["To"]) if varsIn.get("To") else None
+                except ValueError as e:
+                    raise HTTPException(400, str(e))
+                limit = min(max(int(varsIn["Limit"]) if varsIn.get("Limit") else DEFAULT_SERIES_POINTS, 1), MAX_SERIES_POINTS)
+
+                row = await db.fetch_one("SELECT id FROM {primary_table} WHERE ticker = ?", (ticker,))
+                points = await read_series(row["id"], interval, start, end, limit) if row else []
+                for point in points:
+                    point["date"] = datetime.fromtimestamp(point["ts"], timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+                return {"data": {"ticker": ticker, "interval": interval, "points": points}, "status": 200}
             case "Set":
                 raise HTTPException(400, "Invalid Cmd")
             case "Add":
@@ -48,4 +201,4 @@ class sentiment:
             case "DelAll":
                 raise HTTPException(400, "Invalid Cmd")
             case _:
-                raise HTTPException(400, "Invalid Cmd")
\ No newline at end of file
+                raise HTTPException(400, "Invalid Cmd")
@@ -0,0 +1,147 @@
+import os
+from typing import List, Optional
+from common.database import Database
+from common.response_cache import DataVersions
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__)
+
+# Aggregate bucket lengths in seconds, by Sentiment.GetSeries interval name
+BUCKETS = {"1h": 3600, "1d": 86400}
+# Half-life of the decayed moving sentiment, and how many half-lives before a series' first point are read to seed it
+DECAY_HALF_LIFE_HOURS = float(os.getenv("SENTIMENT_DECAY_HALF_LIFE_HOURS", "24"))
+DECAY_SEED_HALF_LIVES = 8
+
+# Story time in epoch seconds; rows stored before published_at existed fall back to their date at 00:00 UTC
+_STORY_TS = "COALESCE(published_at, CAST(strftime('%s', date) AS INTEGER))"
+
+# Adds one newly labeled story (params: bucket, bucket, bucket, news id) to its ticker's bucket. Every row is
+# labeled once, so counts are only ever incremented. The net score sums positive - negative probability.
+AGG_UPSERT = f"""
+    INSERT INTO sentiment_agg ({{foreign_key}}, bucket, ts, positive, negative, neutral, score)
+    SELECT {{foreign_key}}, ?, {_STORY_TS} / ? * ?,
+           sentiment_label = 'positive', sentiment_label = 'negative', sentiment_label = 'neutral',
+           COALESCE(sentiment_positive, sentiment_label = 'positive') - COALESCE(sentiment_negative, sentiment_label = 'negative')
+    FROM {{news_table}}
+    WHERE id = ? AND {{foreign_key}} IS NOT NULL AND sentiment_label IS NOT NULL
+    ON CONFLICT ({{foreign_key}}, bucket, ts) DO UPDATE SET
+        positive = positive + excluded.positive,
+        negative = negative + excluded.negative,
+        neutral = neutral + excluded.neutral,
+        score = score + excluded.score
+"""
+
+def agg_params(row_ids: List[int]) -> List[tuple]:
+    """AGG_UPSERT parameters adding the given newly labeled rows to every bucket length."""
+    return [(bucket, bucket, bucket, row_id) for row_id in row_ids for bucket in BUCKETS.values()]
+
+async def rebuild() -> int:
+    """Recreates sentiment_agg from the labeled rows of news_table in one transaction.
+
+    Stories already moved to the Parquet archive by components.retention are not in news_table, so a rebuild after
+    archiving drops their buckets.
+
+    Returns:
+        int: Number of aggregate rows written.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    statements = [("DELETE FROM sentiment_agg", [()])]
+    for bucket in BUCKETS.values():
+        statements.append((f"""
+            INSERT INTO sentiment_agg ({{foreign_key}}, bucket, ts, positive, negative, neutral, score)
+            SELECT {{foreign_key}}, ?, {_STORY_TS} / ? * ? AS bucket_ts,
+                   SUM(sentiment_label = 'positive'), SUM(sentiment_label = 'negative'), SUM(sentiment_label = 'neutral'),
+                   SUM(COALESCE(sentiment_positive, sentiment_label = 'positive') - COALESCE(sentiment_negative, sentiment_label = 'negative'))
+            FROM {{news_table}}
+            WHERE {{foreign_key}} IS NOT NULL AND sentiment_label IS NOT NULL
+            GROUP BY {{foreign_key}}, bucket_ts
+        """, [(bucket, bucket, bucket)]))
+    _, *written = await db.execute_transaction(statements)
+    DataVersions().bump("sentiment")
+    logger.info(f"Rebuilt sentiment_agg with {sum(written)} buckets")
+    return sum(written)
+
+async def ensure() -> int:
+    """Builds sentiment_agg on first start (an existing database with labeled news but no aggregates yet).
+
+    Returns:
+        int: Number of aggregate rows written, 0 when the table already had rows.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    if await db.fetch_one("SELECT 1 AS present FROM sentiment_agg LIMIT 1"):
+        return 0
+    return await rebuild()
+
+async def read_series(stock_id: int, interval: str, start: Optional[int], end: Optional[int], limit: int) -> List[dict]:
+    """Reads up to `limit` buckets of one ticker, oldest first, with the decayed moving sentiment of each.
+
+    The decayed value weighs every story by 0.5 ** (age / half-life): at each bucket the running sums of scores and
+    story counts decay by the time since the previous bucket, then take in the bucket's own. Buckets before `start`
+    (up to DECAY_SEED_HALF_LIVES half-lives back) only seed the running sums, so the cost stays proportional to the
+    number of points returned.
+
+    Args:
+        stock_id (int): Ticker id.
+        interval (str): Bucket length name from BUCKETS.
+        start (int, optional): First bucket time (epoch seconds); default: the `limit` buckets before `end`.
+        end (int, optional): Last bucket time (epoch seconds), inclusive; default: the latest bucket.
+
+    Returns:
+        List[dict]: Points with ts, positive/negative/neutral counts, count, net score and decayed sentiment.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    bucket = BUCKETS[interval]
+    half_life = DECAY_HALF_LIFE_HOURS * 3600
+    end = end if end is not None else 2 ** 62
+    if start is None:
+        # Newest `limit` buckets, read backwards along the primary key
+        rows = await db.fetch_rows(
+            """
+            SELECT ts, positive, negative, neutral, score FROM sentiment_agg
+            WHERE {foreign_key} = ? AND bucket = ? AND ts <= ?
+            ORDER BY ts DESC LIMIT ?
+            """,
+            (stock_id, bucket, end, limit)
+        )
+        rows.reverse()
+        if not rows:
+            return []
+        start = rows[0][0]
+    else:
+        rows = await db.fetch_rows(
+            """
+            SELECT ts, positive, negative, neutral, score FROM sentiment_agg
+            WHERE {foreign_key} = ? AND bucket = ? AND ts BETWEEN ? AND ?
+            ORDER BY ts LIMIT ?
+            """,
+            (stock_id, bucket, start, end, limit)
+        )
+    seed = await db.fetch_rows(
+        """
+        SELECT ts, positive + negative + neutral, score FROM sentiment_agg
+        WHERE {foreign_key} = ? AND bucket = ? AND ts >= ? AND ts < ?
+        ORDER BY ts
+        """,
+        (stock_id, bucket, int(start - DECAY_SEED_HALF_LIVES * half_life), start)
+    )
+
+    weighted, weight, last_ts = 0.0, 0.0, None
+    for ts, count, score in seed:
+        decay = 0.5 ** ((ts - last_ts) / half_life) if last_ts is not None else 0.0
+        weighted, weight, last_ts = weighted * decay + score, weight * decay + count, ts
+
+    points = []
+    for ts, positive, negative, neutral, score in rows:
+        count = positive + negative + neutral
+        decay = 0.5 ** ((ts - last_ts) / half_life) if last_ts is not None else 0.0
+        weighted, weight, last_ts = weighted * decay + score, weight * decay + count, ts
+        points.append({
+            "ts": ts,
+            "positive": positive,
+            "negative": negative,
+            "neutral": neutral,
+            "count": count,
+            "net": score / count if count else 0.0,
+            "decayed": weighted / weight if weight else 0.0,
+        })
+    return points
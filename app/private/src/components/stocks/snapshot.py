@@ -0,0 +1,124 @@
+from typing import List, Optional
+from common.database import Database
+from common.pubsub import Hub
+from common.response_cache import DataVersions
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__)
+
+# Applies one fetched price: a newer date rolls close into prev_close, a revised bar for the same date only
+# replaces close/volume, and an older date is ignored. SET expressions see the row as it was before the update.
+PRICE_UPSERT = """
+    INSERT INTO ticker_snapshot ({foreign_key}, ticker, date, close, volume)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT ({foreign_key}) DO UPDATE SET
+        prev_close = CASE WHEN ticker_snapshot.date IS NULL OR excluded.date > ticker_snapshot.date
+                          THEN ticker_snapshot.close ELSE ticker_snapshot.prev_close END,
+        change = excluded.close - CASE WHEN ticker_snapshot.date IS NULL OR excluded.date > ticker_snapshot.date
+                                       THEN ticker_snapshot.close ELSE ticker_snapshot.prev_close END,
+        date = excluded.date,
+        close = excluded.close,
+        volume = excluded.volume
+    WHERE ticker_snapshot.date IS NULL OR excluded.date >= ticker_snapshot.date
+"""
+
+# Applies one new sentiment label (label, date, stock_id); only a story at least as recent as the current one wins
+SENTIMENT_UPSERT = """
+    INSERT INTO ticker_snapshot ({foreign_key}, ticker, sentiment_label, sentiment_date)
+    SELECT id, ticker, ?, ? FROM {primary_table} WHERE id = ?
+    ON CONFLICT ({foreign_key}) DO UPDATE SET
+        sentiment_label = excluded.sentiment_label,
+        sentiment_date = excluded.sentiment_date
+    WHERE ticker_snapshot.sentiment_date IS NULL OR excluded.sentiment_date >= ticker_snapshot.sentiment_date
+"""
+
+async def rebuild() -> int:
+    """Recreates ticker_snapshot from stock_data and news_table in one transaction.
+
+    Returns:
+        int: Number of snapshot rows written.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    _, written = await db.execute_transaction([
+        ("DELETE FROM ticker_snapshot", [()]),
+        ("""
+            INSERT INTO ticker_snapshot ({foreign_key}, ticker, date, close, prev_close, change, volume, sentiment_label, sentiment_date)
+            WITH prices AS (
+                SELECT {foreign_key}, date, close, volume,
+                       LAG(close) OVER (PARTITION BY {foreign_key} ORDER BY date) AS prev_close,
+                       ROW_NUMBER() OVER (PARTITION BY {foreign_key} ORDER BY date DESC) AS position
+                FROM {secondary_table}
+            ),
+            labels AS (
+                SELECT {foreign_key}, sentiment_label, date,
+                       ROW_NUMBER() OVER (PARTITION BY {foreign_key} ORDER BY date DESC, id DESC) AS position
+                FROM {news_table}
+                WHERE sentiment_label IS NOT NULL
+            )
+            SELECT s.id, s.ticker, p.date, p.close, p.prev_close, p.close - p.prev_close, p.volume,
+                   l.sentiment_label, l.date
+            FROM {primary_table} s
+            LEFT JOIN prices p ON p.{foreign_key} = s.id AND p.position = 1
+            LEFT JOIN labels l ON l.{foreign_key} = s.id AND l.position = 1
+            WHERE p.date IS NOT NULL OR l.date IS NOT NULL
+        """, [()]),
+    ])
+    DataVersions().bump("prices", "sentiment")
+    logger.info(f"Rebuilt ticker_snapshot with {written} tickers")
+    return written
+
+async def ensure() -> int:
+    """Builds ticker_snapshot on first start (an existing database with no snapshot yet).
+
+    Returns:
+        int: Number of snapshot rows written, 0 when the snapshot already had rows.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    if await db.fetch_one("SELECT 1 AS present FROM ticker_snapshot LIMIT 1"):
+        return 0
+    return await rebuild()
+
+def _format(row: tuple) -> dict:
+    ticker, close, change, sentiment_label = row
+    # Shared by Tickers.GetList and the live stream, so both send the same fields
+    return {"ticker": ticker, "Close": close, "Change": change, "Sentiment_Label": sentiment_label if sentiment_label else "N/A"}
+
+async def read(tickers: Optional[List[str]] = None) -> List[dict]:
+    """Reads snapshot rows with a close, for the given tickers or all of them.
+
+    Returns:
+        List[dict]: ticker, Close, Change and Sentiment_Label per ticker.
+    """
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    query = "SELECT ticker, close, change, sentiment_label FROM ticker_snapshot WHERE close IS NOT NULL"
+    if tickers is None:
+        return [_format(row) for row in await db.fetch_rows(query)]
+    results = []
+    tickers = list(tickers)
+    for start in range(0, len(tickers), 500):
+        chunk = tickers[start:start + 500]
+        rows = await db.fetch_rows(f"{query} AND ticker IN ({','.join('?' * len(chunk))})", tuple(chunk))
+        results += [_format(row) for row in rows]
+    return results
+
+async def publish(stock_ids: List[int]):
+    """Publishes the committed snapshot rows of these tickers to live subscribers."""
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    hub = Hub()
+    if not hub.subscribers:
+        # Nothing is published, so the last published values would go stale and hide real changes later
+        hub.latest.clear()
+        return
+    stock_ids = [stock_id for stock_id in dict.fromkeys(stock_ids) if stock_id is not None]
+    for start in range(0, len(stock_ids), 500):
+        chunk = stock_ids[start:start + 500]
+        rows = await db.fetch_rows(
+            f"""
+            SELECT ticker, close, change, sentiment_label FROM ticker_snapshot
+            WHERE close IS NOT NULL AND {{foreign_key}} IN ({','.join('?' * len(chunk))})
+            """,
+            tuple(chunk)
+        )
+        for row in rows:
+            fields = _format(row)
+            hub.publish(fields.pop("ticker"), fields)
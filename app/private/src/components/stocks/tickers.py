@@ -2,7 +2,6 @@ from fastapi import HTTPException
 import json
 import os
 import string
-from common.database import Database
 
 class tickers:
     def __init__(self):
@@ -13,40 +12,17 @@ class tickers:
             case "Get":
                 raise HTTPException(400, "Invalid Cmd")
             case "GetList":
-                # Initialize Database
-                db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
-                
-                # Query to get all tickers, latest close price, and latest sentiment label
-                query = """
-                    SELECT s.ticker, sd.close, (
-                        SELECT n.sentiment_label
-                        FROM {news_table} n
-                        WHERE n.{foreign_key} = s.id
-                        ORDER BY n.date DESC
-                        LIMIT 1
-                    ) as sentiment_label
-                    FROM {primary_table} s
-                    LEFT JOIN {secondary_table} sd ON s.id = sd.{foreign_key}
-                    WHERE sd.date = (
-                        SELECT MAX(date)
-                        FROM {secondary_table}
-                        WHERE {foreign_key} = s.id
-                    )
-                """
-                results = await db.fetch_all(query)
+                from components.stocks.snapshot import read
 
-                # Format results as array of objects with explicit keys
-                result_array = [
-                    {
-                        "ticker": row["ticker"],
-                        "Close": row["close"],
-                        "Sentiment_Label": row["sentiment_label"] if row["sentiment_label"] else "N/A"
-                    }
-                    for row in results
-                ]
+                # One scan of the snapshot table kept current by the ingest and scoring jobs, formatted like the
+                # live stream's events
+                return {"data": await read(), "status": 200}
+            case "Rebuild":
+                from components.stocks.snapshot import rebuild
 
-                # Return response with data key
-                return {"data": result_array, "status": 200}
+                # Recreate the snapshot from stock_data and news_table
+                count = await rebuild()
+                return {"data": {"tickers": count}, "status": 200}
             case "Set":
                 raise HTTPException(400, "Invalid Cmd")
             case "Add":
@@ -1,13 +1,26 @@
-from fastapi import FastAPI
-from routers import router as router
-from utils.cron import startup, shutdown
+from utils.warmup import Warmup, phase, timed
+
+with phase("import fastapi"):
+    from fastapi import FastAPI
+with phase("import routers"):
+    from routers import router as router
+    from routers.registry import CommandRegistry
+with phase("import scheduler"):
+    from utils.cron import startup, shutdown
 
 # Create API
 app = FastAPI()
 
+# Compile command validators once; component modules are imported on first use or by the warm-up
+app.add_event_handler("startup", timed("registry build", CommandRegistry().build))
+
 # Add Crons & Tasks
-app.add_event_handler("startup", startup)
+app.add_event_handler("startup", timed("scheduler startup", startup))
 app.add_event_handler("shutdown", shutdown)
 
+# Preload models and prime caches in the background; /readyz reports when it is done
+app.add_event_handler("startup", Warmup().start)
+app.add_event_handler("shutdown", Warmup().stop)
+
 # Define routers
-app.include_router(router.router)
\ No newline at end of file
+app.include_router(router.router)
@@ -0,0 +1,145 @@
+import functools
+import importlib
+from fastapi import HTTPException
+from typing import Callable, Dict, Optional, Tuple
+from common.input_validation import InputValidator
+from components.stocks.intervals import INTERVALS
+
+_DATE = r"\d{4}-\d{2}-\d{2}( \d{2}:\d{2}(:\d{2})?)?"
+_TICKERS = r"[A-Za-z0-9.\-^=]+(,[A-Za-z0-9.\-^=]+)*"
+_INTERVALS = list(INTERVALS)
+
+# Cmd -> (module, handler class, op, parameter schema, read only, data domains read for the response cache).
+# Commands without domains are never cached.
+COMMANDS = {
+    "Ping": (None, None, None, {}, True, None),
+    "Scheduler.Stats": ("utils.cron.adaptive", "scheduler", "Stats", {}, True, None),
+    "Tickers.GetList": ("components.stocks.tickers", "tickers", "GetList", {}, True, ("prices", "sentiment")),
+    "Tickers.Rebuild": ("components.stocks.tickers", "tickers", "Rebuild", {}, False, None),
+    "Sentiment.GetList": ("components.stocks.sentiment", "sentiment", "GetList", {
+        "Ticker": {"type": str, "pattern": _TICKERS},
+        "From": {"type": str, "pattern": _DATE},
+        "To": {"type": str, "pattern": _DATE},
+        "Label": {"type": str, "choices": ["positive", "negative", "neutral"]},
+        "Source": {"type": str, "max": 200},
+        "Limit": {"type": int, "min": 0},
+        "Cursor": {"type": str, "max": 200},
+        "Stream": {"type": str, "choices": ["ndjson", "json"]},
+    }, True, ("news", "sentiment")),
+    "News.DedupStats": ("components.news_collection.dedup", "dedup", "Stats", {}, True, ("news",)),
+    "Universe.Status": ("components.data_collection.universe", "universe", "Status", {}, True, None),
+    "Retention.Status": ("components.retention.maintenance", "retention", "Status", {}, True, None),
+    "Sentiment.GetSeries": ("components.stocks.sentiment", "sentiment", "GetSeries", {
+        "Ticker": {"type": str, "mandatory": True, "pattern": r"[A-Za-z0-9.\-^=]+"},
+        "Interval": {"type": str, "choices": ["1h", "1d"]},
+        "From": {"type": str, "pattern": _DATE},
+        "To": {"type": str, "pattern": _DATE},
+        "Limit": {"type": int, "min": 1, "max": 5000},
+    }, True, ("sentiment",)),
+    "Scanner.Run": ("components.stocks.scanner", "scanner", "Run", {
+        "Filter": {"type": str, "max": 2000},
+        "Sort": {"type": str, "max": 64},
+        "Limit": {"type": int, "min": 1, "max": 500},
+        "Interval": {"type": str, "choices": _INTERVALS},
+    }, True, ("indicators", "sentiment")),
+    "Indicators.Rebuild": ("components.stocks.indicator_state", "indicators", "Rebuild", {
+        "Interval": {"type": str, "choices": _INTERVALS},
+    }, False, None),
+}
+
+class ping:
+    def __init__(self):
+        pass
+
+    async def Gsad(self, cmd: str, varsIn: dict = None) -> dict | None:
+        return {"message": "pong"}
+
+class Command:
+    """A registered Model.Op: its handler, compiled validator and caching properties.
+
+    The handler's module is imported on the command's first run (or by CommandRegistry.load), so building the
+    registry does not pull in pandas, numpy and the other heavy dependencies of the components.
+    """
+
+    def __init__(self, name: str, resolve: Callable[[], object], op: Optional[str], schema: dict, read_only: bool,
+                 domains: Optional[Tuple[str, ...]]):
+        self.name = name
+        self.resolve = resolve
+        self.op = op
+        self.validator = InputValidator(schema)
+        self.read_only = read_only
+        self.domains = domains
+
+    @property
+    def handler(self):
+        return self.resolve()
+
+    def validate(self, varsIn: dict) -> dict:
+        """Validates request parameters (Cmd excluded), raising HTTPException(400) with every problem found.
+
+        Read-only commands ignore parameters they do not declare (cache busters such as _=, fields sent by older
+        clients), which also keeps them out of the response cache key; commands that write reject them.
+        """
+        if self.read_only:
+            varsIn = {name: value for name, value in varsIn.items() if name in self.validator.rules}
+        try:
+            return self.validator.validate({name: value for name, value in varsIn.items() if name != "Cmd"})
+        except ValueError as e:
+            raise HTTPException(400, f"Invalid input for {self.name}: {str(e)}")
+
+    async def run(self, params: dict):
+        return await self.handler.Gsad(self.op, params)
+
+class CommandRegistry:
+    """Singleton mapping of Cmd names to commands, with one handler instance per component."""
+    _instance = None
+
+    def __new__(cls):
+        """Ensures a single instance of the CommandRegistry class.
+
+        Returns:
+            CommandRegistry: Singleton instance of the CommandRegistry class.
+        """
+        if cls._instance is None:
+            cls._instance = super(CommandRegistry, cls).__new__(cls)
+            cls._instance.commands = {}
+            cls._instance.handlers = {}
+        return cls._instance
+
+    def _handler(self, module: Optional[str], handler_class: Optional[str]):
+        """Returns the shared handler instance of a component, importing its module on first use."""
+        key = (module, handler_class)
+        handler = self.handlers.get(key)
+        if handler is None:
+            handler = ping() if module is None else getattr(importlib.import_module(module), handler_class)()
+            self.handlers[key] = handler
+        return handler
+
+    def build(self) -> Dict[str, Command]:
+        """Compiles each command's validator once; component modules are imported when first needed."""
+        if self.commands:
+            return self.commands
+        for name, (module, handler_class, op, schema, read_only, domains) in COMMANDS.items():
+            resolve = functools.partial(self._handler, module, handler_class)
+            self.commands[name] = Command(name, resolve, op, schema, read_only, domains)
+        return self.commands
+
+    def load(self) -> int:
+        """Imports every component now (the warm-up does this so no request pays for an import).
+
+        Returns:
+            int: Number of handler instances.
+        """
+        for module, handler_class, *_ in COMMANDS.values():
+            self._handler(module, handler_class)
+        return len(self.handlers)
+
+    def get(self, cmd: str) -> Command:
+        """Returns the command registered for cmd, raising HTTPException(400) for unknown commands."""
+        commands = self.build()
+        command = commands.get(cmd)
+        if command is None and cmd.split(".")[0] == "Ping":
+            command = commands["Ping"]
+        if command is None:
+            raise HTTPException(400, f"Invalid Cmd: {cmd}")
+        return command
@@ -1,17 +1,73 @@
-from fastapi import APIRouter, HTTPException, Request, UploadFile
+import asyncio
+from fastapi import APIRouter, HTTPException, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+import json
+import os
+import time
+from common.database import Database
+from common.metrics import MetricsRegistry
+from common.pubsub import Hub
+from common.response_cache import DataVersions, ResponseCache
+from routers.registry import COMMANDS, CommandRegistry
+from utils.logs import setup_logger
+from utils.warmup import Warmup
 
 router = APIRouter()
+logger = setup_logger(__name__)
+
+# Labelled by Cmd only for registered commands, so arbitrary Cmd values cannot grow the label set
+request_seconds = MetricsRegistry().histogram(
+    "tickermind_request_seconds", "Time to produce a command's response (for streams: until streaming starts)", ("cmd", "status")
+)
+
+# Seconds between keep-alive comments on idle live streams
+STREAM_KEEPALIVE = float(os.getenv("STREAM_KEEPALIVE", "15"))
+
+# Most commands one Batch request may carry
+BATCH_MAX_CMDS = int(os.getenv("BATCH_MAX_CMDS", "20"))
 
 @router.get("/")
 async def handle_get(request: Request):
     varsIn = dict(request.query_params)
     try:
-        return await ApiAccess().RunCmd(varsIn)
+        return await ApiAccess().RunCmd(varsIn, if_none_match=request.headers.get("if-none-match"))
+    except HTTPException:
+        raise
     except Exception as e:
-        import traceback
-        print(traceback.format_exc())
+        logger.exception(f"Error processing request {varsIn.get('Cmd')}")
         raise HTTPException(500, f"Error processing request: {str(e)}")
 
+@router.get("/stream")
+async def handle_stream(request: Request):
+    """Server-sent events with live ticker changes.
+
+    Sends a "snapshot" event with the current rows for the requested tickers (Tickers=AAPL,MSFT; all when omitted),
+    then "update" events carrying only the fields that changed, coalesced per ticker. A client that falls too far
+    behind gets a fresh "snapshot" instead of its backlog.
+    """
+    from components.stocks.snapshot import read
+    tickers = [ticker.strip().upper() for ticker in request.query_params.get("Tickers", "").split(",") if ticker.strip()]
+    hub = Hub()
+    # Subscribe before reading the snapshot so no change committed in between is missed
+    subscription = hub.subscribe(tickers or None)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            yield f"event: snapshot\ndata: {json.dumps(await read(tickers or None))}\n\n"
+            while not await request.is_disconnected():
+                deltas = await subscription.next(STREAM_KEEPALIVE)
+                if deltas is None:
+                    yield ": keep-alive\n\n"
+                elif not deltas:
+                    yield f"event: snapshot\ndata: {json.dumps(await read(tickers or None))}\n\n"
+                else:
+                    yield f"event: update\ndata: {json.dumps(deltas)}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.post("/")
 async def handle_post(request: Request):
     form = await request.form()
@@ -23,42 +79,148 @@ async def handle_post(request: Request):
     varsIn.update(body)
     try:
         return await ApiAccess().RunCmd(varsIn)
+    except HTTPException:
+        raise
     except Exception as e:
-        import traceback
-        print(traceback.format_exc())
+        logger.exception(f"Error processing request {varsIn.get('Cmd')}")
         raise HTTPException(500, f"Error processing request: {str(e)}")
 
+@router.get("/metrics")
+async def handle_metrics():
+    """Prometheus scrape endpoint."""
+    return Response(content=MetricsRegistry().render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get("/healthz")
+async def handle_healthz():
+    """Liveness: the process is up and its event loop answers."""
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def handle_readyz():
+    """Readiness: 200 once the warm-up stages gating readiness have finished and the database answers, 503 before.
+    Both carry the warm-up progress."""
+    status = Warmup().status()
+    if status["ready"]:
+        try:
+            db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+            await db.fetch_one("SELECT 1 AS ok")
+        except Exception as e:
+            status.update(ready=False, error=f"Database unavailable: {str(e)}")
+    return Response(content=json.dumps(status), status_code=200 if status["ready"] else 503, media_type="application/json")
+
 class ApiAccess():
     def __init__(self):
         pass
 
-    async def RunCmd(self, varsIn: dict = None):
+    async def RunCmd(self, varsIn: dict = None, if_none_match: str = None):
+        start = time.perf_counter()
+        cmd = varsIn.get("Cmd")
+        status = 200
+        try:
+            response = await self._RunCmd(cmd, varsIn, if_none_match)
+            status = getattr(response, "status_code", 200)
+            return response
+        except HTTPException as e:
+            status = e.status_code
+            raise
+        finally:
+            label = cmd if cmd in COMMANDS or cmd == "Batch" else "unknown"
+            request_seconds.labels(label, str(status)).observe(time.perf_counter() - start)
+
+    async def _RunCmd(self, cmd: str, varsIn: dict, if_none_match: str = None):
         try:
-            cmd = varsIn.get("Cmd")
             if cmd is None:
                 raise HTTPException(400, "Cmd required: {cmd}")
-            
-            parts = cmd.split(".")
-            if len(parts) == 2:
-                model, op = parts
-        
-            match model:
-                case "Ping":
-                    return {"message": "pong"}
-                case "Tickers":
-                    import components.stocks.tickers as tickers
-                    tickers_instance = tickers.tickers()
-
-                    varsIn1 = {}
-                    return await tickers_instance.Gsad(op, varsIn1)
-                case "Sentiment":
-                    import components.stocks.sentiment as sentiment
-                    sentiment_instance = sentiment.sentiment()
-
-                    varsIn1 = {}
-                    return await sentiment_instance.Gsad(op, varsIn1)
-                case _:
-                    raise HTTPException(400, "Invalid Cmd")
+            if cmd == "Batch":
+                return Response(content=await self.RunBatch(varsIn), media_type="application/json")
+
+            command = CommandRegistry().get(cmd)
+            params = command.validate(varsIn)
+            # Streamed and uncached responses go straight to the handler
+            if command.domains is None or params.get("Stream"):
+                return await command.run(params)
+
+            cache = ResponseCache()
+            key = cache.key(cmd, params)
+            versions = DataVersions().get(command.domains)
+            etag = cache.etag(key, versions)
+            # The ETag only depends on the data versions, so a polling client that is up to date costs no query at all
+            if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+                cache.not_modified()
+                return Response(status_code=304, headers={"ETag": etag})
+
+            body = await self.Body(command, params, key, versions)
+            return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(500, f"Error processing command: {str(e)}")
-        
\ No newline at end of file
+
+    async def Body(self, command, params: dict, key: str = None, versions: tuple = None) -> bytes:
+        """Returns a command's serialized response, through the response cache when the command is cacheable."""
+        async def build() -> bytes:
+            return json.dumps(await command.run(params)).encode()
+
+        if command.domains is None:
+            return await build()
+        cache = ResponseCache()
+        key = key or cache.key(command.name, params)
+        versions = versions or DataVersions().get(command.domains)
+        return await cache.get_or_build(key, versions, build)
+
+    async def RunBatch(self, varsIn: dict) -> bytes:
+        """Runs several commands in one request.
+
+        Cmds is a JSON array of {"Cmd": ..., params} objects. Consecutive read-only commands run concurrently; a
+        command that writes waits for everything before it and runs alone, so later commands see its effects.
+
+        Returns:
+            bytes: {"data": [...], "status": 200} with one response per command, in order; a failed command's
+            entry is {"status": code, "detail": message} and does not fail the others.
+        """
+        try:
+            cmds = json.loads(varsIn.get("Cmds") or "[]")
+        except ValueError:
+            raise HTTPException(400, "Invalid Cmds: expected a JSON array of commands")
+        if not isinstance(cmds, list) or not all(isinstance(item, dict) for item in cmds):
+            raise HTTPException(400, "Invalid Cmds: expected a JSON array of commands")
+        if len(cmds) > BATCH_MAX_CMDS:
+            raise HTTPException(400, f"Too many commands in Batch: {len(cmds)} (max {BATCH_MAX_CMDS})")
+
+        async def run(item: dict) -> bytes:
+            start, status = time.perf_counter(), 200
+            cmd = item.get("Cmd")
+            try:
+                if not isinstance(cmd, str) or cmd == "Batch":
+                    raise HTTPException(400, f"Invalid Cmd: {cmd}")
+                command = CommandRegistry().get(cmd)
+                params = command.validate({name: str(value) for name, value in item.items()})
+                if params.get("Stream"):
+                    raise HTTPException(400, "Stream is not supported inside Batch")
+                return await self.Body(command, params)
+            except HTTPException as e:
+                status = e.status_code
+                return json.dumps({"status": e.status_code, "detail": e.detail}).encode()
+            except Exception as e:
+                status = 500
+                return json.dumps({"status": 500, "detail": f"Error processing command: {str(e)}"}).encode()
+            finally:
+                label = cmd if isinstance(cmd, str) and cmd in COMMANDS else "unknown"
+                request_seconds.labels(label, str(status)).observe(time.perf_counter() - start)
+
+        def read_only(item: dict) -> bool:
+            try:
+                return CommandRegistry().get(item.get("Cmd")).read_only
+            except Exception:
+                return True
+
+        bodies, group = [], []
+        for item in cmds:
+            if read_only(item):
+                group.append(item)
+                continue
+            bodies += await asyncio.gather(*(run(queued) for queued in group))
+            bodies.append(await run(item))
+            group = []
+        bodies += await asyncio.gather(*(run(queued) for queued in group))
+        return b'{"data": [' + b",".join(bodies) + b'], "status": 200}'
@@ -1,15 +1,33 @@
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from ..tasks import get_ticker_data, get_news_data,create_sentiment_labels, get_nasdaq_data
+from ..tasks import get_ticker_data, get_news_data,create_sentiment_labels, get_nasdaq_data, migrate_bars, build_ticker_snapshot, build_sentiment_aggregates, apply_retention
+from .adaptive import AdaptiveJob, add_adaptive_job
+from .sessions import REGULAR, EXTENDED, CLOSED
 
-scheduler = AsyncIOScheduler()
+# Seconds between runs per exchange session; None pauses the job in that session (after one run at the boundary)
+PRICE_INTERVALS = {REGULAR: float(os.getenv("PRICE_INTERVAL", "10")), EXTENDED: 60.0, CLOSED: None}
+NEWS_INTERVALS = {REGULAR: float(os.getenv("NEWS_INTERVAL", "60")), EXTENDED: 120.0, CLOSED: 900.0}
+SENTIMENT_INTERVALS = {REGULAR: float(os.getenv("SENTIMENT_INTERVAL", "15")), EXTENDED: 15.0, CLOSED: 60.0}
+# Hours between retention runs (roll-up, purge and archival); 0 disables them
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "24"))
+
+scheduler = AsyncIOScheduler(job_defaults={"max_instances": 1, "coalesce": True})
 
 async def startup():
+    scheduler.add_job(build_ticker_snapshot, 'date', run_date=datetime.now())
+    scheduler.add_job(build_sentiment_aggregates, 'date', run_date=datetime.now())
+    scheduler.add_job(migrate_bars, 'date', run_date=datetime.now())
     scheduler.add_job(get_nasdaq_data, 'date', run_date=datetime.now())
-    scheduler.add_job(get_ticker_data, 'interval', seconds=10)
-    scheduler.add_job(get_news_data, 'interval', seconds=60)
-    scheduler.add_job(create_sentiment_labels, 'interval', seconds=15)
+    if RETENTION_INTERVAL_HOURS > 0:
+        # First run after the startup jobs, which read the rows retention removes
+        scheduler.add_job(apply_retention, 'interval', hours=RETENTION_INTERVAL_HOURS, next_run_time=datetime.now() + timedelta(minutes=5))
     scheduler.start()
+    add_adaptive_job(scheduler, AdaptiveJob("prices", get_ticker_data, PRICE_INTERVALS, max_interval=300), delay=10)
+    add_adaptive_job(scheduler, AdaptiveJob("news", get_news_data, NEWS_INTERVALS, max_interval=1800), delay=60)
+    add_adaptive_job(scheduler, AdaptiveJob("sentiment", create_sentiment_labels, SENTIMENT_INTERVALS, max_interval=240), delay=15)
 
 def shutdown():
-    scheduler.shutdown()
\ No newline at end of file
+    from components.sentiment.executor import InferenceExecutor
+    scheduler.shutdown()
+    InferenceExecutor().shutdown()
@@ -0,0 +1,148 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from fastapi import HTTPException
+from common.metrics import MetricsRegistry
+from utils.logs import setup_logger
+from . import sessions
+
+logger = setup_logger(__name__, log_file="tasks.log")
+
+_registry = MetricsRegistry()
+job_seconds = _registry.histogram("tickermind_job_seconds", "Scheduler job run time", ("job",))
+job_lag = _registry.gauge("tickermind_job_lag_seconds", "Delay between a job's due time and its last start", ("job",))
+job_interval = _registry.gauge("tickermind_job_interval_seconds", "Current interval until a job's next run", ("job",))
+job_rows = _registry.counter("tickermind_job_rows_total", "New or changed items found by scheduler jobs", ("job",))
+job_runs = _registry.counter("tickermind_job_runs_total", "Scheduler job runs by outcome (ok, failed, skipped, overlap)", ("job", "outcome"))
+
+class AdaptiveJob:
+    """A scheduler job whose interval follows the exchange session and how much new data its recent runs found.
+
+    The job reschedules itself after every run, so two runs of it never overlap; a run requested while one is in
+    progress (e.g. a manual trigger) is skipped. The job function returns how many new items it found; each run
+    that found nothing doubles the interval (up to max_interval) and a run that found something resets it.
+    """
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[Optional[int]]], intervals: Dict[str, Optional[float]],
+                 max_interval: float, history: int = 5):
+        """
+        Parameters:
+        - name: Job id, also used in stats
+        - func: Coroutine function returning the number of new items found (None counts as unknown, not empty)
+        - intervals: Base interval in seconds per session (regular, extended, closed); None pauses the job in that
+          session, except for one run right after the session changes so the last data of a session is picked up
+        - max_interval: Upper bound for the backed-off interval
+        - history: Number of recent results kept in stats
+        """
+        self.name = name
+        self.func = func
+        self.intervals = intervals
+        self.max_interval = max_interval
+        self.backoff = 1.0
+        self.lock = asyncio.Lock()
+        self.scheduler: Optional[AsyncIOScheduler] = None
+        self.due: Optional[datetime] = None
+        self.last_session: Optional[str] = None
+        self.recent = deque(maxlen=history)
+        self.stats = {
+            "runs": 0, "failures": 0, "skipped": 0, "overlaps": 0,
+            "last_start": None, "last_duration": None, "avg_duration": None, "max_duration": 0.0,
+            "last_lag": None, "max_lag": 0.0, "interval": None, "session": None,
+        }
+
+    def start(self, scheduler: AsyncIOScheduler, delay: float = 0.0):
+        self.scheduler = scheduler
+        self._schedule(delay)
+
+    def _schedule(self, seconds: float):
+        self.due = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+        self.stats["interval"] = seconds
+        job_interval.labels(self.name).set(seconds)
+        self.scheduler.add_job(
+            self.run, "date", run_date=self.due, id=self.name, replace_existing=True,
+            max_instances=1, coalesce=True, misfire_grace_time=None
+        )
+
+    def next_interval(self, session: str) -> float:
+        """Seconds until the next run: the session's base interval scaled by the backoff, or a pause until the session changes."""
+        base = self.intervals.get(session)
+        if base is None:
+            until_change = (sessions.next_change() - datetime.now(sessions.EXCHANGE_TZ)).total_seconds()
+            return max(1.0, min(until_change, self.max_interval))
+        return min(base * self.backoff, max(self.max_interval, base))
+
+    async def run(self):
+        session = sessions.session()
+        self.stats["session"] = session
+        if self.lock.locked():
+            self.stats["overlaps"] += 1
+            job_runs.labels(self.name, "overlap").inc()
+            return
+
+        async with self.lock:
+            # Paused sessions still get one run at the boundary, e.g. to store the closing bar
+            if self.intervals.get(session) is None and session == self.last_session:
+                self.stats["skipped"] += 1
+                job_runs.labels(self.name, "skipped").inc()
+                self._schedule(self.next_interval(session))
+                return
+            self.last_session = session
+
+            start = time.perf_counter()
+            now = datetime.now(timezone.utc)
+            lag = max((now - self.due).total_seconds(), 0.0) if self.due else 0.0
+            self.stats.update(last_start=now.isoformat(), last_lag=lag, max_lag=max(self.stats["max_lag"], lag))
+            job_lag.labels(self.name).set(lag)
+            outcome = "ok"
+            try:
+                found = await self.func()
+                self.recent.append(found)
+                if found is not None:
+                    self.backoff = 1.0 if found > 0 else min(self.backoff * 2, 64.0)
+                    job_rows.labels(self.name).inc(found)
+            except Exception as e:
+                self.stats["failures"] += 1
+                outcome = "failed"
+                logger.error(f"Job {self.name} failed: {str(e)}")
+            finally:
+                duration = time.perf_counter() - start
+                job_seconds.labels(self.name).observe(duration)
+                job_runs.labels(self.name, outcome).inc()
+                average = self.stats["avg_duration"]
+                self.stats.update(
+                    runs=self.stats["runs"] + 1,
+                    last_duration=duration,
+                    # Exponentially weighted, so it follows recent behaviour
+                    avg_duration=duration if average is None else average * 0.8 + duration * 0.2,
+                    max_duration=max(self.stats["max_duration"], duration),
+                )
+                self._schedule(self.next_interval(session))
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, recent=list(self.recent), backoff=self.backoff)
+
+# Registered adaptive jobs by name
+jobs: Dict[str, AdaptiveJob] = {}
+
+def add_adaptive_job(scheduler: AsyncIOScheduler, job: AdaptiveJob, delay: float = 0.0) -> AdaptiveJob:
+    jobs[job.name] = job
+    job.start(scheduler, delay)
+    return job
+
+def job_stats() -> Dict[str, dict]:
+    """Returns run count, duration, lag, interval and recent results per adaptive job."""
+    return {name: job.snapshot() for name, job in jobs.items()}
+
+class scheduler:
+    def __init__(self):
+        pass
+
+    async def Gsad(self, cmd: str, varsIn: dict = None) -> dict | None:
+        match cmd:
+            case "Stats":
+                return {"data": job_stats(), "status": 200}
+            case _:
+                raise HTTPException(400, "Invalid Cmd")
@@ -0,0 +1,116 @@
+import os
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+EXCHANGE_TZ = ZoneInfo(os.getenv("MARKET_TIMEZONE", "America/New_York"))
+PRE_MARKET_OPEN = time(4, 0)
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+AFTER_HOURS_CLOSE = time(20, 0)
+# After-hours trading on early-close days ends at 17:00
+EARLY_AFTER_HOURS_CLOSE = time(17, 0)
+# Unscheduled closures (e.g. national days of mourning) as YYYY-MM-DD, comma separated
+EXTRA_CLOSED_DATES = {
+    date.fromisoformat(value.strip()) for value in os.getenv("MARKET_CLOSED_DATES", "").split(",") if value.strip()
+}
+
+REGULAR = "regular"
+EXTENDED = "extended"
+CLOSED = "closed"
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """The n-th given weekday (0 = Monday) of a month; n = -1 is the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def _observed(day: date) -> date:
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+@lru_cache(maxsize=32)
+def holidays(year: int) -> Set[date]:
+    """NYSE full-day holidays for a year."""
+    days = {
+        _nth_weekday(year, 1, 0, 3),            # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),            # Washington's Birthday
+        _easter(year) - timedelta(days=2),      # Good Friday
+        _nth_weekday(year, 5, 0, -1),           # Memorial Day
+        _observed(date(year, 7, 4)),            # Independence Day
+        _nth_weekday(year, 9, 0, 1),            # Labor Day
+        _nth_weekday(year, 11, 3, 4),           # Thanksgiving
+        _observed(date(year, 12, 25)),          # Christmas
+    }
+    # New Year's Day falling on a Saturday is not observed on the previous Friday
+    if date(year, 1, 1).weekday() != 5:
+        days.add(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return days
+
+@lru_cache(maxsize=32)
+def early_closes(year: int) -> Set[date]:
+    """Days the regular session ends at 13:00: July 3, the day after Thanksgiving and Christmas Eve."""
+    candidates = {date(year, 7, 3), _nth_weekday(year, 11, 3, 4) + timedelta(days=1), date(year, 12, 24)}
+    return {day for day in candidates if day.weekday() < 5 and day not in holidays(year)}
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in holidays(day.year) and day not in EXTRA_CLOSED_DATES
+
+def session_bounds(day: date) -> Optional[Tuple[datetime, datetime, datetime, datetime]]:
+    """Pre-market open, regular open, regular close and after-hours close of a trading day (exchange time), or None."""
+    if not is_trading_day(day):
+        return None
+    early = day in early_closes(day.year)
+    close, after_close = (EARLY_CLOSE, EARLY_AFTER_HOURS_CLOSE) if early else (REGULAR_CLOSE, AFTER_HOURS_CLOSE)
+    at = lambda moment: datetime.combine(day, moment, EXCHANGE_TZ)
+    return at(PRE_MARKET_OPEN), at(REGULAR_OPEN), at(close), at(after_close)
+
+def session(now: Optional[datetime] = None) -> str:
+    """Returns REGULAR, EXTENDED (pre-market or after hours) or CLOSED for a moment (default: now)."""
+    now = (now or datetime.now(EXCHANGE_TZ)).astimezone(EXCHANGE_TZ)
+    bounds = session_bounds(now.date())
+    if bounds is None:
+        return CLOSED
+    pre_open, regular_open, regular_close, after_close = bounds
+    if regular_open <= now < regular_close:
+        return REGULAR
+    if pre_open <= now < after_close:
+        return EXTENDED
+    return CLOSED
+
+def next_change(now: Optional[datetime] = None) -> datetime:
+    """Returns the next moment the session changes (for waking up jobs that are paused while closed)."""
+    now = (now or datetime.now(EXCHANGE_TZ)).astimezone(EXCHANGE_TZ)
+    day = now.date()
+    for _ in range(15):
+        bounds = session_bounds(day)
+        if bounds is not None:
+            for moment in bounds:
+                if moment > now:
+                    return moment
+        day += timedelta(days=1)
+    return now + timedelta(days=1)
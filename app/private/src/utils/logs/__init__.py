@@ -1,40 +1,109 @@
+import atexit
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import random
 
-def setup_logger(name: str) -> logging.Logger:
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE", "tickermind.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+# Records are formatted in the calling thread and written by a single background listener
+_queue = queue.SimpleQueue()
+_listener = None
+_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+class SamplingFilter(logging.Filter):
+    """Passes a random fraction of records below WARNING; warnings and errors always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+class _ChannelQueueHandler(logging.handlers.QueueHandler):
+    """Queues records tagged with the file they belong in and whether they also go to the console."""
+
+    def __init__(self, log_file: str, console: bool):
+        super().__init__(_queue)
+        self.log_file = log_file
+        self.console = console
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        record.log_file = self.log_file
+        record.console = self.console
+        return record
+
+class _Dispatcher(logging.Handler):
+    """Runs on the listener thread and routes each record to the console and its rotating file."""
+
+    def __init__(self):
+        super().__init__()
+        self.console = logging.StreamHandler()
+        self.console.setFormatter(_formatter)
+        self.files = {}
+
+    def _file_handler(self, log_file: str) -> logging.Handler:
+        handler = self.files.get(log_file)
+        if handler is None:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(LOG_DIR, log_file), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+            )
+            handler.setFormatter(_formatter)
+            self.files[log_file] = handler
+        return handler
+
+    def emit(self, record: logging.LogRecord):
+        if record.console:
+            self.console.handle(record)
+        self._file_handler(record.log_file).handle(record)
+
+    def close(self):
+        for handler in self.files.values():
+            handler.close()
+        super().close()
+
+def _start_listener():
+    """Starts the shared background writer on first use and stops it (flushing the queue) at exit."""
+    global _listener
+    if _listener is None:
+        dispatcher = _Dispatcher()
+        _listener = logging.handlers.QueueListener(_queue, dispatcher)
+        _listener.start()
+        # atexit runs in reverse order: drain the queue first, then close the files
+        atexit.register(dispatcher.close)
+        atexit.register(_listener.stop)
+
+def setup_logger(name: str, log_file: str = None, level: str = None, sample_rate: float = 1.0, console: bool = True) -> logging.Logger:
     """
-    Configure and return a logger with file and console handlers.
+    Configure and return a logger that writes through the shared background log writer.
 
     Parameters:
     - name: Logger name
+    - log_file: File under LOG_DIR to write to; defaults to the main application log
+    - level: Logging level name; defaults to LOG_LEVEL
+    - sample_rate: Fraction of records below WARNING that are kept
+    - console: Whether records are also written to the console
 
     Returns:
     - Configured logger instance
     """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    
+    logger.setLevel(level or LOG_LEVEL)
+
     # Prevent adding handlers multiple times
     if not logger.handlers:
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # File handler
-        log_dir = "logs"
-        os.makedirs(log_dir, exist_ok=True)
-        log_file = os.path.join(log_dir, f"{datetime.now().strftime('%Y%m%d')}.log")
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(logging.INFO)
-        
-        # Formatter
-        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-        console_handler.setFormatter(formatter)
-        file_handler.setFormatter(formatter)
-        
-        # Add handlers
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
-    
-    return logger
\ No newline at end of file
+        _start_listener()
+        logger.addHandler(_ChannelQueueHandler(log_file or LOG_FILE, console))
+        if sample_rate < 1:
+            logger.addFilter(SamplingFilter(sample_rate))
+        logger.propagate = False
+
+    return logger
@@ -1,193 +1,274 @@
 import asyncio
-from datetime import datetime
+import logging
 import os 
-import aiofiles
 from common.database import Database
+from common.response_cache import DataVersions
 from datetime import datetime, timezone
-import pandas as pd
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__, log_file="tasks.log")
+# Raw feed and row dumps, only written when NEWS_LOG_LEVEL=DEBUG
+news_logger = setup_logger("news", log_file="news.log", level=os.getenv("NEWS_LOG_LEVEL", "INFO"), console=False)
+
+# Maximum number of unlabeled news rows scored per sentiment job run
+SENTIMENT_JOB_LIMIT = int(os.getenv("SENTIMENT_JOB_LIMIT", "1024"))
+# Rows written per transaction by the bulk ingestion paths
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+
+async def store_prices(db: Database, latest_prices, interval: str = "1d") -> int:
+    """Bulk-writes fetched prices, overwriting the close/volume of a (ticker, date) row fetched earlier, and updates the bar store.
+
+    ticker_snapshot is updated in the same transaction as stock_data, so Tickers.GetList never sees one without the other.
+
+    Returns:
+        int: Number of (ticker, date) rows that are new or whose close/volume changed.
+    """
+    from components.stocks.bars import append_bars, bar_timestamp, interval_seconds
+    from components.stocks.indicator_state import apply_bars
+    from components.stocks.snapshot import PRICE_UPSERT, publish
+    latest_prices = [latest_price for latest_price in latest_prices if latest_price]
+    ticker_ids = await db.get_ticker_ids([latest_price["ticker"] for latest_price in latest_prices])
+    # A re-fetched date carries the still-forming bar's latest close, so it replaces the earlier one
+    insert = db.upsert_query(
+        "{secondary_table}", ["{foreign_key}", "date", "close", "volume"],
+        conflict=["{foreign_key}", "date"], update=["close", "volume"],
+        where="{secondary_table}.close != excluded.close OR {secondary_table}.volume != excluded.volume"
+    )
+    inserted = 0
+    for start in range(0, len(latest_prices), INGEST_BATCH_SIZE):
+        batch = latest_prices[start:start + INGEST_BATCH_SIZE]
+        changed, _ = await db.execute_transaction([
+            (insert, [
+                # stock_data requires a volume; bars and ticker_snapshot keep a missing one as NULL
+                (ticker_ids[latest_price["ticker"]], latest_price["date"], latest_price["close"], latest_price["volume"] or 0)
+                for latest_price in batch
+            ]),
+            (PRICE_UPSERT, [
+                (ticker_ids[latest_price["ticker"]], latest_price["ticker"], latest_price["date"],
+                 latest_price["close"], latest_price["volume"])
+                for latest_price in batch
+            ]),
+        ])
+        inserted += changed
+    bar_rows = [
+        (
+            ticker_ids[latest_price["ticker"]], interval_seconds(interval),
+            bar_timestamp(latest_price["timestamp"], interval),
+            latest_price["open"], latest_price["high"], latest_price["low"],
+            latest_price["close"], latest_price["volume"]
+        )
+        for latest_price in latest_prices
+    ]
+    await append_bars(bar_rows, batch_size=INGEST_BATCH_SIZE)
+    # Advance each ticker's indicators by the new bar instead of recomputing history
+    await apply_bars(bar_rows)
+    # Cached Tickers/Scanner responses built before these writes are no longer served
+    DataVersions().bump("prices", "indicators")
+    await publish([ticker_ids[latest_price["ticker"]] for latest_price in latest_prices])
+    return inserted
 
 async def get_ticker_data():
     from components.data_collection.yfinance import get_latest_stock_prices
     tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "TSLA", "META", "JPM", "V"]
     db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", foreign_key="stock_id")
 
-    async def process_tickers(tickers):
-        latest_prices = await get_latest_stock_prices(tickers, interval="1d")
-        
-        for latest_price in latest_prices:
-            if not latest_price:
-                continue
-
-            ticker = latest_price["ticker"]
-            # Check if ticker exists in primary table (stocks)
-            ticker_record = await db.fetch_one("SELECT id FROM {primary_table} WHERE ticker = ?", (ticker,))
-            if not ticker_record:
-                await db.execute("INSERT INTO {primary_table} (ticker) VALUES (?)", (ticker,))
-                ticker_record = await db.fetch_one("SELECT id FROM {primary_table} WHERE ticker = ?", (ticker,))
-
-            # Check if data for this timestamp already exists
-            existing = await db.fetch_one(
-                "SELECT id FROM {secondary_table} WHERE {foreign_key} = ? AND date = ?",
-                (ticker_record["id"], latest_price["date"])
-            )
-            if existing:
-                continue
-
-            # Insert stock data into secondary table (stock_data)
-            await db.execute(
-                """
-                INSERT INTO {secondary_table} ({foreign_key}, date, close, volume)
-                VALUES (?, ?, ?, ?)
-                """,
-                (ticker_record["id"], latest_price["date"], latest_price["close"], latest_price["volume"])
-            )
-
     # Process all tickers at once
-    await process_tickers(tickers)
+    latest_prices = await get_latest_stock_prices(tickers, interval="1d")
+    changed = await store_prices(db, latest_prices, interval="1d")
 
-    # Async file write
-    os.makedirs('/data', exist_ok=True)
-    async with aiofiles.open('/data/task_log.txt', 'a') as f:
-        await f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Processed {len(tickers)} tickers\n")
+    logger.info(f"Processed {len(tickers)} tickers, {changed} new or changed prices")
+    return changed
 
 async def get_nasdaq_data():
-    from components.data_collection.yfinance import get_latest_stock_prices, get_nasdaq_tickers
-    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", foreign_key="stock_id")
-    
-    async def process_tickers(tickers):
-        latest_prices = await get_latest_stock_prices(tickers, interval="1d")
-        
-        for latest_price in latest_prices:
-            if not latest_price:
-                continue
-
-            ticker = latest_price["ticker"]
-            # Check if ticker exists in primary table (stocks)
-            ticker_record = await db.fetch_one("SELECT id FROM {primary_table} WHERE ticker = ?", (ticker,))
-            if not ticker_record:
-                await db.execute("INSERT INTO {primary_table} (ticker) VALUES (?)", (ticker,))
-                ticker_record = await db.fetch_one("SELECT id FROM {primary_table} WHERE ticker = ?", (ticker,))
-
-            # Check if data for this timestamp already exists
-            existing = await db.fetch_one(
-                "SELECT id FROM {secondary_table} WHERE {foreign_key} = ? AND date = ?",
-                (ticker_record["id"], latest_price["date"])
-            )
-            if existing:
-                continue
-
-            # Insert stock data into secondary table (stock_data)
-            await db.execute(
-                """
-                INSERT INTO {secondary_table} ({foreign_key}, date, close, volume)
-                VALUES (?, ?, ?, ?)
-                """,
-                (ticker_record["id"], latest_price["date"], latest_price["close"], latest_price["volume"])
-            )
-
-    # Fetch NASDAQ tickers and process them
-    nasdaq_tickers = await get_nasdaq_tickers()
-    await process_tickers(nasdaq_tickers)
-
-    # Async file write
-    os.makedirs('/data', exist_ok=True)
-    async with aiofiles.open('/data/task_log.txt', 'a') as f:
-        await f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Processed {len(nasdaq_tickers)} NASDAQ tickers\n")
+    from components.data_collection.universe import backfill, sync_universe
+
+    # Bring the universe in line with the listing file, then load history for tickers still missing it
+    changes = await sync_universe()
+    progress = await backfill(interval="1d")
+
+    logger.info(f"NASDAQ universe: {changes['total']} tickers ({changes['added']} added, {changes['removed']} removed), "
+                f"backfilled {progress['rows']} bars for {progress['tickers_done']} tickers")
+    return progress["rows"]
 
 async def get_news_data():
-    from components.news_collection.tickertick import fetch_news_from_tickertick
+    from components.news_collection.dedup import link_duplicates
+    from components.news_collection.tickertick import get_ingestor, initial_watermark
     tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "TSLA", "META", "JPM", "V"]
     db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
-    from_date = (datetime.now(timezone.utc).date() - pd.Timedelta(days=7)).strftime("%Y-%m-%d")
-    to_date = datetime.now(timezone.utc).date().strftime("%Y-%m-%d")
-
-    async def process_tickers(tickers):
-        news_df = await fetch_news_from_tickertick(tickers, from_date, to_date)
-
-        os.makedirs('/data', exist_ok=True)
-        async with aiofiles.open('/data/news_log.txt', 'a') as f:
-            await f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Columns: {list(news_df.columns)}\n")
-            await f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - First 5 rows:\n{news_df.head(5).to_string()}\n")
-
-        if news_df.empty:
-            return
-        
-        for ticker in tickers:
-            ticker_record = await db.fetch_one("SELECT id FROM {primary_table} WHERE ticker = ?", (ticker,))
-            if not ticker_record:
-                await db.execute("INSERT INTO {primary_table} (ticker) VALUES (?)", (ticker,))
-                ticker_record = await db.fetch_one("SELECT id FROM {primary_table} WHERE ticker = ?", (ticker,))
-            
-            for _, row in news_df.iterrows():
-                existing = await db.fetch_one(
-                    "SELECT id FROM {news_table} WHERE {foreign_key} = ? AND date = ? AND description = ?",
-                    (ticker_record["id"], row["date"], row["description"])
-                )
-                async with aiofiles.open('/data/row.txt', 'a') as f:
-                    await f.write(f"row: {row}\n")
-
-                if existing:
-                    continue
-                await db.execute(
-                    """
-                    INSERT INTO {news_table} ({foreign_key}, date, title, description, content, source)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        ticker_record["id"],
-                        row["date"],
-                        "",
-                        row["description"],
-                        "",
-                        row["source"]
-                    )
-                )
-            
-    await process_tickers(tickers)
-    os.makedirs('/data', exist_ok=True)
-    async with aiofiles.open('/data/task_log.txt', 'a') as f:
-        await f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Processed news for {len(tickers)} tickers\n")
+    ticker_ids = await db.get_ticker_ids(tickers)
+
+    saved = {
+        stock_id: (last_time, last_id)
+        for stock_id, last_time, last_id in await db.fetch_rows("SELECT {foreign_key}, last_time, last_id FROM news_watermark")
+    }
+    start = initial_watermark()
+    watermarks = {ticker: saved.get(ticker_ids[ticker], start) for ticker in tickers}
+    stories, advanced = await get_ingestor().fetch(watermarks)
+
+    # Oldest first, so row ids follow publication order and link_duplicates points a repost at the story it copies
+    ordered = sorted(
+        ((ticker, story) for ticker, ticker_stories in stories.items() for story in ticker_stories),
+        key=lambda item: (item[1]["time"], item[1]["id"])
+    )
+    rows = [
+        (ticker_ids[ticker], datetime.fromtimestamp(story["time"] / 1000, timezone.utc).strftime("%Y-%m-%d"),
+         story["description"], story["site"], story["id"], story["url"], story["time"] // 1000)
+        for ticker, story in ordered
+    ]
+    if news_logger.isEnabledFor(logging.DEBUG):
+        news_logger.debug("".join(f"row: {row}\n" for row in rows))
+
+    # Stories and watermarks commit together, so a failed write is fetched again on the next run.
+    # Existing (ticker, date, description) rows are skipped by the UNIQUE constraint
+    now = int(datetime.now(timezone.utc).timestamp())
+    inserted, _ = await db.execute_transaction([
+        (db.upsert_query("{news_table}", ["{foreign_key}", "date", "description", "source", "story_id", "url", "published_at"]), rows),
+        (db.upsert_query(
+            "news_watermark", ["{foreign_key}", "last_time", "last_id", "updated_at"],
+            conflict=["{foreign_key}"], update=["last_time", "last_id", "updated_at"]
+        ), [(ticker_ids[ticker], last_time, last_id, now) for ticker, (last_time, last_id) in advanced.items()]),
+    ])
+    if inserted:
+        # Copies of stories already stored are linked before the sentiment job sees them
+        await link_duplicates()
+        DataVersions().bump("news")
+
+    logger.info(f"Processed news for {len(tickers)} tickers, {len(rows)} new stories, {inserted} new rows")
+    return inserted
+
+async def build_ticker_snapshot():
+    from components.stocks.snapshot import ensure
+    await ensure()
+
+async def build_sentiment_aggregates():
+    from components.stocks.sentiment_agg import ensure
+    await ensure()
+
+async def migrate_bars():
+    from components.stocks.bars import migrate_stock_data
+    from components.stocks.indicator_state import seed_all
+    migrated = await migrate_stock_data()
+    logger.info(f"Migrated {migrated} legacy stock_data rows into the bar store")
+    # One-off batch pass for tickers without persisted indicator state; later bars are applied incrementally
+    await seed_all("1d")
+    DataVersions().bump("prices", "indicators")
+
+async def apply_retention():
+    from components.retention.maintenance import run_retention
+    await run_retention()
 
 async def create_sentiment_labels():
+    from components.news_collection.dedup import stats as dedup_stats
+    from components.sentiment.cache import SentimentCache, content_hash
+    from components.sentiment.executor import InferenceExecutor
+    from components.sentiment.finbert import BATCH_SIZE
+    from components.stocks.indicators import refresh_sentiment
+    from components.stocks.sentiment_agg import AGG_UPSERT, agg_params
+    from components.stocks.snapshot import SENTIMENT_UPSERT, publish
     db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    cache = SentimentCache()
     
-    # Fetch rows from news_table without sentiment label and with non-empty description
-    query = "SELECT * FROM {news_table} WHERE sentiment_label IS NULL AND description IS NOT NULL AND description != ''"
-    news_df = await db.fetch_all(query)
-    
-    if not news_df:
-        async with aiofiles.open('/data/sentiment_log.txt', 'a') as f:
-            await f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - No unlabeled news rows with valid description found\n")
-        return
-    
-    # Convert to DataFrame for processing
-    news_df = pd.DataFrame(news_df)
-    
-    async with aiofiles.open('/data/sentiment_log.txt', 'a') as f:
-        await f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Processing {len(news_df)} unlabeled news rows\n")
-    
-    # Initialize FinBERT tokenizer and model
-    from transformers import BertTokenizer, AutoModelForSequenceClassification
-    import torch
-    tokenizer = BertTokenizer.from_pretrained('ProsusAI/finbert')
-    finbert_model = AutoModelForSequenceClassification.from_pretrained('ProsusAI/finbert')
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    finbert_model.to(device)
-
-    for _, row in news_df.iterrows():
-        # Tokenize and predict sentiment
-        inputs = tokenizer(row["description"], return_tensors="pt", padding=True, truncation=True, max_length=512).to(device)
-        with torch.no_grad():
-            outputs = finbert_model(**inputs)
-        probs = torch.nn.functional.softmax(outputs.logits, dim=-1)
-        sentiment_idx = torch.argmax(probs, dim=-1).item()
-        sentiment = {0: "positive", 1: "negative", 2: "neutral"}[sentiment_idx]
-        
-        # Update the database with the sentiment label
-        await db.execute(
-            "UPDATE {news_table} SET sentiment_label = ? WHERE id = ?",
-            (sentiment, row["id"])
+    # Fetch rows from news_table without sentiment label and with non-empty description, one batch at a time.
+    # A near-duplicate is scored as its canonical story's text, so it shares that story's cache entry and label
+    query = """
+        SELECT n.id, n.{foreign_key} AS stock_id, n.date, COALESCE(c.description, n.description) AS description,
+               n.canonical_id
+        FROM {news_table} n LEFT JOIN {news_table} c ON c.id = n.canonical_id
+        WHERE n.sentiment_label IS NULL AND n.description IS NOT NULL AND n.description != '' AND n.id > ?
+        ORDER BY n.id
+        LIMIT ?
+    """
+    update = """
+        UPDATE {news_table}
+        SET sentiment_label = ?, sentiment_positive = ?, sentiment_negative = ?, sentiment_neutral = ?
+        WHERE id = ?
+    """
+    # Row ids waiting on a model result, keyed by content hash, so each distinct story is scored once per run
+    pending = {}
+    counts = {"cached": 0, "scored": 0, "copies": 0}
+    # (stock id, date) of every fetched row, and the stocks that received a label this run
+    row_of, touched = {}, set()
+    # Fetched rows that are near-duplicates of a canonical story
+    copies = set()
+
+    async def label(ids_by_hash, results):
+        # Every row sharing a hash gets the same label; the ticker snapshot and sentiment aggregates are updated in
+        # the same transaction
+        labeled = [(row_id, results[key]) for key in results for row_id in ids_by_hash[key]]
+        rows = [row_of.pop(row_id) for row_id, _ in labeled]
+        await db.execute_transaction([
+            (update, [
+                (result["label"], result["positive"], result["negative"], result["neutral"], row_id)
+                for row_id, result in labeled
+            ]),
+            (SENTIMENT_UPSERT, [
+                (result["label"], date, stock_id)
+                for (_, result), (stock_id, date) in zip(labeled, rows)
+                if stock_id is not None
+            ]),
+            (AGG_UPSERT, agg_params([row_id for row_id, _ in labeled])),
+        ])
+        touched.update(stock_id for stock_id, _ in rows)
+        copied = sum(1 for row_id, _ in labeled if row_id in copies)
+        counts["copies"] += copied
+        dedup_stats["labels_copied"] += copied
+        DataVersions().bump("sentiment")
+        await publish([stock_id for stock_id, _ in rows])
+
+    async def batches():
+        last_id, remaining = 0, SENTIMENT_JOB_LIMIT
+        while remaining > 0:
+            rows = await db.fetch_all(query, (last_id, min(BATCH_SIZE, remaining)))
+            if not rows:
+                return
+            last_id = rows[-1]["id"]
+            remaining -= len(rows)
+
+            ids_by_hash, texts = {}, {}
+            for row in rows:
+                row_of[row["id"]] = (row["stock_id"], row["date"])
+                if row["canonical_id"] is not None:
+                    copies.add(row["id"])
+                key = content_hash(row["description"])
+                ids_by_hash.setdefault(key, []).append(row["id"])
+                texts.setdefault(key, row["description"])
+
+            cached = await cache.get_many(ids_by_hash)
+            if cached:
+                await label(ids_by_hash, cached)
+                counts["cached"] += sum(len(ids_by_hash[key]) for key in cached)
+
+            misses = []
+            for key, ids in ids_by_hash.items():
+                if key in cached:
+                    continue
+                if key in pending:
+                    pending[key].extend(ids)
+                    continue
+                pending[key] = ids
+                misses.append(key)
+            if misses:
+                yield misses, [texts[key] for key in misses]
+
+    async def write(keys, scores):
+        results = dict(zip(keys, scores))
+        await cache.put_many(results)
+        await label({key: pending.pop(key) for key in keys}, results)
+        counts["scored"] += len(keys)
+
+    # Only cache misses reach the worker pool, so the event loop keeps serving requests meanwhile
+    await InferenceExecutor().run(batches(), write)
+
+    if touched:
+        # Keep the scanner's sentiment column in step with the new labels
+        await refresh_sentiment(list(touched))
+
+    if counts["cached"] or counts["scored"]:
+        logger.info(
+            f"Labeled {counts['cached']} rows from cache, scored {counts['scored']} distinct stories, "
+            f"{counts['copies']} near-duplicates labeled from their canonical story "
+            f"(cache hit rate {cache.stats()['hit_rate']:.1%})"
         )
-    
-    async with aiofiles.open('/data/sentiment_log.txt', 'a') as f:
-        await f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Updated {len(news_df)} rows with sentiment labels\n")
\ No newline at end of file
+    else:
+        logger.info("No unlabeled news rows with valid description found")
+    return counts["cached"] + counts["scored"]
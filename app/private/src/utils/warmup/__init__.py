@@ -0,0 +1,195 @@
+import asyncio
+import importlib
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, List, Optional, Tuple
+from utils.logs import setup_logger
+
+logger = setup_logger(__name__)
+
+# Preload models and prime caches in the background once the app has started
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# Also start the sentiment workers, each loading the model; off keeps their memory free until the first sentiment run
+WARMUP_MODEL = os.getenv("WARMUP_MODEL", "true").lower() == "true"
+# Log a timing breakdown of the imports, startup handlers and warm-up stages once the warm-up finishes
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "false").lower() == "true"
+
+# Modules the scheduled jobs import on their first run; the components imported by commands are loaded by the registry
+WARMUP_IMPORTS = [
+    "numpy", "pandas", "components.stocks.bars", "components.stocks.indicator_state",
+    "components.data_collection.yfinance", "yfinance", "components.news_collection.tickertick", "tickertick",
+]
+
+_started = time.perf_counter()
+# (phase, seconds, modules imported during it), in completion order
+timings: List[Tuple[str, float, int]] = []
+
+@contextmanager
+def phase(name: str):
+    """Times a block of startup work for the STARTUP_PROFILE report; nested phases are reported on their own."""
+    began, modules = time.perf_counter(), len(sys.modules)
+    try:
+        yield
+    finally:
+        timings.append((name, time.perf_counter() - began, len(sys.modules) - modules))
+
+def timed(name: str, func: Callable) -> Callable:
+    """Wraps a (sync or async) startup handler in a phase."""
+    if asyncio.iscoroutinefunction(func):
+        async def run():
+            with phase(name):
+                return await func()
+    else:
+        def run():
+            with phase(name):
+                return func()
+    return run
+
+def profile_report() -> str:
+    """Returns the recorded phases as a table, slowest first, with the time since this module was imported."""
+    lines = [f"Startup profile ({time.perf_counter() - _started:.3f}s since import of utils.warmup):"]
+    for name, seconds, modules in sorted(timings, key=lambda timing: -timing[1]):
+        lines.append(f"  {seconds * 1000:9.1f} ms  {modules:5d} modules  {name}")
+    return "\n".join(lines)
+
+def _import(name: str):
+    with phase(f"import {name}"):
+        importlib.import_module(name)
+
+class Stage:
+    """One warm-up step. Stages that gate readiness must finish (successfully or not) before /readyz reports ready;
+    the others only report progress."""
+
+    def __init__(self, name: str, run: Callable[[], Awaitable], gates_ready: bool = True):
+        self.name = name
+        self.run = run
+        self.gates_ready = gates_ready
+        self.state = "pending"
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def status(self) -> dict:
+        return {"name": self.name, "state": self.state, "seconds": self.seconds, "error": self.error}
+
+async def _open_database():
+    from common.database import Database
+    db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+    await db.fetch_one("SELECT COUNT(*) AS count FROM {primary_table}")
+
+async def _load_commands():
+    from routers.registry import CommandRegistry
+    # Imports run in a thread so requests keep being served meanwhile
+    await asyncio.to_thread(CommandRegistry().load)
+
+async def _prime_caches():
+    from routers.registry import CommandRegistry
+    from routers.router import ApiAccess
+    # The ticker list is what every client asks for first
+    await ApiAccess().Body(CommandRegistry().get("Tickers.GetList"), {})
+
+async def _import_job_modules():
+    for name in WARMUP_IMPORTS:
+        try:
+            await asyncio.to_thread(_import, name)
+        except ImportError as e:
+            logger.warning(f"Warm-up could not import {name}: {e}")
+
+async def _load_model():
+    from components.sentiment.executor import InferenceExecutor
+    workers = await InferenceExecutor().warm()
+    logger.info(f"Sentiment model loaded in {workers} workers")
+
+class Warmup:
+    """Singleton background warm-up run after startup, whose progress backs /readyz."""
+    _instance = None
+
+    def __new__(cls, enabled: bool = WARMUP_ENABLED, load_model: bool = WARMUP_MODEL):
+        """Ensures a single warm-up per process.
+
+        Args:
+            enabled (bool): Run the stages; when off every stage is skipped and readiness only waits for startup.
+            load_model (bool): Include the sentiment model stage.
+
+        Returns:
+            Warmup: Singleton instance of the Warmup class.
+        """
+        if cls._instance is None:
+            cls._instance = super(Warmup, cls).__new__(cls)
+            cls._instance.enabled = enabled
+            cls._instance.stages = [
+                Stage("database", _open_database),
+                Stage("commands", _load_commands),
+                Stage("caches", _prime_caches),
+                Stage("job_modules", _import_job_modules, gates_ready=False),
+            ]
+            if load_model:
+                # Runs in the worker processes
+                cls._instance.stages.insert(0, Stage("sentiment_model", _load_model, gates_ready=False))
+            cls._instance.started = False
+            cls._instance.task = None
+        return cls._instance
+
+    async def _run_stage(self, stage: Stage):
+        stage.state = "running"
+        began = time.perf_counter()
+        try:
+            with phase(f"warm-up {stage.name}"):
+                await stage.run()
+            stage.state = "done"
+        except asyncio.CancelledError:
+            stage.state = "cancelled"
+            raise
+        except Exception as e:
+            # Everything a stage preloads is also loaded on demand, so a failure only costs the first caller
+            stage.state = "failed"
+            stage.error = str(e) or type(e).__name__
+            logger.warning(f"Warm-up stage {stage.name} failed: {stage.error}")
+        finally:
+            stage.seconds = time.perf_counter() - began
+
+    async def run(self):
+        """Runs the stages gating readiness one after another, and the others alongside them."""
+        began = time.perf_counter()
+        background = [asyncio.create_task(self._run_stage(stage)) for stage in self.stages if not stage.gates_ready]
+        try:
+            for stage in self.stages:
+                if stage.gates_ready:
+                    await self._run_stage(stage)
+            await asyncio.gather(*background)
+        finally:
+            for task in background:
+                task.cancel()
+        logger.info(f"Warm-up finished in {time.perf_counter() - began:.1f}s")
+        if STARTUP_PROFILE:
+            logger.info(profile_report())
+
+    async def start(self):
+        """Startup handler: begins the warm-up in the background, so the app serves requests right away."""
+        self.started = True
+        if not self.enabled:
+            for stage in self.stages:
+                stage.state = "skipped"
+            if STARTUP_PROFILE:
+                logger.info(profile_report())
+            return
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Shutdown handler: cancels a warm-up still in progress."""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    def ready(self) -> bool:
+        """True once startup ran and every stage gating readiness has finished."""
+        return self.started and all(stage.state in ("done", "failed", "skipped") for stage in self.stages if stage.gates_ready)
+
+    def status(self) -> dict:
+        finished = sum(stage.state in ("done", "failed", "skipped") for stage in self.stages)
+        return {
+            "ready": self.ready(),
+            "progress": finished / len(self.stages),
+            "stages": [stage.status() for stage in self.stages],
+        }
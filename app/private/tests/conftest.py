@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Modules import each other from the source root, as when the API runs from app/private/src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+# Loggers open their files at import time; keep them out of the source tree
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="tickermind-logs-"))
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Runs the test from a scratch source directory, so ../data/stocks.db is a new, empty database."""
+    run = tmp_path / "run"
+    run.mkdir()
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(run)
+    return run
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from utils.cron import sessions
+from utils.cron.adaptive import AdaptiveJob
+from utils.cron.sessions import CLOSED, EXCHANGE_TZ, REGULAR
+
+INTERVALS = {REGULAR: 10.0, CLOSED: None}
+
+class FakeScheduler:
+    """Records the jobs an AdaptiveJob schedules instead of running them."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def add_job(self, func, trigger, **kwargs):
+        self.jobs.append(dict(kwargs, func=func, trigger=trigger, scheduled_at=datetime.now(timezone.utc)))
+
+def job_intervals(job: AdaptiveJob) -> list:
+    """Seconds from each scheduling to the run date it set."""
+    return [(entry["run_date"] - entry["scheduled_at"]).total_seconds() for entry in job.scheduler.jobs]
+
+@pytest.fixture
+def market(monkeypatch):
+    """Sets the session AdaptiveJob sees; the next session change is always 100 s away."""
+    current = {"session": REGULAR}
+    monkeypatch.setattr(sessions, "session", lambda now=None: current["session"])
+    monkeypatch.setattr(sessions, "next_change", lambda now=None: datetime.now(EXCHANGE_TZ) + timedelta(seconds=100))
+    return current
+
+def job_with(results, max_interval: float = 60.0) -> AdaptiveJob:
+    results = list(results)
+    calls = []
+
+    async def func():
+        calls.append(None)
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    job = AdaptiveJob("test", func, INTERVALS, max_interval=max_interval)
+    job.calls = calls
+    job.start(FakeScheduler())
+    return job
+
+def test_backoff_doubles_on_empty_runs_and_resets_on_data(market):
+    job = job_with([0, 0, 0, 0, None, 3, RuntimeError("boom"), 0])
+
+    async def scenario():
+        intervals = []
+        for _ in range(8):
+            await job.run()
+            intervals.append(job.stats["interval"])
+        return intervals
+
+    intervals = asyncio.run(scenario())
+
+    # Capped at max_interval; an unknown result and a failure leave the backoff alone
+    assert intervals == [20.0, 40.0, 60.0, 60.0, 60.0, 10.0, 10.0, 20.0]
+    assert job.stats["runs"] == 8 and job.stats["failures"] == 1
+    assert job.scheduler.jobs[-1]["id"] == "test" and job.scheduler.jobs[-1]["replace_existing"]
+
+def test_overlapping_run_is_skipped(market):
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow():
+        started.set()
+        await release.wait()
+        return 1
+
+    async def scenario():
+        job = AdaptiveJob("slow", slow, INTERVALS, max_interval=60)
+        job.start(FakeScheduler())
+        first = asyncio.create_task(job.run())
+        await started.wait()
+        await job.run()
+        release.set()
+        await first
+        return job
+
+    job = asyncio.run(scenario())
+
+    assert job.stats["overlaps"] == 1 and job.stats["runs"] == 1
+
+def test_paused_session_runs_once_at_the_boundary(market):
+    job = job_with([1, 1, 1])
+
+    async def scenario():
+        await job.run()
+        market["session"] = CLOSED
+        # The first run after the close still picks up the closing data
+        await job.run()
+        await job.run()
+        await job.run()
+        market["session"] = REGULAR
+        await job.run()
+
+    asyncio.run(scenario())
+
+    assert len(job.calls) == 3
+    assert job.stats["skipped"] == 2
+    # While paused the job waits for the session change, within max_interval
+    assert [round(entry) for entry in job_intervals(job)] == [0, 10, 60, 60, 60, 10]
@@ -0,0 +1,116 @@
+import asyncio
+import pandas as pd
+import pytest
+from common.database import Database
+from components.data_collection import universe, yfinance
+from components.data_collection.universe import backfill, sync_universe
+from components.data_collection.yfinance import StaticProvider, set_provider
+from components.stocks import bars
+
+DAY = 86400
+WINDOW_DAYS = 30
+TICKERS = ["AAA", "BBB"]
+
+def database() -> Database:
+    return Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+
+class RecordingProvider(StaticProvider):
+    """StaticProvider that also records the start date of every request."""
+
+    def __init__(self, frames):
+        super().__init__(frames)
+        self.starts = []
+
+    def fetch(self, tickers, period, interval, start=None, end=None):
+        self.starts.append(start)
+        return super().fetch(tickers, period, interval, start, end)
+
+def history() -> pd.DataFrame:
+    index = pd.date_range(end=pd.Timestamp.now().normalize(), periods=500, freq="D")
+    return pd.DataFrame({"Open": 10.0, "High": 11.0, "Low": 9.0, "Close": 10.5, "Volume": 100}, index=index)
+
+async def checkpoints() -> dict:
+    rows = await database().fetch_rows(
+        "SELECT s.ticker, c.next_ts, c.status, c.attempts FROM backfill_checkpoint c JOIN {primary_table} s ON s.id = c.{foreign_key}"
+    )
+    return {ticker: (next_ts, status, attempts) for ticker, next_ts, status, attempts in rows}
+
+@pytest.fixture
+def listing(workdir, monkeypatch):
+    monkeypatch.setattr(universe, "BACKFILL_YEARS", 1)
+    monkeypatch.setattr(universe, "BACKFILL_WINDOW_DAYS", WINDOW_DAYS)
+    monkeypatch.setattr(yfinance, "_fetcher", None)
+
+    def write(tickers) -> str:
+        path = workdir / "listing.txt"
+        path.write_text("\n".join(tickers) + "\n")
+        return str(path)
+    return write
+
+def test_interrupted_backfill_resumes_from_its_checkpoints(listing, monkeypatch):
+    provider = RecordingProvider({ticker: history() for ticker in TICKERS})
+    set_provider(provider, requests_per_second=1000)
+    append_bars = bars.append_bars
+    calls = []
+
+    async def crash_on_fourth_window(rows, batch_size=0):
+        calls.append(len(rows))
+        if len(calls) == 4:
+            raise RuntimeError("interrupted")
+        return await append_bars(rows, batch_size)
+
+    async def scenario():
+        try:
+            await sync_universe(listing(TICKERS))
+            start = (await checkpoints())["AAA"][0]
+            monkeypatch.setattr(bars, "append_bars", crash_on_fourth_window)
+            with pytest.raises(RuntimeError):
+                await backfill()
+            interrupted = await checkpoints()
+            first_run = len(provider.starts)
+            monkeypatch.setattr(bars, "append_bars", append_bars)
+            status = await backfill()
+            stored = await database().fetch_rows(
+                "SELECT s.ticker, COUNT(*), COUNT(DISTINCT b.ts), MIN(b.ts) FROM bars b "
+                "JOIN {primary_table} s ON s.id = b.{foreign_key} WHERE b.interval = ? GROUP BY s.ticker",
+                (DAY,)
+            )
+            return start, interrupted, provider.starts[first_run:], status, await checkpoints(), stored
+        finally:
+            await database().close()
+
+    start, interrupted, resumed_starts, status, finished, stored = asyncio.run(scenario())
+
+    window = WINDOW_DAYS * DAY
+    # Three windows were committed before the crash; the fourth was fetched but never stored
+    assert {ticker: interrupted[ticker][:2] for ticker in TICKERS} == {ticker: (start + 3 * window, "pending") for ticker in TICKERS}
+    # The second run starts at the checkpoint instead of refetching the committed windows
+    assert resumed_starts[0] == pd.Timestamp(start + 3 * window, unit="s").strftime("%Y-%m-%d")
+    assert min(resumed_starts) == resumed_starts[0]
+    assert status["tickers_done"] == len(TICKERS) and status["failed"] == 0
+    assert all(checkpoint[1] == "done" for checkpoint in finished.values())
+
+    expected = history()
+    expected = expected[expected.index >= pd.Timestamp(start, unit="s")]
+    for ticker, count, distinct, first in stored:
+        # Every day from the backfill start is stored exactly once
+        assert count == distinct == len(expected)
+        assert first == start
+
+def test_failed_checkpoint_is_requeued_when_the_ticker_returns(listing):
+    async def scenario():
+        try:
+            await sync_universe(listing(TICKERS))
+            await database().execute("UPDATE backfill_checkpoint SET status = 'failed', attempts = 5")
+            await sync_universe(listing(["BBB"]))
+            queued = await sync_universe(listing(TICKERS))
+            return queued, await checkpoints()
+        finally:
+            await database().close()
+
+    queued, states = asyncio.run(scenario())
+
+    assert queued["added"] == 1 and queued["queued"] == 1
+    assert states["AAA"][1:] == ("pending", 0)
+    # BBB never left the universe; its failed checkpoint stays failed
+    assert states["BBB"][1:] == ("failed", 5)
@@ -0,0 +1,117 @@
+import asyncio
+import numpy as np
+import pytest
+from common.database import Database
+from components.stocks import indicator_state
+from components.stocks.bars import append_bars
+from components.stocks.indicator_state import apply_bars, reset_all
+from components.stocks.indicators import SNAPSHOT_COLUMNS, align, compute
+
+DAY = 86400
+TICKERS = 2
+# Past the longest SMA window, within the default LOOKBACK
+BARS = 260
+
+def database() -> Database:
+    return Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+
+def history(seed: int = 7) -> list:
+    """Random-walk daily bars, (stock_id, interval, ts, open, high, low, close, volume), oldest first per step."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for stock_id in range(1, TICKERS + 1):
+        close = 100.0 * stock_id
+        for t in range(BARS):
+            close = max(close + rng.normal(0, 1.5), 1.0)
+            spread = abs(rng.normal(0, 1.0))
+            # Some bars come without volume or range, as the provider's still-forming bars do
+            volume = None if t % 37 == 5 else float(rng.integers(1_000, 50_000))
+            high, low = (None, None) if t % 53 == 9 else (close + spread, close - spread)
+            rows.append((stock_id, DAY, 1_700_000_000 + t * DAY, close, high, low, close, volume))
+    return sorted(rows, key=lambda row: (row[2], row[0]))
+
+def expected(rows: list) -> dict:
+    """Batch values over the same bars, per stock id."""
+    ids, matrices = align([(row[0], row[2], *row[3:]) for row in rows])
+    values, _ = compute(matrices["close"], matrices["high"], matrices["low"], matrices["volume"])
+    return {int(stock_id): {name: values[name][i] for name in values} for i, stock_id in enumerate(ids)}
+
+def assert_same(actual: dict, batch: dict):
+    for name in SNAPSHOT_COLUMNS[1:]:
+        a, b = actual[name], float(batch[name])
+        assert (a != a and b != b) or a == b, name
+
+@pytest.fixture
+def states(workdir, monkeypatch):
+    monkeypatch.setattr(indicator_state, "_states", {})
+
+    async def setup():
+        await database().execute_transaction([
+            ("INSERT INTO {primary_table} (ticker) VALUES (?)", [(f"T{i}",) for i in range(1, TICKERS + 1)])
+        ])
+    asyncio.run(setup())
+    return indicator_state._states
+
+async def stream(rows: list):
+    """Stores and applies the bars one step at a time; every fifth step first sees a provisional forming bar."""
+    for t in range(0, len(rows), TICKERS):
+        step = rows[t:t + TICKERS]
+        if t // TICKERS % 5 == 3:
+            provisional = [row[:6] + (row[6] * 1.01, row[7]) for row in step]
+            await append_bars(provisional)
+            await apply_bars(provisional)
+        await append_bars(step)
+        await apply_bars(step)
+
+def test_streaming_matches_batch_recompute(states):
+    rows = history()
+
+    async def scenario():
+        try:
+            await stream(rows)
+            return {stock_id: entry.current.values() for (stock_id, _), entry in states.items()}
+        finally:
+            await database().close()
+
+    streamed = asyncio.run(scenario())
+    batch = expected(rows)
+
+    assert set(streamed) == set(batch)
+    for stock_id, values in streamed.items():
+        assert_same(values, batch[stock_id])
+
+def test_reset_matches_streaming_and_keeps_prior(states, monkeypatch):
+    rows = history()
+    revision = [row[:6] + (row[6] + 2.0, row[7]) for row in rows[-TICKERS:]]
+
+    async def scenario():
+        try:
+            await stream(rows)
+            streamed = {key: entry.current.to_bytes() for key, entry in states.items()}
+            count = await reset_all("1d")
+            reset = {key: entry.current.to_bytes() for key, entry in states.items()}
+            stored = dict(await database().fetch_rows("SELECT {foreign_key}, prior IS NOT NULL FROM indicator_state"))
+
+            rebuilt = []
+            original = indicator_state.rebuild
+
+            async def spy(stock_ids, interval):
+                rebuilt.extend(stock_ids)
+                return await original(stock_ids, interval)
+            monkeypatch.setattr(indicator_state, "rebuild", spy)
+            await append_bars(revision)
+            await apply_bars(revision)
+            return count, streamed, reset, stored, rebuilt, {stock_id: entry.current.values() for (stock_id, _), entry in states.items()}
+        finally:
+            await database().close()
+
+    count, streamed, reset, stored, rebuilt, revised = asyncio.run(scenario())
+
+    assert count == TICKERS
+    assert reset == streamed
+    assert stored == {stock_id: 1 for stock_id in range(1, TICKERS + 1)}
+    # The revised forming bar is re-applied on the kept prior state, not rebuilt from the bar store
+    assert rebuilt == []
+    batch = expected(rows[:-TICKERS] + revision)
+    for stock_id, values in revised.items():
+        assert_same(values, batch[stock_id])
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from components.stocks.indicators import align, compute
+
+def values_for(*series, volume: float = 100.0) -> dict:
+    """Runs the engine over close-only histories (high = low = close), one ticker per series."""
+    rows = [
+        (stock_id, t, close, close, close, close, volume)
+        for stock_id, closes in enumerate(series, start=1) for t, close in enumerate(closes)
+    ]
+    _, matrices = align(rows)
+    values, _ = compute(matrices["close"], matrices["high"], matrices["low"], matrices["volume"])
+    return values
+
+def test_rsi_by_hand():
+    # Fourteen changes: seven gains of 2 and seven losses of 1
+    closes = [100.0]
+    for _ in range(7):
+        closes += [closes[-1] + 2, closes[-1] + 1]
+    values = values_for(closes, closes[:-1], closes + [closes[-1] + 3])
+
+    # Not defined until RSI_PERIOD changes are in
+    assert np.isnan(values["rsi14"][1])
+    # Average gain 14 / 14 = 1, average loss 7 / 14 = 0.5: RS = 2
+    assert values["rsi14"][0] == pytest.approx(100 - 100 / 3)
+    # Wilder smoothing for a further gain of 3: gain (1 * 13 + 3) / 14, loss (0.5 * 13 + 0) / 14
+    assert values["rsi14"][2] == pytest.approx(100 - 100 / (1 + 16 / 6.5))
+
+def test_rsi_without_losses():
+    values = values_for(list(np.arange(1.0, 17.0)), [5.0] * 16)
+
+    assert values["rsi14"][0] == 100.0
+    # No movement at all is neutral
+    assert values["rsi14"][1] == 50.0
+
+def test_macd_by_hand():
+    values = values_for([10.0, 11.0])
+
+    ema12, ema26 = 10 + 2 / 13, 10 + 2 / 27
+    macd = ema12 - ema26
+    assert values["ema12"][0] == pytest.approx(ema12)
+    assert values["ema26"][0] == pytest.approx(ema26)
+    assert values["macd"][0] == pytest.approx(macd)
+    # The signal line starts at the first MACD value (0) and moves by 2 / (9 + 1) of the difference
+    assert values["macd_signal"][0] == pytest.approx(0.2 * macd)
+    assert values["macd_hist"][0] == pytest.approx(0.8 * macd)
+
+def test_matches_pandas_on_a_long_series():
+    closes = 100 + np.cumsum(np.random.default_rng(3).normal(0, 1, 300))
+    values = values_for(list(closes))
+
+    series = pd.Series(closes)
+    ema12 = series.ewm(span=12, adjust=False).mean()
+    ema26 = series.ewm(span=26, adjust=False).mean()
+    macd = ema12 - ema26
+    assert values["macd"][0] == pytest.approx(macd.iloc[-1])
+    assert values["macd_signal"][0] == pytest.approx(macd.ewm(span=9, adjust=False).mean().iloc[-1])
+    for window in (20, 50, 200):
+        assert values[f"sma{window}"][0] == pytest.approx(series.iloc[-window:].mean())
+    # Bollinger bands use the population standard deviation
+    std = series.iloc[-20:].std(ddof=0)
+    assert values["bb_upper"][0] == pytest.approx(series.iloc[-20:].mean() + 2 * std)
+
+def test_shorter_histories_are_padded_not_shifted():
+    long, short = list(np.linspace(10, 40, 60)), [7.0, 8.0, 9.0]
+    values = values_for(long, short)
+
+    assert values["close"].tolist() == [40.0, 9.0]
+    assert values["change"][1] == 1.0
+    assert np.isnan(values["sma20"][1]) and values["sma20"][0] == pytest.approx(np.mean(long[-20:]))
@@ -0,0 +1,163 @@
+import asyncio
+import time
+import pytest
+from common.database import Database
+from components.news_collection import tickertick
+from components.news_collection.dedup import dedup_stats
+from components.news_collection.tickertick import NewsFeed, NewsIngestor, StaticFeed, set_feed
+from utils.tasks import get_news_data
+
+# Batches of three, as get_news_data's tickers are queried: AAPL/MSFT/GOOGL, AMZN/NVDA/TSLA, META/JPM/V
+BATCH_SIZE = 3
+WORDS = ["earnings", "merger", "lawsuit", "dividend", "recall", "guidance", "buyback", "layoffs", "upgrade", "strike"]
+
+def story(story_id: str, minutes_ago: int, tags, **extra) -> dict:
+    return {
+        "id": story_id, "time": int((time.time() - minutes_ago * 60) * 1000), "site": "example.com",
+        "url": f"https://example.com/{story_id}",
+        # Unrelated texts, so the near-duplicate linking leaves every story alone
+        "description": f"{story_id} {' '.join(WORDS[(len(story_id) + i * 3) % len(WORDS)] for i in range(4))} {story_id * 3}",
+        "tags": list(tags), **extra,
+    }
+
+STORIES = [
+    story("s1", 50, ["AAPL"]),
+    story("s2", 40, ["AAPL", "MSFT"]),
+    story("s3", 30, ["NVDA"]),
+    story("s4", 20, ["JPM"]),
+    # Matched by the feed for MSFT (e.g. by company name) but tagged with nothing
+    story("s5", 10, [], matches=["MSFT"]),
+]
+
+def database() -> Database:
+    return Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+
+async def stored() -> dict:
+    rows = await database().fetch_rows(
+        "SELECT s.ticker, n.story_id FROM {news_table} n JOIN {primary_table} s ON s.id = n.{foreign_key}"
+    )
+    result = {}
+    for ticker, story_id in rows:
+        result.setdefault(ticker, set()).add(story_id)
+    return result
+
+async def watermarks() -> dict:
+    rows = await database().fetch_rows(
+        "SELECT s.ticker, w.last_id FROM news_watermark w JOIN {primary_table} s ON s.id = w.{foreign_key}"
+    )
+    return dict(rows)
+
+@pytest.fixture
+def feed(workdir, monkeypatch):
+    """Backs the shared ingestor with a StaticFeed for the test; returns a function installing one."""
+    monkeypatch.setattr(tickertick, "_ingestor", None)
+
+    def install(stories, failing=None) -> StaticFeed:
+        static = StaticFeed(stories, failing=failing)
+        set_feed(static, batch_size=BATCH_SIZE, requests_per_second=1000)
+        return static
+    return install
+
+def test_feed_is_abstract():
+    with pytest.raises(TypeError):
+        NewsFeed()
+
+def test_stories_only_go_to_tagged_tickers():
+    ingestor = NewsIngestor(StaticFeed(STORIES), batch_size=BATCH_SIZE, requests_per_second=1000)
+    stories, _ = asyncio.run(ingestor.fetch({ticker: (0, "") for ticker in ["AAPL", "MSFT", "GOOGL"]}))
+
+    assert [item["id"] for item in stories["AAPL"]] == ["s2", "s1"]
+    # s5 came back for the batch but is tagged with none of its tickers, so there is no telling whose it is
+    assert [item["id"] for item in stories["MSFT"]] == ["s2"]
+    assert stories["GOOGL"] == []
+
+def test_untagged_story_kept_for_single_ticker_query():
+    ingestor = NewsIngestor(StaticFeed(STORIES), batch_size=1, requests_per_second=1000)
+    stories, _ = asyncio.run(ingestor.fetch({"MSFT": (0, "")}))
+
+    assert [item["id"] for item in stories["MSFT"]] == ["s5", "s2"]
+
+def test_watermarks_advance_and_second_run_fetches_nothing(feed):
+    async def scenario():
+        try:
+            static = feed(STORIES)
+            first = await get_news_data()
+            after_first = await watermarks()
+            calls = len(static.calls)
+            second = await get_news_data()
+            return first, second, after_first, await watermarks(), await stored(), static.calls[calls:]
+        finally:
+            await database().close()
+
+    first, second, after_first, after_second, rows, second_calls = asyncio.run(scenario())
+
+    assert first == 5
+    assert rows == {"AAPL": {"s1", "s2"}, "MSFT": {"s2"}, "NVDA": {"s3"}, "JPM": {"s4"}}
+    # Every ticker of a batch that returned stories is read up to the batch's newest story
+    assert after_first == {
+        "AAPL": "s5", "MSFT": "s5", "GOOGL": "s5", "AMZN": "s3", "NVDA": "s3", "TSLA": "s3",
+        "META": "s4", "JPM": "s4", "V": "s4",
+    }
+    assert second == 0 and after_second == after_first
+    # One first page per batch, all of it at or below the watermarks
+    assert len(second_calls) == 3 and all(last_story is None for _, last_story in second_calls)
+
+def test_failed_batch_keeps_its_watermarks(feed):
+    async def scenario():
+        try:
+            feed(STORIES, failing={"MSFT": 1})
+            first = await get_news_data()
+            after_first, rows_first = await watermarks(), await stored()
+            second = await get_news_data()
+            return first, after_first, rows_first, second, await watermarks(), await stored()
+        finally:
+            await database().close()
+
+    first, after_first, rows_first, second, after_second, rows = asyncio.run(scenario())
+
+    # The AAPL/MSFT/GOOGL batch failed: nothing stored and no watermark for it, the other batches went ahead
+    assert first == 2
+    assert rows_first == {"NVDA": {"s3"}, "JPM": {"s4"}}
+    assert not {"AAPL", "MSFT", "GOOGL"} & set(after_first)
+    assert after_first["NVDA"] == "s3" and after_first["JPM"] == "s4"
+    # The next run retries it from the initial lookback
+    assert second == 3
+    assert rows["AAPL"] == {"s1", "s2"} and rows["MSFT"] == {"s2"}
+    assert after_second["AAPL"] == after_second["MSFT"] == after_second["GOOGL"] == "s5"
+
+def test_repost_links_to_the_earlier_original(feed):
+    text = "Acme Corp agrees to buy Widget Inc for 4 billion dollars in cash, creating the largest maker of widgets"
+    original = dict(story("orig", 30, ["AAPL"]), description=text)
+    # Published a second later and returned first by the newest-first feed
+    repost = dict(original, id="repost", time=original["time"] + 1000, description=text + " (Reuters)")
+
+    async def scenario():
+        try:
+            feed([original, repost])
+            await get_news_data()
+            rows = await database().fetch_rows("SELECT story_id, id, canonical_id FROM {news_table}")
+            return {story_id: (row_id, canonical_id) for story_id, row_id, canonical_id in rows}
+        finally:
+            await database().close()
+
+    rows = asyncio.run(scenario())
+
+    assert rows["orig"][1] is None
+    assert rows["repost"][1] == rows["orig"][0]
+
+def test_story_on_several_tickers_is_not_its_own_copy(feed):
+    async def scenario():
+        try:
+            # s2 is stored once for AAPL and once for MSFT
+            feed(STORIES)
+            await get_news_data()
+            return await dedup_stats(), await database().fetch_rows(
+                "SELECT story_id FROM {news_table} WHERE canonical_id IS NOT NULL"
+            )
+        finally:
+            await database().close()
+
+    totals, copies = asyncio.run(scenario())
+
+    assert copies == []
+    assert totals["stories"] == 5 and totals["duplicates"] == 0 and totals["dedup_ratio"] == 0.0
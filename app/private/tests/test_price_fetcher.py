@@ -0,0 +1,75 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from common.database import Database
+from components.data_collection import yfinance
+from components.data_collection.yfinance import MarketDataProvider, PriceFetcher, StaticProvider, get_latest_stock_prices, set_provider
+from utils.tasks import store_prices
+
+def frame(close: float) -> pd.DataFrame:
+    index = pd.date_range("2026-01-05", periods=3, freq="D")
+    return pd.DataFrame(
+        {"Open": close, "High": close, "Low": close, "Close": close, "Volume": 100}, index=index
+    )
+
+def fetcher(provider: StaticProvider, **kwargs) -> PriceFetcher:
+    return PriceFetcher(provider, requests_per_second=1000, **kwargs)
+
+def test_provider_is_abstract():
+    with pytest.raises(TypeError):
+        MarketDataProvider()
+
+def test_fetches_in_chunks():
+    tickers = [f"T{i}" for i in range(7)]
+    provider = StaticProvider({ticker: frame(i) for i, ticker in enumerate(tickers)})
+    frames = asyncio.run(fetcher(provider, chunk_size=3).fetch(tickers, period="5d", interval="1d"))
+
+    assert set(frames) == set(tickers)
+    assert sorted(map(len, provider.calls)) == [1, 3, 3]
+    assert sorted(ticker for call in provider.calls for ticker in call) == sorted(tickers)
+
+def test_failed_chunk_is_retried_per_ticker():
+    tickers = ["AAA", "BBB", "CCC", "DDD"]
+    provider = StaticProvider({ticker: frame(1) for ticker in tickers}, failing={"BBB": 1})
+    frames = asyncio.run(fetcher(provider, chunk_size=2, retries=1).fetch(tickers, period="5d", interval="1d"))
+
+    assert set(frames) == set(tickers)
+    # The failing chunk is retried one ticker at a time; the other chunk is not fetched again
+    assert provider.calls.count(["AAA"]) == 1 and provider.calls.count(["BBB"]) == 1
+    assert sum(1 for call in provider.calls if "CCC" in call) == 1
+
+def test_failing_ticker_never_fails_the_others():
+    tickers = ["AAA", "BBB", "CCC", "DDD"]
+    provider = StaticProvider({ticker: frame(1) for ticker in tickers if ticker != "DDD"}, failing={"BBB": 5})
+    frames = asyncio.run(fetcher(provider, chunk_size=2, retries=1).fetch(tickers, period="5d", interval="1d"))
+
+    # BBB keeps raising and DDD never returns data; both are left out without affecting their neighbours
+    assert set(frames) == {"AAA", "CCC"}
+    assert frames["AAA"]["Close"].iloc[-1] == 1
+
+def test_missing_values_in_the_latest_bar(workdir, monkeypatch):
+    monkeypatch.setattr(yfinance, "_fetcher", None)
+    forming = frame(2)
+    forming.loc[forming.index[-1], ["Open", "Volume"]] = np.nan
+    partial = frame(3)
+    partial.loc[partial.index[-1], :] = np.nan
+    set_provider(StaticProvider({"AAA": frame(1), "BBB": forming, "CCC": partial}), requests_per_second=1000)
+
+    async def scenario():
+        db = Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+        try:
+            prices = await get_latest_stock_prices(["AAA", "BBB", "CCC"])
+            await store_prices(db, prices)
+            return prices, await db.fetch_rows("SELECT s.ticker, b.volume FROM bars b JOIN {primary_table} s ON s.id = b.{foreign_key}")
+        finally:
+            await db.close()
+
+    (aaa, bbb, ccc), bars = asyncio.run(scenario())
+
+    assert aaa["volume"] == 100
+    # An empty volume or open is None; the other tickers of the run are stored as usual
+    assert bbb["close"] == 2 and bbb["open"] is None and bbb["volume"] is None
+    # A row without a close is skipped in favour of the latest one with a close
+    assert ccc["close"] == 3 and ccc["date"] == "2026-01-06 00:00:00"
+    assert sorted(bars) == [("AAA", 100), ("BBB", None), ("CCC", 100)]
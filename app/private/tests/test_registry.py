@@ -0,0 +1,21 @@
+import pytest
+from fastapi import HTTPException
+from routers.registry import COMMANDS, CommandRegistry
+
+def test_read_only_commands_ignore_unknown_inputs():
+    params = CommandRegistry().get("Scanner.Run").validate({"Cmd": "Scanner.Run", "_": "1718000000", "Interval": "1h"})
+
+    # Left out of the parameters, and so of the response cache key
+    assert params == {"Interval": "1h"}
+
+def test_writing_commands_reject_unknown_inputs():
+    with pytest.raises(HTTPException) as error:
+        CommandRegistry().get("Indicators.Rebuild").validate({"Interval": "1d", "Force": "yes"})
+
+    assert error.value.status_code == 400 and "Unknown input: Force" in error.value.detail
+
+def test_interval_choices_follow_the_bar_store():
+    from components.stocks.bars import INTERVALS
+
+    for name in ("Scanner.Run", "Indicators.Rebuild"):
+        assert COMMANDS[name][3]["Interval"]["choices"] == list(INTERVALS)
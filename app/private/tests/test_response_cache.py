@@ -0,0 +1,92 @@
+import asyncio
+import json
+from collections import OrderedDict
+import pytest
+from common.response_cache import DataVersions, ResponseCache
+from routers.registry import CommandRegistry
+from routers.router import ApiAccess
+
+CMD = "Sentiment.GetSeries"
+
+class CountingHandler:
+    """Stands in for the sentiment component; each response carries the number of times it was built."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def Gsad(self, cmd: str, varsIn: dict = None) -> dict:
+        self.calls += 1
+        return {"data": [{"Ticker": varsIn["Ticker"], "build": self.calls}], "status": 200}
+
+@pytest.fixture
+def handler(monkeypatch):
+    cache, counting = ResponseCache(), CountingHandler()
+    monkeypatch.setattr(cache, "entries", OrderedDict())
+    monkeypatch.setattr(cache, "counts", dict.fromkeys(cache.counts, 0))
+    monkeypatch.setattr(DataVersions(), "versions", {})
+    monkeypatch.setattr(CommandRegistry().get(CMD), "resolve", lambda: counting)
+    return counting
+
+def request(varsIn: dict, if_none_match: str = None):
+    return asyncio.run(ApiAccess().RunCmd(dict(varsIn, Cmd=CMD), if_none_match=if_none_match))
+
+def build_of(response) -> int:
+    return json.loads(response.body)["data"][0]["build"]
+
+def test_matching_etag_is_answered_without_running_the_command(handler):
+    first = request({"Ticker": "AAA", "Interval": "1d"})
+    etag = first.headers["ETag"]
+    # Parameter order and cache busters do not change the key
+    again = request({"Interval": "1d", "_": "1718000000", "Ticker": "AAA"}, if_none_match=etag)
+    listed = request({"Ticker": "AAA", "Interval": "1d"}, if_none_match=f'W/"0123", {etag}')
+    other = request({"Ticker": "BBB", "Interval": "1d"}, if_none_match=etag)
+
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+    assert etag.startswith('W/"')
+    assert again.status_code == listed.status_code == 304
+    assert again.headers["ETag"] == etag and not again.body
+    assert other.status_code == 200 and other.headers["ETag"] != etag
+    assert handler.calls == 2
+    assert ResponseCache().counts["not_modified"] == 2
+
+def test_unconditional_request_is_served_from_the_cache(handler):
+    first = request({"Ticker": "AAA"})
+    second = request({"Ticker": "AAA"})
+
+    assert second.status_code == 200 and second.body == first.body
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert handler.calls == 1 and ResponseCache().counts["hits"] == 1
+
+def test_version_bump_invalidates_etag_and_body(handler):
+    etag = request({"Ticker": "AAA"}).headers["ETag"]
+    # GetSeries reads only the sentiment domain
+    DataVersions().bump("prices", "news")
+    unrelated = request({"Ticker": "AAA"}, if_none_match=etag)
+    DataVersions().bump("sentiment")
+    stale = request({"Ticker": "AAA"}, if_none_match=etag)
+    fresh = request({"Ticker": "AAA"}, if_none_match=stale.headers["ETag"])
+
+    assert unrelated.status_code == 304
+    assert stale.status_code == 200 and stale.headers["ETag"] != etag
+    assert build_of(stale) == 2 and handler.calls == 2
+    assert fresh.status_code == 304
+
+def test_concurrent_misses_share_one_build(handler):
+    release = asyncio.Event()
+    run = handler.Gsad
+
+    async def slow(cmd, varsIn=None):
+        await release.wait()
+        return await run(cmd, varsIn)
+
+    async def scenario():
+        handler.Gsad = slow
+        pending = [asyncio.create_task(ApiAccess().RunCmd({"Cmd": CMD, "Ticker": "AAA"})) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*pending)
+
+    responses = asyncio.run(scenario())
+
+    assert {response.body for response in responses} == {responses[0].body}
+    assert handler.calls == 1 and ResponseCache().counts["shared"] == 2
@@ -0,0 +1,40 @@
+from datetime import datetime
+import pandas as pd
+from components.retention.maintenance import DAY, roll_up
+from components.stocks.bars import bar_timestamp
+from utils.cron.sessions import EXCHANGE_TZ
+
+def at(moment: str) -> int:
+    return int(datetime.fromisoformat(moment).replace(tzinfo=EXCHANGE_TZ).timestamp())
+
+def daily_key(day: str) -> int:
+    return bar_timestamp(pd.Timestamp(f"{day} 00:00", tz=EXCHANGE_TZ), "1d")
+
+def test_roll_up_covers_the_regular_session_of_each_trading_date():
+    # A winter Friday: its after-hours bars fall on Saturday in UTC
+    rows = [
+        (1, 3600, at("2026-01-09 08:00"), 9.0, 20.0, 1.0, 9.5, 1000),
+        (1, 3600, at("2026-01-09 09:30"), 10.0, 12.0, 9.0, 11.0, 100),
+        (1, 3600, at("2026-01-09 15:30"), 11.0, 13.0, 10.0, 12.0, 200),
+        (1, 3600, at("2026-01-09 16:00"), 12.0, 15.0, 8.0, 14.0, 50),
+        (1, 3600, at("2026-01-09 19:00"), 14.0, 16.0, 7.0, 15.0, 50),
+        (1, 3600, at("2026-01-12 09:30"), 14.0, 14.0, 13.0, 13.5, 70),
+        # A bar without a close does not replace the day's last close
+        (1, 3600, at("2026-01-12 10:30"), None, 14.5, 13.2, None, 30),
+    ]
+
+    assert sorted(roll_up(rows)) == [
+        (1, DAY, daily_key("2026-01-09"), 10.0, 13.0, 9.0, 12.0, 300),
+        (1, DAY, daily_key("2026-01-12"), 14.0, 14.5, 13.0, 13.5, 100),
+    ]
+
+def test_roll_up_follows_early_closes_and_skips_closed_days():
+    rows = [
+        # The day after Thanksgiving closes at 13:00
+        (1, 3600, at("2026-11-27 12:30"), 10.0, 11.0, 9.5, 10.5, 100),
+        (1, 3600, at("2026-11-27 13:00"), 10.5, 30.0, 1.0, 20.0, 100),
+        # Saturday bars (none are expected, but nothing is rolled up from them either)
+        (1, 3600, at("2026-11-28 10:00"), 10.0, 10.0, 10.0, 10.0, 100),
+    ]
+
+    assert roll_up(rows) == [(1, DAY, daily_key("2026-11-27"), 10.0, 11.0, 9.5, 10.5, 100)]
@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from common.database import Database
+from components.stocks import sentiment_agg
+from components.stocks.sentiment_agg import AGG_UPSERT, agg_params, ensure, read_series, rebuild
+
+HOUR, DAY = 3600, 86400
+# 2026-01-05 00:00:00 UTC
+MONDAY = 1767571200
+
+def database() -> Database:
+    return Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+
+# (stock id, date, published_at, label, positive, negative); a missing published_at falls back to the date and
+# missing probabilities to the label itself
+STORIES = [
+    (1, "2026-01-05 09:10:00", MONDAY + 9 * HOUR + 600, "positive", 0.9, 0.05),
+    (1, "2026-01-05 09:40:00", MONDAY + 9 * HOUR + 2400, "negative", 0.2, 0.7),
+    (1, "2026-01-05 15:00:00", MONDAY + 15 * HOUR, "neutral", 0.1, 0.1),
+    (1, "2026-01-05 18:00:00", None, "positive", None, None),
+    (1, "2026-01-06 10:00:00", MONDAY + DAY + 10 * HOUR, "negative", 0.05, 0.9),
+    (2, "2026-01-05 09:20:00", MONDAY + 9 * HOUR + 1200, "positive", 0.6, 0.3),
+    (2, "2026-01-07 11:00:00", MONDAY + 2 * DAY + 11 * HOUR, "positive", 0.8, 0.1),
+    (None, "2026-01-05 12:00:00", MONDAY + 12 * HOUR, "positive", 0.9, 0.05),
+]
+
+async def seed() -> list:
+    """Stores the stories, plus one still unlabeled, and returns the ids of the labeled ones in insert order."""
+    db = database()
+    await db.execute_transaction([
+        ("INSERT INTO {primary_table} (ticker) VALUES (?)", [("AAA",), ("BBB",)]),
+        (
+            "INSERT INTO {news_table} ({foreign_key}, date, description, source, published_at, sentiment_label, "
+            "sentiment_positive, sentiment_negative) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(stock_id, date, f"story {i}", "site.com", published_at, label, positive, negative)
+             for i, (stock_id, date, published_at, label, positive, negative) in enumerate(STORIES)]
+            + [(1, "2026-01-05 10:00:00", "unscored", "site.com", MONDAY + 10 * HOUR, None, None, None)]
+        ),
+    ])
+    rows = await db.fetch_rows("SELECT id FROM {news_table} WHERE sentiment_label IS NOT NULL ORDER BY id")
+    return [row[0] for row in rows]
+
+async def aggregates() -> list:
+    rows = await database().fetch_rows(
+        "SELECT {foreign_key}, bucket, ts, positive, negative, neutral, score FROM sentiment_agg ORDER BY 1, 2, 3"
+    )
+    return [(*row[:6], round(row[6], 9)) for row in rows]
+
+def test_incremental_upserts_match_a_rebuild(workdir):
+    async def scenario():
+        try:
+            ids = await seed()
+            # Labels arrive over several scoring runs, one transaction each
+            for batch in (ids[:3], ids[3:4], ids[4:]):
+                await database().execute_transaction([(AGG_UPSERT, agg_params(batch))])
+            incremental = await aggregates()
+            written = await rebuild()
+            return incremental, written, await aggregates()
+        finally:
+            await database().close()
+
+    incremental, written, rebuilt = asyncio.run(scenario())
+
+    assert incremental == rebuilt
+    assert written == len(rebuilt)
+    hourly = {(stock_id, ts): row for stock_id, bucket, ts, *row in rebuilt if bucket == HOUR}
+    # Both 09:xx stories of AAA share an hour; the story without published_at counts at its date
+    assert hourly[(1, MONDAY + 9 * HOUR)] == [1, 1, 0, round(0.9 - 0.05 + 0.2 - 0.7, 9)]
+    assert hourly[(1, MONDAY + 18 * HOUR)] == [1, 0, 0, 1.0]
+    daily = {(stock_id, ts): row for stock_id, bucket, ts, *row in rebuilt if bucket == DAY}
+    assert daily[(1, MONDAY)][:3] == [2, 1, 1]
+    # Stories without a ticker and unlabeled stories are not aggregated
+    assert {stock_id for stock_id, *_ in rebuilt} == {1, 2}
+    assert sum(positive + negative + neutral for _, bucket, _, positive, negative, neutral, _ in rebuilt if bucket == DAY) == 7
+
+def test_ensure_only_builds_an_empty_table(workdir):
+    async def scenario():
+        try:
+            await seed()
+            return await ensure(), await ensure()
+        finally:
+            await database().close()
+
+    first, second = asyncio.run(scenario())
+
+    assert first > 0 and second == 0
+
+def test_decayed_series_by_hand(workdir, monkeypatch):
+    monkeypatch.setattr(sentiment_agg, "DECAY_HALF_LIFE_HOURS", 24.0)
+
+    async def scenario():
+        try:
+            await seed()
+            await rebuild()
+            return await read_series(1, "1d", None, None, 10), await read_series(1, "1d", MONDAY + DAY, None, 10)
+        finally:
+            await database().close()
+
+    series, seeded = asyncio.run(scenario())
+
+    monday = 0.9 - 0.05 + 0.2 - 0.7 + 0.1 - 0.1 + 1.0
+    tuesday = 0.05 - 0.9
+    assert [point["ts"] for point in series] == [MONDAY, MONDAY + DAY]
+    assert series[0]["net"] == pytest.approx(monday / 4)
+    assert series[0]["decayed"] == pytest.approx(monday / 4)
+    # One day is one half-life: Monday's stories count half
+    assert series[1]["decayed"] == pytest.approx((monday / 2 + tuesday) / (4 / 2 + 1))
+    # Starting at Tuesday, Monday's bucket still seeds the decayed value
+    assert seeded == series[1:]
@@ -0,0 +1,114 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from common.database import Database
+from components.retention import archive
+from components.retention.maintenance import archive_news
+from components.stocks.sentiment import sentiment
+
+pytest.importorskip("pyarrow")
+
+LABELS = ["positive", "negative", "neutral"]
+STORIES = 40
+# Stories older than this are moved to the Parquet archive, about half of them
+ARCHIVE_DAYS = 30
+
+def database() -> Database:
+    return Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+
+async def seed() -> list:
+    """Stores labeled stories for two tickers over the last 60 days and returns them as GetList formats them,
+    newest first. Every fifth story shares its date with the one before, so pages also break within a date."""
+    db = database()
+    await db.execute_transaction([("INSERT INTO {primary_table} (ticker) VALUES (?)", [("AAA",), ("BBB",)])])
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    rows, moment = [], now - timedelta(days=60)
+    for i in range(STORIES):
+        if i % 5 != 4:
+            moment += timedelta(hours=36)
+        rows.append((1 + i % 2, moment.strftime("%Y-%m-%d %H:%M:%S"), f"story {i}", f"site{i % 3}.com", LABELS[i % 3]))
+    await db.execute_transaction([(
+        "INSERT INTO {news_table} ({foreign_key}, date, description, source, sentiment_label) VALUES (?, ?, ?, ?, ?)", rows
+    )])
+    stored = await db.fetch_rows(
+        "SELECT n.id, s.ticker, n.sentiment_label, n.date, n.description, n.source FROM {news_table} n "
+        "JOIN {primary_table} s ON s.id = n.{foreign_key}"
+    )
+    return [
+        {"ticker": ticker, "Sentiment_Label": label, "Date": date, "Description": description, "Source": source}
+        for _, ticker, label, date, description, source in sorted(stored, key=lambda row: (row[3], row[0]), reverse=True)
+    ]
+
+async def pages(varsIn: dict, limit: int) -> list:
+    """Follows next_cursor from the first page to the last; returns the pages."""
+    result, cursor = [], None
+    while True:
+        response = await sentiment().Gsad("GetList", dict(varsIn, Limit=limit, **({"Cursor": cursor} if cursor else {})))
+        result.append(response["data"])
+        cursor = response["next_cursor"]
+        if cursor is None:
+            return result
+
+@pytest.fixture
+def stories(workdir, monkeypatch):
+    monkeypatch.setattr(archive, "_manifest", None)
+
+    async def setup():
+        try:
+            expected = await seed()
+            moved = await archive_news(ARCHIVE_DAYS, False)
+            live = {row[0] for row in await database().fetch_rows("SELECT description FROM {news_table}")}
+            return expected, moved, live
+        finally:
+            await database().close()
+    return asyncio.run(setup())
+
+def test_pages_cross_from_the_table_into_the_archive(stories):
+    expected, moved, live = stories
+
+    async def scenario():
+        try:
+            return await pages({}, 7)
+        finally:
+            await database().close()
+
+    result = asyncio.run(scenario())
+
+    assert 0 < moved["stories"] < STORIES
+    assert [row for page in result for row in page] == expected
+    # One page holds the newest archived stories after the oldest ones left in the table
+    assert any(
+        {row["Description"] in live for row in page} == {True, False} for page in result
+    )
+
+def test_filters_apply_on_both_sides_of_the_boundary(stories):
+    expected, _, _ = stories
+
+    async def scenario():
+        try:
+            return await pages({"Ticker": "bbb", "Label": "Negative"}, 2)
+        finally:
+            await database().close()
+
+    rows = [row for page in asyncio.run(scenario()) for row in page]
+
+    assert rows == [row for row in expected if row["ticker"] == "BBB" and row["Sentiment_Label"] == "negative"]
+    assert rows
+
+def test_ndjson_stream_returns_every_row(stories, monkeypatch):
+    from components.stocks import sentiment as module
+    expected, _, _ = stories
+    # Several stream pages, so the stream also crosses the boundary between them
+    monkeypatch.setattr(module, "STREAM_PAGE_SIZE", 6)
+
+    async def scenario():
+        try:
+            response = await sentiment().Gsad("GetList", {"Stream": "ndjson"})
+            return b"".join([chunk async for chunk in response.body_iterator])
+        finally:
+            await database().close()
+
+    body = asyncio.run(scenario())
+
+    assert [json.loads(line) for line in body.decode().splitlines()] == expected
@@ -0,0 +1,54 @@
+import importlib.util
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from components.sentiment.backends import OnnxBackend, SentimentBackend, export_onnx, get_backend
+from components.sentiment.parity import SAMPLE_TEXTS, parity, tiny_model
+
+HAS_ONNX = importlib.util.find_spec("onnxruntime") is not None
+# Largest accepted difference from fp32 torch, per backend: (logit, probability)
+TOLERANCES = {"torch-int8": (0.05, 0.02), "onnx": (1e-4, 1e-5)}
+BACKENDS = ["torch-int8", pytest.param("onnx", marks=pytest.mark.skipif(not HAS_ONNX, reason="onnxruntime not installed"))]
+
+@pytest.fixture(scope="module")
+def model(tmp_path_factory) -> str:
+    return tiny_model(str(tmp_path_factory.mktemp("tiny")), SAMPLE_TEXTS)
+
+@pytest.fixture(scope="module")
+def onnx_file(model) -> str:
+    if not HAS_ONNX:
+        return None
+    return export_onnx(model, model + "/model.onnx")
+
+def loaded(name: str, model: str, onnx_file: str):
+    backend = OnnxBackend(onnx_file) if name == "onnx" else get_backend(name)
+    backend.load(model)
+    return backend
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        SentimentBackend()
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_logits_match_fp32(name, model, onnx_file):
+    from transformers import AutoTokenizer
+    encoded = AutoTokenizer.from_pretrained(model)(SAMPLE_TEXTS, padding=True, return_tensors="np")
+    batch = {key: values.astype(np.int64) for key, values in encoded.items()}
+
+    expected = loaded("torch", model, onnx_file).logits(batch)
+    actual = loaded(name, model, onnx_file).logits(batch)
+
+    assert actual.shape == expected.shape
+    assert np.abs(actual - expected).max() <= TOLERANCES[name][0]
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_parity_with_fp32(name, model, onnx_file):
+    report = parity(model, SAMPLE_TEXTS, [name], repeats=1, onnx_file=onnx_file)
+    [entry] = report["backends"]
+
+    assert "error" not in entry
+    assert entry["agreement"] == 1.0 and entry["disagreements"] == 0
+    assert entry["max_probability_difference"] <= TOLERANCES[name][1]
@@ -0,0 +1,79 @@
+from datetime import date, datetime
+import pytest
+from utils.cron import sessions
+from utils.cron.sessions import CLOSED, EXCHANGE_TZ, EXTENDED, REGULAR, early_closes, holidays, is_trading_day, next_change, session
+
+def et(moment: str) -> datetime:
+    return datetime.fromisoformat(moment).replace(tzinfo=EXCHANGE_TZ)
+
+@pytest.mark.parametrize("day, closed", [
+    ("2024-03-29", True),   # Good Friday
+    ("2025-04-18", True),   # Good Friday
+    ("2026-04-03", True),   # Good Friday
+    ("2026-01-19", True),   # Martin Luther King Jr. Day
+    ("2026-02-16", True),   # Washington's Birthday
+    ("2026-05-25", True),   # Memorial Day
+    ("2022-06-20", True),   # Juneteenth on a Sunday, observed Monday
+    ("2027-06-18", True),   # Juneteenth on a Saturday, observed Friday
+    ("2021-06-18", False),  # Juneteenth was not a market holiday before 2022
+    ("2026-07-03", True),   # Independence Day on a Saturday, observed Friday
+    ("2026-09-07", True),   # Labor Day
+    ("2025-11-27", True),   # Thanksgiving
+    ("2022-12-26", True),   # Christmas on a Sunday, observed Monday
+    ("2023-01-02", True),   # New Year's Day on a Sunday, observed Monday
+    ("2021-12-31", False),  # New Year's Day 2022 is a Saturday and is not observed on Friday
+    ("2026-01-09", False),
+    ("2026-01-10", True),   # Saturday
+])
+def test_trading_days(day, closed):
+    assert is_trading_day(date.fromisoformat(day)) is not closed
+
+def test_new_year_on_a_saturday_is_not_observed():
+    assert date(2021, 12, 31) not in holidays(2021) | holidays(2022)
+    assert not any(day.month == 1 and day.day <= 3 for day in holidays(2022))
+
+@pytest.mark.parametrize("day, early", [
+    ("2023-07-03", True),   # Monday before Independence Day
+    ("2024-07-03", True),
+    ("2025-07-03", True),
+    ("2026-07-03", False),  # The observed holiday itself
+    ("2022-07-03", False),  # Sunday
+    ("2025-11-28", True),   # Day after Thanksgiving
+    ("2026-11-27", True),
+    ("2025-12-24", True),   # Christmas Eve
+    ("2022-12-24", False),  # Saturday
+    ("2026-11-26", False),  # Thanksgiving is a holiday, not an early close
+])
+def test_early_closes(day, early):
+    day = date.fromisoformat(day)
+    assert (day in early_closes(day.year)) is early
+
+@pytest.mark.parametrize("moment, expected", [
+    ("2026-01-09 03:59", CLOSED),
+    ("2026-01-09 04:00", EXTENDED),
+    ("2026-01-09 09:30", REGULAR),
+    ("2026-01-09 15:59", REGULAR),
+    ("2026-01-09 16:00", EXTENDED),
+    ("2026-01-09 20:00", CLOSED),
+    ("2026-11-27 12:59", REGULAR),
+    ("2026-11-27 13:00", EXTENDED),
+    ("2026-11-27 17:00", CLOSED),   # After hours end early too
+    ("2026-04-03 10:00", CLOSED),   # Good Friday
+])
+def test_session(moment, expected):
+    assert session(et(moment)) == expected
+
+@pytest.mark.parametrize("moment, expected", [
+    ("2026-01-09 10:00", "2026-01-09 16:00"),
+    ("2026-11-27 14:00", "2026-11-27 17:00"),
+    ("2026-01-09 21:00", "2026-01-12 04:00"),   # Friday night to Monday's pre-market
+    ("2026-04-02 20:30", "2026-04-06 04:00"),   # Over Good Friday and the weekend
+])
+def test_next_change(moment, expected):
+    assert next_change(et(moment)) == et(expected)
+
+def test_extra_closed_dates(monkeypatch):
+    monkeypatch.setattr(sessions, "EXTRA_CLOSED_DATES", {date(2025, 1, 9)})
+
+    assert not is_trading_day(date(2025, 1, 9))
+    assert session(et("2025-01-09 10:00")) == CLOSED
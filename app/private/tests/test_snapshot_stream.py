@@ -0,0 +1,134 @@
+import asyncio
+import json
+import pandas as pd
+import pytest
+from common.database import Database
+from common.pubsub import Hub
+from components.data_collection.yfinance import latest_row
+from components.stocks import snapshot
+from routers import router
+from utils.tasks import store_prices
+
+def database() -> Database:
+    return Database("../data/stocks.db", primary_table="stocks", secondary_table="stock_data", news_table="news_table", foreign_key="stock_id")
+
+def price(ticker: str, day: str, close: float) -> dict:
+    index = pd.DatetimeIndex([day])
+    return latest_row(ticker, pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 100}, index=index))
+
+@pytest.fixture
+def hub(workdir, monkeypatch):
+    hub = Hub()
+    monkeypatch.setattr(hub, "subscribers", set())
+    monkeypatch.setattr(hub, "latest", {})
+    monkeypatch.setattr(hub, "counts", dict.fromkeys(hub.counts, 0))
+    return hub
+
+def test_subscribers_receive_only_changed_fields(hub):
+    everything, aaa = hub.subscribe(), hub.subscribe(["AAA"])
+
+    async def scenario():
+        db = database()
+        try:
+            await store_prices(db, [price("AAA", "2026-01-05", 10), price("BBB", "2026-01-05", 20)])
+            first, first_aaa = await everything.next(1), await aaa.next(1)
+            await store_prices(db, [price("AAA", "2026-01-06", 11), price("BBB", "2026-01-06", 20)])
+            second = await everything.next(1)
+            # Two revisions of the forming bar before the subscriber reads coalesce into one delta
+            await store_prices(db, [price("AAA", "2026-01-06", 11.5), price("BBB", "2026-01-06", 20)])
+            await store_prices(db, [price("AAA", "2026-01-06", 12), price("BBB", "2026-01-06", 20)])
+            third = await everything.next(1)
+            idle = await everything.next(0.01)
+            stock_id = (await db.get_ticker_ids(["BBB"]))["BBB"]
+            await db.execute_transaction([(snapshot.SENTIMENT_UPSERT, [("positive", "2026-01-06 12:00:00", stock_id)])])
+            await snapshot.publish([stock_id])
+            labeled = await everything.next(1)
+            return first, first_aaa, second, third, idle, labeled, await aaa.next(0.01)
+        finally:
+            await db.close()
+
+    first, first_aaa, second, third, idle, labeled, aaa_rest = asyncio.run(scenario())
+
+    assert first == [
+        {"ticker": "AAA", "Close": 10.0, "Change": None, "Sentiment_Label": "N/A"},
+        {"ticker": "BBB", "Close": 20.0, "Change": None, "Sentiment_Label": "N/A"},
+    ]
+    assert first_aaa == first[:1]
+    assert second == [{"ticker": "AAA", "Close": 11.0, "Change": 1.0}, {"ticker": "BBB", "Change": 0.0}]
+    assert third == [{"ticker": "AAA", "Close": 12.0, "Change": 2.0}]
+    assert idle is None
+    assert labeled == [{"ticker": "BBB", "Sentiment_Label": "positive"}]
+    # The AAA subscriber never hears of BBB, and its unread AAA changes are coalesced too
+    assert aaa_rest == [{"ticker": "AAA", "Close": 12.0, "Change": 2.0}]
+    assert hub.counts["unchanged"] == 2
+
+def test_lagging_subscriber_is_told_to_resync(hub):
+    lagging = hub.subscribe()
+    lagging.max_pending = 1
+
+    async def scenario():
+        db = database()
+        try:
+            await store_prices(db, [price("AAA", "2026-01-05", 10), price("BBB", "2026-01-05", 20)])
+            overflowed = await lagging.next(1)
+            await store_prices(db, [price("AAA", "2026-01-06", 11)])
+            return overflowed, await lagging.next(1)
+        finally:
+            await db.close()
+
+    overflowed, resumed = asyncio.run(scenario())
+
+    assert overflowed == [] and hub.counts["overflows"] == 1
+    assert resumed == [{"ticker": "AAA", "Close": 11.0, "Change": 1.0}]
+
+def test_nothing_is_remembered_without_subscribers(hub):
+    async def scenario():
+        db = database()
+        try:
+            await store_prices(db, [price("AAA", "2026-01-05", 10)])
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+    assert hub.latest == {} and hub.counts["published"] == 0
+
+class StreamRequest:
+    """The parts of a Request the stream endpoint reads."""
+
+    def __init__(self, tickers: str):
+        self.query_params = {"Tickers": tickers}
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+def test_stream_sends_a_snapshot_then_updates(hub, monkeypatch):
+    monkeypatch.setattr(router, "STREAM_KEEPALIVE", 0.05)
+    request = StreamRequest("aaa")
+
+    async def scenario():
+        db = database()
+        try:
+            await store_prices(db, [price("AAA", "2026-01-05", 10), price("BBB", "2026-01-05", 20)])
+            events = (await router.handle_stream(request)).body_iterator
+            received = [await anext(events), await anext(events), await anext(events)]
+            await store_prices(db, [price("AAA", "2026-01-06", 11), price("BBB", "2026-01-06", 21)])
+            received.append(await anext(events))
+            request.disconnected = True
+            received += [event async for event in events]
+            return received
+        finally:
+            await db.close()
+
+    retry, initial, keep_alive, update = asyncio.run(scenario())
+
+    assert retry == "retry: 5000\n\n"
+    assert initial.startswith("event: snapshot\n")
+    assert json.loads(initial.split("data: ", 1)[1]) == [{"ticker": "AAA", "Close": 10.0, "Change": None, "Sentiment_Label": "N/A"}]
+    assert keep_alive == ": keep-alive\n\n"
+    assert update.startswith("event: update\n")
+    # Nothing was published while the hub had no subscribers, so the first change carries every field
+    assert json.loads(update.split("data: ", 1)[1]) == [{"ticker": "AAA", "Close": 11.0, "Change": 1.0, "Sentiment_Label": "N/A"}]
+    # The closed stream left the hub
+    assert not hub.subscribers
@@ -13,25 +13,35 @@ export default function Tasks() {
   const [loading, setLoading] = useState(true)
  
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const res = await fetch('http://api2.localhost?Cmd=Tickers.GetList')
-        const raw = await res.json()
-        // Assuming: [ { ticker: 'AAPL', Close: 200 }, { ticker: 'MSFT', Close: 300 }, ... ]
-        const parsed = raw.data.map((item: any) => ({
-          ticker: item.ticker,
-          Close: item.Close,
-          Sentiment_Label: item.Sentiment_Label,
-        }))
-        setData(parsed)
-      } catch (err) {
-        console.error('Failed to fetch stocks:', err)
-      } finally {
-        setLoading(false)
-      }
+    // The stream starts with a full snapshot, then sends only the fields that changed per ticker
+    const source = new EventSource('http://api2.localhost/stream')
+    const toStock = (item: any): Partial<Stock> & { ticker: string } => ({
+      ticker: item.ticker,
+      ...(item.Close !== undefined && { Close: item.Close }),
+      ...(item.Sentiment_Label !== undefined && { Sentiment_Label: item.Sentiment_Label }),
+    })
+
+    source.addEventListener('snapshot', (event) => {
+      const raw = JSON.parse((event as MessageEvent).data)
+      setData(raw.map((item: any) => toStock(item) as Stock))
+      setLoading(false)
+    })
+    source.addEventListener('update', (event) => {
+      const deltas = JSON.parse((event as MessageEvent).data).map(toStock)
+      setData((current) => {
+        const byTicker = new Map(current.map((stock) => [stock.ticker, stock]))
+        for (const delta of deltas) {
+          byTicker.set(delta.ticker, { ...byTicker.get(delta.ticker), ...delta } as Stock)
+        }
+        return Array.from(byTicker.values())
+      })
+    })
+    source.onerror = (err) => {
+      // EventSource reconnects on its own and receives a fresh snapshot
+      console.error('Stock stream interrupted:', err)
     }
 
-    fetchData()
+    return () => source.close()
   }, [])
 
 